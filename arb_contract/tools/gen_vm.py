@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+重新生成 lib/forge-std/src/Vm.sol：缓存cheatcodes json，输入没有变化时跳过生成和 forge fmt
+
+forge-std 是子模块，这里不修改其中的 scripts/vm.py，而是在 cache/vm/ 下的临时目录中调用它：
+
+1. 下载 cheatcodes.json 到 cache/vm/（按ETag重新验证，304或网络失败时使用缓存，--offline 只用缓存）
+2. 输入哈希 = json + 上游 vm.py + 本脚本，与 cache/vm/Vm.sol.stamp 中的记录一致且 Vm.sol 未被改动时跳过
+3. 在临时目录中运行上游 vm.py（生成并 forge fmt），格式检查通过后才把结果rename到 src/Vm.sol，最后写入stamp
+
+任何一步失败时 Vm.sol 和stamp都保持不变，下次运行会重新生成。
+
+    python tools/gen_vm.py [--offline] [--force]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from urllib import error, request
+
+ROOT = Path(__file__).resolve().parents[1]
+FORGE_STD = ROOT / 'lib' / 'forge-std'
+VM_SCRIPT = FORGE_STD / 'scripts' / 'vm.py'
+OUT_PATH = FORGE_STD / 'src' / 'Vm.sol'
+CACHE_DIR = ROOT / 'cache' / 'vm'
+CACHE_PATH = CACHE_DIR / 'cheatcodes.json'
+ETAG_PATH = CACHE_DIR / 'cheatcodes.json.etag'
+STAMP_PATH = CACHE_DIR / 'Vm.sol.stamp'
+
+CHEATCODES_JSON_URL = "https://raw.githubusercontent.com/foundry-rs/foundry/master/crates/cheatcodes/assets/cheatcodes.json"
+FETCH_TIMEOUT = 10
+
+
+def fetch_cheatcodes_json(offline: bool = False) -> str:
+    """下载cheatcodes json，带上缓存的ETag；304、网络不可用时返回缓存"""
+    cached = CACHE_PATH.read_text() if CACHE_PATH.exists() else None
+    if offline:
+        if cached is None:
+            raise SystemExit(f"--offline: 没有缓存的cheatcodes json（{CACHE_PATH}），请先联网运行一次")
+        return cached
+
+    req = request.Request(CHEATCODES_JSON_URL)
+    if cached is not None and ETAG_PATH.exists():
+        req.add_header('If-None-Match', ETAG_PATH.read_text().strip())
+    try:
+        with request.urlopen(req, timeout=FETCH_TIMEOUT) as res:
+            json_str = res.read().decode('utf-8')
+            etag = res.headers.get('ETag')
+    except error.HTTPError as e:
+        if e.code == 304 and cached is not None:
+            return cached
+        raise
+    except (error.URLError, TimeoutError) as e:
+        if cached is None:
+            raise
+        print(f"警告: 无法下载 {CHEATCODES_JSON_URL}（{e}），使用缓存 {CACHE_PATH}", file=sys.stderr)
+        return cached
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    CACHE_PATH.write_text(json_str)
+    if etag:
+        ETAG_PATH.write_text(etag)
+    elif ETAG_PATH.exists():
+        ETAG_PATH.unlink()
+    return json_str
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def input_hash(json_str: str) -> str:
+    """json、上游生成脚本和本脚本的哈希，生成逻辑变化时也会重新生成"""
+    h = hashlib.sha256()
+    for part in (VM_SCRIPT.read_bytes(), Path(__file__).read_bytes(), json_str.encode('utf-8')):
+        h.update(_sha256(part).encode())
+    return h.hexdigest()
+
+
+def is_up_to_date(digest: str) -> bool:
+    if not STAMP_PATH.exists() or not OUT_PATH.exists():
+        return False
+    try:
+        stamp = json.loads(STAMP_PATH.read_text())
+    except ValueError:
+        return False
+    return stamp.get('input') == digest and stamp.get('output') == _sha256(OUT_PATH.read_bytes())
+
+
+def _run(cmd: list, cwd: Path, env: dict = None):
+    res = subprocess.run(cmd, cwd=cwd, env=env)
+    if res.returncode != 0:
+        raise RuntimeError(f"命令执行失败（退出码 {res.returncode}）: {' '.join(map(str, cmd))}")
+
+
+def generate(json_str: str) -> bytes:
+    """在临时目录中运行上游 vm.py 并检查格式，返回生成的 Vm.sol 内容"""
+    if shutil.which('forge') is None:
+        raise RuntimeError("找不到 forge，请先安装Foundry并加入PATH")
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    build = Path(tempfile.mkdtemp(prefix='build-', dir=CACHE_DIR))
+    try:
+        # 复制 foundry.toml，使 forge fmt 使用 forge-std 的格式配置
+        shutil.copy(FORGE_STD / 'foundry.toml', build / 'foundry.toml')
+        (build / 'src').mkdir()
+        json_path = build / 'cheatcodes.json'
+        json_path.write_text(json_str)
+        # 上游只用assert检查fmt的结果，不能在 -O 下运行
+        env = {k: v for k, v in os.environ.items() if k != 'PYTHONOPTIMIZE'}
+        _run([sys.executable, str(VM_SCRIPT), '--from', str(json_path)], build, env)
+        _run(['forge', 'fmt', '--check', 'src/Vm.sol'], build)
+        return (build / 'src' / 'Vm.sol').read_bytes()
+    finally:
+        shutil.rmtree(build, ignore_errors=True)
+
+
+def write_output(content: bytes, digest: str):
+    """先写临时文件再rename，最后写stamp；中途失败时下次仍会重新生成"""
+    tmp = OUT_PATH.with_name(OUT_PATH.name + '.tmp')
+    tmp.write_bytes(content)
+    os.replace(tmp, OUT_PATH)
+    stamp_tmp = STAMP_PATH.with_name(STAMP_PATH.name + '.tmp')
+    stamp_tmp.write_text(json.dumps({'input': digest, 'output': _sha256(content)}))
+    os.replace(stamp_tmp, STAMP_PATH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成 forge-std 的 Vm.sol，输入未变化时跳过')
+    parser.add_argument('--from', metavar='PATH', dest='path', help='本地cheatcodes json，不下载')
+    parser.add_argument('--offline', action='store_true', help=f"不访问网络，只使用缓存 {CACHE_PATH}")
+    parser.add_argument('--force', action='store_true', help='忽略stamp强制重新生成')
+    args = parser.parse_args()
+
+    json_str = Path(args.path).read_text() if args.path else fetch_cheatcodes_json(args.offline)
+    digest = input_hash(json_str)
+    if not args.force and is_up_to_date(digest):
+        print(f"{OUT_PATH.relative_to(ROOT)} 已是最新")
+        return
+    try:
+        content = generate(json_str)
+    except RuntimeError as e:
+        raise SystemExit(f"生成失败，{OUT_PATH.relative_to(ROOT)} 未修改: {e}")
+    write_output(content, digest)
+    print(f"已写入 {OUT_PATH.relative_to(ROOT)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,16 @@
 import json
 import os
-import requests
+import sys
 from typing import Dict, List, Any
 import time
 from dataclasses import dataclass
 from datetime import datetime
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from arbresearch.interner import AddressInterner
+from arbresearch import metrics
+
 # 加载.env文件
 load_dotenv()
 
@@ -67,7 +71,20 @@ class SearcherInputAnalyzer:
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
-
+        # searcher地址 -> ID，查询时不区分地址大小写
+        self.interner = AddressInterner()
+        self._indexed_searchers = None
+        self._searchers_by_id: Dict[int, Dict[str, Any]] = {}
+
+    def _searcher_index(self, analysis_data: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+        """按searcher ID索引的统计数据，每份analysis_data只构建一次"""
+        searchers = analysis_data["searchers"]
+        if self._indexed_searchers is not searchers:
+            self._searchers_by_id = {self.interner.intern(address): data for address, data in searchers.items()}
+            self._indexed_searchers = searchers
+        return self._searchers_by_id
+
+    @metrics.timed()
     def load_analysis_data(self, file_path: str) -> Dict[str, Any]:
         """加载分析数据文件"""
         with open(file_path, 'r') as f:
@@ -173,6 +190,7 @@ class SearcherInputAnalyzer:
         
         return formatted
 
+    @metrics.timed()
     def create_prompt(self, txs: List[ArbitrageTransaction]) -> str:
         """创建用于分析多个交易的prompt"""
         prompt = f"""作为一个区块链交易分析专家，请分析以下套利交易的input数据。我会提供多个交易作为参考，请用中文回答，并按照以下格式输出：
@@ -227,7 +245,10 @@ class SearcherInputAnalyzer:
 
     def analyze_transactions(self, txs: List[ArbitrageTransaction]) -> Dict[str, Any]:
         """使用大模型分析多个交易"""
+        import requests
+        
         prompt = self.create_prompt(txs)
+        metrics.count('prompt_chars', len(prompt))
         
         # 打印prompt
         print("\n" + "="*80)
@@ -252,9 +273,11 @@ class SearcherInputAnalyzer:
         }
 
         try:
-            response = requests.post(self.api_url, headers=self.headers, json=payload)
-            response.raise_for_status()
-            result = response.json()
+            with metrics.stage('http_request'):
+                response = requests.post(self.api_url, headers=self.headers, json=payload)
+                response.raise_for_status()
+                result = response.json()
+            metrics.count('http_requests')
             return {
                 "txHashes": [tx.txHash for tx in txs],
                 "analysis": result["choices"][0]["message"]["content"],
@@ -264,6 +287,7 @@ class SearcherInputAnalyzer:
             print(f"分析交易时出错: {str(e)}")
             return None
 
+    @metrics.timed()
     def analyze_searcher(self, searcher_address: str, analysis_data: Dict[str, Any], max_txs: int = 5) -> List[Dict[str, Any]]:
         """分析特定searcher的示例交易
         
@@ -272,19 +296,22 @@ class SearcherInputAnalyzer:
             analysis_data: 分析数据
             max_txs: 最大分析交易数量，默认5笔
         """
-        if searcher_address not in analysis_data["searchers"]:
+        searchers_by_id = self._searcher_index(analysis_data)
+        searcher_data = searchers_by_id.get(self.interner.id_of(searcher_address))
+        if searcher_data is None:
             print(f"未找到地址 {searcher_address} 的数据")
             return []
 
-        searcher_data = analysis_data["searchers"][searcher_address]
         results = []
 
         try:
             # 转换所有交易数据
             txs = []
-            for tx_data in searcher_data["exampleTxs"][:max_txs]:
-                tx = self.convert_transaction(tx_data)
-                txs.append(tx)
+            with metrics.stage('convert_transactions'):
+                for tx_data in searcher_data["exampleTxs"][:max_txs]:
+                    tx = self.convert_transaction(tx_data)
+                    txs.append(tx)
+            metrics.count('transactions', len(txs))
             
             # 一次性分析所有交易
             result = self.analyze_transactions(txs)
@@ -296,6 +323,7 @@ class SearcherInputAnalyzer:
 
         return results
 
+    @metrics.timed()
     def save_analysis_results(self, results: List[Dict[str, Any]], output_file: str, searcher_data: Dict[str, Any]):
         """保存分析结果到文件"""
         # 保存纯文本格式
@@ -323,13 +351,45 @@ class SearcherInputAnalyzer:
                 f.write(result['analysis'])
                 f.write("\n" + "="*80 + "\n\n")
 
-def main():
+def analyze_searcher_stage(address: str, searcher_data: Dict[str, Any], api_url: str, model: str,
+                           max_txs: int, output_file: str) -> List[Dict[str, Any]]:
+    """流水线中单个searcher的阶段，没有得到结果时抛出异常（失败的结果不缓存）"""
+    analyzer = SearcherInputAnalyzer(os.getenv("OPENROUTER_API_KEY"), api_url, model)
+    results = analyzer.analyze_searcher(address, {"searchers": {address: searcher_data}}, max_txs)
+    if not results:
+        raise RuntimeError(f"searcher {address} 没有得到分析结果")
+    analyzer.save_analysis_results(results, output_file, searcher_data)
+    return results
+
+def build_pipeline(analysis_data: Dict[str, Any], output_dir: str, max_searchers: int, api_url: str, model: str,
+                   max_txs: int, cache_dir: str = None):
+    """
+    每个searcher一个阶段，缓存键包含该searcher的统计数据和示例交易、模型和交易数
+
+    分析文件中其他searcher变化或新增searcher时，已经分析过的searcher不会重新请求
+    """
+    from arbresearch.pipeline import Pipeline, Stage
+
+    stages = []
+    for address in list(analysis_data["searchers"].keys())[:max_searchers]:
+        output_file = os.path.join(output_dir, f"{address}_analysis.txt")
+        stages.append(Stage(address, analyze_searcher_stage, outputs=[output_file], params={
+            "address": address, "searcher_data": analysis_data["searchers"][address], "api_url": api_url,
+            "model": model, "max_txs": max_txs, "output_file": output_file,
+        }))
+    return Pipeline("searcher-input", stages, cache_dir)
+
+def main(analysis_file: str = "data/arbitrage_analysis/inter_dominant_analysis.json",
+         output_dir: str = "data/searcher_analysis",
+         max_searchers: int = 5, workers: int = 1, force: bool = False):
+    from arbresearch.pipeline import default_cache_dir
+
     # 配置
     API_KEY = os.getenv("OPENROUTER_API_KEY")
     API_URL = "https://openrouter.ai/api/v1/chat/completions"
     MODEL = os.getenv("OPENROUTER_MODEL", "google/gemini-2.5-pro-preview")
-    ANALYSIS_FILE = "data/arbitrage_analysis/inter_dominant_analysis.json"
-    OUTPUT_DIR = "data/searcher_analysis"
+    ANALYSIS_FILE = analysis_file
+    OUTPUT_DIR = output_dir
     MAX_TXS = int(os.getenv("MAX_TXS", "5"))  # 每个searcher最多分析的交易数
 
     if not API_KEY:
@@ -345,15 +405,17 @@ def main():
     # 加载分析数据
     analysis_data = analyzer.load_analysis_data(ANALYSIS_FILE)
 
-    # 分析每个searcher
-    for searcher_address in list(analysis_data["searchers"].keys())[:5]:
-        print(f"\n分析 searcher: {searcher_address}")
-        results = analyzer.analyze_searcher(searcher_address, analysis_data, MAX_TXS)
-        
-        if results:
-            output_file = os.path.join(OUTPUT_DIR, f"{searcher_address}_analysis.txt")
-            analyzer.save_analysis_results(results, output_file, analysis_data["searchers"][searcher_address])
+    # 分析每个searcher（结果按searcher缓存，大模型请求是IO密集的，用线程并行）
+    pipeline = build_pipeline(analysis_data, OUTPUT_DIR, max_searchers, API_URL, MODEL, MAX_TXS, default_cache_dir())
+    run = pipeline.run(workers=workers, executor='thread', force=pipeline.order if force else ())
+    for searcher_address, status in run.status.items():
+        output_file = os.path.join(OUTPUT_DIR, f"{searcher_address}_analysis.txt")
+        if status == 'hit':
+            print(f"searcher {searcher_address} 未变化，沿用: {output_file}")
+        elif status == 'ran':
             print(f"分析结果已保存到: {output_file}")
+        else:
+            print(f"searcher {searcher_address} 分析失败: {run.errors.get(searcher_address)}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
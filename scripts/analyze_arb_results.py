@@ -1,44 +1,72 @@
 import json
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from pathlib import Path
-import matplotlib.font_manager as fm
+
+from arbresearch.interner import AddressInterner
+
+# pandas、matplotlib、seaborn 在用到的函数内部才导入，减少启动时间
 
 def load_data(json_file):
     with open(json_file, 'r') as f:
         return json.load(f)
 
-def extract_from_to_data(data):
-    rows = []
+def extract_from_to_data(data, interner=None):
+    """
+    展开 topAddresses 中的 from -> to 统计
+
+    from/to 地址在内部以 interner 的整数ID保存，输出时转换为 Categorical 列，
+    每个地址字符串在内存中只保存一份
+    """
+    import numpy as np
+    import pandas as pd
+
+    if interner is None:
+        interner = AddressInterner()
+    from_ids, to_ids = [], []
+    columns = {
+        'total_transactions': [], 'arbitrage_count': [], 'arbitrage_rate': [],
+        'total_profit': [], 'average_profit': [], 'total_gas_cost': [], 'average_gas_cost': [],
+        'total_gas_used': [], 'average_gas_used': [],
+        'pools_match': [], 'tokens_match': [], 'amounts_match': [], 'pools_and_tokens_match': [],
+        'pools_and_amounts_match': [], 'tokens_and_amounts_match': [], 'all_match': [], 'all_not_match': []
+    }
     for address_info in data['topAddresses']:
-        to_address = address_info['address']
+        to_id = interner.intern(address_info['address'])
         for from_address, stats in address_info['fromAddresses'].items():
-            row = {
-                'from_address': from_address,
-                'to_address': to_address,
-                'total_transactions': int(stats['totalTransactions']),
-                'arbitrage_count': int(stats['arbitrageCount']),
-                'arbitrage_rate': float(stats['arbitrageRate']),
-                'total_profit': float(stats['profitStats']['totalProfit']),
-                'average_profit': float(stats['profitStats']['averageProfit']),
-                'total_gas_cost': float(stats['profitStats']['totalGasCost']),
-                'average_gas_cost': float(stats['profitStats']['averageGasCost']),
-                'total_gas_used': int(stats['profitStats']['totalGasUsed']),
-                'average_gas_used': int(stats['profitStats']['averageGasUsed']),
-                'pools_match': int(stats['flagStats']['poolsMatch']),
-                'tokens_match': int(stats['flagStats']['tokensMatch']),
-                'amounts_match': int(stats['flagStats']['amountsMatch']),
-                'pools_and_tokens_match': int(stats['flagStats']['poolsAndTokensMatch']),
-                'pools_and_amounts_match': int(stats['flagStats']['poolsAndAmountsMatch']),
-                'tokens_and_amounts_match': int(stats['flagStats']['tokensAndAmountsMatch']),
-                'all_match': int(stats['flagStats']['allMatch']),
-                'all_not_match': int(stats['flagStats']['allNotMatch'])
-            }
-            rows.append(row)
-    return pd.DataFrame(rows)
+            from_ids.append(interner.intern(from_address))
+            to_ids.append(to_id)
+            profit_stats = stats['profitStats']
+            flag_stats = stats['flagStats']
+            columns['total_transactions'].append(int(stats['totalTransactions']))
+            columns['arbitrage_count'].append(int(stats['arbitrageCount']))
+            columns['arbitrage_rate'].append(float(stats['arbitrageRate']))
+            columns['total_profit'].append(float(profit_stats['totalProfit']))
+            columns['average_profit'].append(float(profit_stats['averageProfit']))
+            columns['total_gas_cost'].append(float(profit_stats['totalGasCost']))
+            columns['average_gas_cost'].append(float(profit_stats['averageGasCost']))
+            columns['total_gas_used'].append(int(profit_stats['totalGasUsed']))
+            columns['average_gas_used'].append(int(profit_stats['averageGasUsed']))
+            columns['pools_match'].append(int(flag_stats['poolsMatch']))
+            columns['tokens_match'].append(int(flag_stats['tokensMatch']))
+            columns['amounts_match'].append(int(flag_stats['amountsMatch']))
+            columns['pools_and_tokens_match'].append(int(flag_stats['poolsAndTokensMatch']))
+            columns['pools_and_amounts_match'].append(int(flag_stats['poolsAndAmountsMatch']))
+            columns['tokens_and_amounts_match'].append(int(flag_stats['tokensAndAmountsMatch']))
+            columns['all_match'].append(int(flag_stats['allMatch']))
+            columns['all_not_match'].append(int(flag_stats['allNotMatch']))
+
+    # ID即categories中的下标
+    categories = pd.Index(interner.addresses)
+    df = pd.DataFrame({
+        'from_address': pd.Categorical.from_codes(np.asarray(from_ids, dtype=np.int32), categories=categories),
+        'to_address': pd.Categorical.from_codes(np.asarray(to_ids, dtype=np.int32), categories=categories),
+    })
+    for name, values in columns.items():
+        df[name] = values
+    return df
 
 def setup_chinese_font():
+    import matplotlib.pyplot as plt
+    
     # 尝试设置中文字体
     chinese_fonts = ['WenQuanYi Micro Hei', 'Noto Sans CJK SC', 'Microsoft YaHei', 'SimHei']
     font_found = False
@@ -57,60 +85,137 @@ def setup_chinese_font():
     
     plt.rcParams['axes.unicode_minus'] = False
 
-def create_visualizations(df, output_dir):
-    # 设置输出目录
+def _new_figure(output_dir):
+    import matplotlib.pyplot as plt
+
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
-    
-    # 设置中文字体
     setup_chinese_font()
-    
-    # 1. Total Profit 分布图
     plt.figure(figsize=(12, 6))
-    sns.histplot(data=df, x='total_profit', bins=50)
+    return plt, output_dir
+
+def plot_total_profit(table, output_dir):
+    import seaborn as sns
+
+    plt, output_dir = _new_figure(output_dir)
+    sns.histplot(data=table, x='total_profit', bins=50)
     plt.title('Total Profit Distribution')
     plt.xlabel('Total Profit')
     plt.ylabel('Count')
     plt.savefig(output_dir / 'total_profit_distribution.png')
     plt.close()
-    
-    # 3. Arbitrage Rate 分布图
-    plt.figure(figsize=(12, 6))
-    sns.histplot(data=df, x='arbitrage_rate', bins=50)
+
+def plot_arbitrage_rate(table, output_dir):
+    import seaborn as sns
+
+    plt, output_dir = _new_figure(output_dir)
+    sns.histplot(data=table, x='arbitrage_rate', bins=50)
     plt.title('Arbitrage Rate Distribution')
     plt.xlabel('Arbitrage Rate')
     plt.ylabel('Count')
     plt.savefig(output_dir / 'arbitrage_rate_distribution.png')
     plt.close()
-    
-    # 4. 散点图：Arbitrage Rate vs Total Profit
-    plt.figure(figsize=(12, 6))
-    sns.scatterplot(data=df, x='arbitrage_rate', y='total_profit')
+
+def plot_rate_vs_profit(table, output_dir):
+    import seaborn as sns
+
+    plt, output_dir = _new_figure(output_dir)
+    sns.scatterplot(data=table, x='arbitrage_rate', y='total_profit')
     plt.title('Arbitrage Rate vs Total Profit')
     plt.xlabel('Arbitrage Rate')
     plt.ylabel('Total Profit')
     plt.savefig(output_dir / 'arbitrage_rate_vs_profit.png')
     plt.close()
 
-def main():
-    # 输入和输出路径
-    input_file = './data/arbitrage_analysis_full/analysis_report.json'
-    output_csv = './data/arbitrage_analysis_full/arbitrage_analysis_full.csv'
-    output_dir = './data/arbitrage_analysis_full/visualizations'
-    
-    # 加载数据
-    data = load_data(input_file)
-    
-    # 转换为DataFrame
-    df = extract_from_to_data(data)
-    
+def plot_cluster_profit(table, output_dir):
+    """按searcher簇汇总的利润（只有 --clusters 时才有cluster列）"""
+    import seaborn as sns
+
+    if 'cluster' not in table.columns or not (table['cluster'] >= 0).any():
+        return
+    plt, output_dir = _new_figure(output_dir)
+    cluster_profit = table[table['cluster'] >= 0].groupby('cluster')['total_profit'].sum().nlargest(20)
+    sns.barplot(x=cluster_profit.index.astype(str), y=cluster_profit.values, order=cluster_profit.index.astype(str))
+    plt.title('Total Profit by Searcher Cluster (Top 20)')
+    plt.xlabel('Cluster')
+    plt.ylabel('Total Profit')
+    plt.savefig(output_dir / 'cluster_profit.png')
+    plt.close()
+
+# 图表 -> 输出文件名
+CHARTS = {
+    'total_profit_distribution.png': plot_total_profit,
+    'arbitrage_rate_distribution.png': plot_arbitrage_rate,
+    'arbitrage_rate_vs_profit.png': plot_rate_vs_profit,
+    'cluster_profit.png': plot_cluster_profit,
+}
+
+def create_visualizations(df, output_dir):
+    for plot in CHARTS.values():
+        plot(df, output_dir)
+
+def load_frame(input_file):
+    return extract_from_to_data(load_data(input_file))
+
+def searcher_clusters(batches_dir):
+    from arbresearch.searcher_clusters import cluster_batches
+    return cluster_batches(batches_dir).label_of()
+
+def build_table(frame, clusters=None):
+    # 按共用池子/token对searcher（to地址）聚类，簇号-1表示没有相似的searcher
+    if clusters is None:
+        return frame
+    # batch文件和报告中同一地址的大小写写法可能不同，按小写匹配
+    clusters = {address.lower(): label for address, label in clusters.items()}
+    df = frame.copy()
+    df['cluster'] = df['to_address'].astype(str).str.lower().map(clusters).fillna(-1).astype('int32')
+    return df
+
+def write_csv(table, output_csv):
     # 保存为CSV，确保数值类型正确保存
-    df.to_csv(output_csv, index=False, float_format='%.18f')
+    table.to_csv(output_csv, index=False, float_format='%.18f')
+
+def build_pipeline(input_file, output_csv, output_dir, plots=True, clusters_from=None, cache_dir=None):
+    """
+    加载 -> (聚类) -> 表格 -> CSV / 各个图表，每个图表是独立的阶段
+
+    输入文件、batch目录和阶段代码都不变时直接复用缓存，修改某个图表函数只重新生成该图表
+    """
+    from arbresearch.pipeline import Pipeline, Stage
+
+    stages = [Stage('frame', load_frame, files=[input_file], params={'input_file': input_file})]
+    table_inputs = ['frame']
+    if clusters_from:
+        stages.append(Stage('clusters', searcher_clusters, files=[clusters_from], params={'batches_dir': clusters_from}))
+        table_inputs.append('clusters')
+    stages.append(Stage('table', build_table, inputs=table_inputs))
+    stages.append(Stage('csv', write_csv, inputs=['table'], outputs=[output_csv], params={'output_csv': output_csv}))
+    if plots:
+        for file_name, plot in CHARTS.items():
+            if plot is plot_cluster_profit and not clusters_from:
+                continue
+            stages.append(Stage(file_name, plot, inputs=['table'], outputs=[str(Path(output_dir) / file_name)],
+                                params={'output_dir': output_dir}))
+    return Pipeline('report', stages, cache_dir)
+
+def main(input_file: str = './data/arbitrage_analysis_full/analysis_report.json',
+         output_csv: str = './data/arbitrage_analysis_full/arbitrage_analysis_full.csv',
+         output_dir: str = './data/arbitrage_analysis_full/visualizations',
+         plots: bool = True, clusters_from: str = None, workers: int = 1, force: bool = False):
+    from arbresearch.pipeline import default_cache_dir
+
+    pipeline = build_pipeline(input_file, output_csv, output_dir, plots, clusters_from, default_cache_dir())
+    run = pipeline.run(workers=workers, force=pipeline.order if force else ())
+    for name, status in run.status.items():
+        print(f"{name}: {status}" + (f" ({run.seconds[name]:.2f}s)" if status == 'ran' else ''))
+    for name, error in run.errors.items():
+        print(f"阶段 {name} 失败: {error}")
+    if run.errors:
+        raise SystemExit(1)
+
     print(f"CSV文件已保存到: {output_csv}")
-    
-    # 创建可视化
-    create_visualizations(df, output_dir)
-    print(f"可视化图表已保存到: {output_dir}")
+    if plots:
+        print(f"可视化图表已保存到: {output_dir}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -0,0 +1,4 @@
+"""base链套利研究的Python分析工具集
+
+各子模块按需导入，包本身不在导入时加载任何重量级依赖。
+"""
@@ -0,0 +1,278 @@
+"""
+inter / begin 与 backrun 判定
+
+与 src/lib/chain/arb.helper.ts 中 analyzeBlock / analyzeTransaction 的逻辑一致：
+- 块内按交易顺序维护 池子 -> 最后一次被swap的交易 的哈希表，每笔交易只查表、再更新表，整个块只扫描一遍
+- 套利交易涉及的池子中只要有一个在本块更早的交易中被swap过，就是 inter，否则是 begin
+- inter 交易中所有池子的最后一次swap都发生在紧邻的前一笔交易（下标为当前下标-1）时，isBackrun 为 True
+
+判定规则可以通过 BackrunRules 调整，不需要重跑TS批处理任务。区块按分区流式读取，
+同一时刻只有一个块的哈希表常驻内存。
+"""
+import argparse
+import json
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .constants import DEFAULT_BATCHES_DIR
+
+
+@dataclass
+class BackrunRules:
+    """判定规则，默认与TS一致"""
+    # 最后一次swap距当前交易不超过 max_gap 笔时算作紧跟其后；TS中为1（必须是前一笔交易）
+    max_gap: int = 1
+    # True 时所有被更早交易触达的池子都要满足 max_gap（TS的 every），False 时任意一个满足即可
+    require_all_pools: bool = True
+    # 至少有这么多个池子被更早的交易触达才算 inter
+    min_inter_pools: int = 1
+
+
+@dataclass
+class TxSwaps:
+    """一笔交易按日志顺序swap过的池子"""
+    tx_index: int
+    tx_hash: str
+    pools: Sequence[str]
+    # False 的交易只更新池子触达记录，不参与判定（TS中只有套利交易才有 arbitrageInfo）
+    is_arbitrage: bool = True
+    # 交易的to地址（searcher合约），contention 按它区分searcher
+    searcher: str = ''
+
+
+@dataclass
+class Classification:
+    block_number: int
+    tx_index: int
+    tx_hash: str
+    type: str                   # 'begin' 或 'inter'
+    is_backrun: bool
+    # (池子, 最后一次swap该池子的交易哈希, 交易下标)，顺序与交易中池子首次出现的顺序一致
+    inter_info: List[Tuple[str, str, int]] = field(default_factory=list)
+
+    def to_arbitrage_info(self) -> Dict[str, Any]:
+        """与TS ArbitrageInfo 中 type / isBackrun / interInfo 字段结构一致"""
+        info = {'type': self.type, 'isBackrun': self.is_backrun}
+        if self.type == 'inter':
+            info['interInfo'] = [{'txHash': tx_hash, 'poolAddress': pool, 'transactionIndex': index}
+                                 for pool, tx_hash, index in self.inter_info]
+        return info
+
+
+def classify_block(block_number: int, txs: Iterable[TxSwaps],
+                   rules: BackrunRules = None) -> List[Classification]:
+    """按交易顺序判定一个块内的所有套利交易"""
+    rules = rules or BackrunRules()
+    last_touch: Dict[str, Tuple[int, str]] = {}
+    results = []
+    for tx in txs:
+        if tx.is_arbitrage:
+            inter_info = []
+            for pool in dict.fromkeys(tx.pools):
+                previous = last_touch.get(pool)
+                if previous is not None:
+                    inter_info.append((pool, previous[1], previous[0]))
+
+            if len(inter_info) >= rules.min_inter_pools:
+                adjacent = [tx.tx_index - index <= rules.max_gap for _, _, index in inter_info]
+                is_backrun = all(adjacent) if rules.require_all_pools else any(adjacent)
+                results.append(Classification(block_number, tx.tx_index, tx.tx_hash, 'inter', is_backrun, inter_info))
+            else:
+                results.append(Classification(block_number, tx.tx_index, tx.tx_hash, 'begin', False))
+
+        for pool in tx.pools:
+            last_touch[pool] = (tx.tx_index, tx.tx_hash)
+    return results
+
+
+def classify_blocks(blocks: Iterable[Tuple[int, Iterable[TxSwaps]]],
+                    rules: BackrunRules = None) -> Iterator[Classification]:
+    """流式判定 (区块号, 交易列表) 序列"""
+    rules = rules or BackrunRules()
+    for block_number, txs in blocks:
+        yield from classify_block(block_number, txs, rules)
+
+
+def iter_batch_blocks(batches_dir: str = DEFAULT_BATCHES_DIR, start_block: int = 0,
+                      end_block: Optional[int] = None) -> Iterator[Tuple[int, List[TxSwaps]]]:
+    """
+    从 analyze-arbitrage.ts 输出的batch文件读取区块
+
+    batch文件只保存套利交易，普通swap交易不在其中，因此池子触达记录不完整，
+    得到的 inter 数量是下限。需要与TS完全一致时请使用 iter_cache_blocks。
+    """
+    from .batches import iter_arbitrage_transactions
+
+    current, txs = None, []
+    for block, _, tx in iter_arbitrage_transactions(batches_dir):
+        if block < start_block or (end_block is not None and block > end_block):
+            continue
+        if block != current:
+            if txs:
+                yield current, sorted(txs, key=lambda t: t.tx_index)
+            current, txs = block, []
+        pools = [event['poolAddress'].lower() for event in tx['swapEvents']]
+        txs.append(TxSwaps(tx['index'], tx['hash'], pools, searcher=(tx.get('to') or '').lower()))
+    if txs:
+        yield current, sorted(txs, key=lambda t: t.tx_index)
+
+
+def _partition_blocks(cache, start_block: int, end_block: int,
+                      pools: Optional[Mapping[str, Any]]) -> Iterator[Tuple[int, List[TxSwaps]]]:
+    from .cycles import CycleReconstructor, SwapBatch
+    from .swap_decoder import _address_hex, decode_swap_logs
+
+    logs = cache.read('logs', start_block, end_block,
+                      columns=['block_number', 'tx_index', 'log_index', 'address', 'topic0', 'data', 'topic1', 'topic2'])
+    if logs.num_rows == 0:
+        return
+    swaps = decode_swap_logs(logs.column('topic0'), logs.column('address'), logs.column('data'),
+                             logs.column('topic1'), logs.column('topic2'))
+    block = logs.column('block_number').to_numpy()[swaps.log_index]
+    tx_index = logs.column('tx_index').to_numpy()[swaps.log_index]
+    log_index = logs.column('log_index').to_numpy()[swaps.log_index]
+
+    # 池子地址只对去重后的值做一次十六进制转换
+    unique, inverse = np.unique(np.ascontiguousarray(swaps.pool).view('V20').ravel(), return_inverse=True)
+    unique_hex = _address_hex(unique.view(np.uint8).reshape(-1, 20))
+    pool_hex = [unique_hex[i] for i in inverse.tolist()]
+
+    if pools is not None:
+        # 与TS一致：不在池子缓存中的池子直接忽略，既不参与判定也不更新触达记录
+        events = swaps.to_swap_events(pools)
+        keep = np.asarray([e is not None for e in events], dtype=bool)
+    else:
+        events, keep = None, np.ones(len(swaps), dtype=bool)
+
+    order = np.lexsort((log_index, tx_index, block))
+    order = order[keep[order]]
+    if len(order) == 0:
+        return
+    block, tx_index = block[order], tx_index[order]
+    tx_key = block * 100000 + tx_index
+    bounds = np.flatnonzero(np.diff(tx_key)) + 1
+    tx_starts = np.concatenate(([0], bounds)).tolist()
+    tx_ends = np.concatenate((bounds, [len(order)])).tolist()
+    order = order.tolist()
+
+    if events is not None:
+        batch = SwapBatch.from_swap_events([events[i] for i in order[s:e]] for s, e in zip(tx_starts, tx_ends))
+        is_arbitrage = [r is not None for r in CycleReconstructor().reconstruct(batch)]
+    else:
+        # 没有池子缓存时无法得到token，所有带swap的交易都参与判定
+        is_arbitrage = [True] * len(tx_starts)
+
+    txs_table = cache.read('transactions', start_block, end_block,
+                           columns=['block_number', 'tx_index', 'hash', 'to'])
+    all_keys = txs_table.column('block_number').to_numpy() * 100000 + txs_table.column('tx_index').to_numpy()
+    key_order = np.argsort(all_keys, kind='stable')
+    tx_keys = tx_key[tx_starts]
+    rows = key_order[np.searchsorted(all_keys, tx_keys, sorter=key_order)]
+    hashes = txs_table.column('hash').take(rows).to_pylist()
+    searchers = ['0x' + to.hex() if to else '' for to in txs_table.column('to').take(rows).to_pylist()]
+
+    current, txs = None, []
+    for t, (s, e) in enumerate(zip(tx_starts, tx_ends)):
+        b = int(block[s])
+        if b != current:
+            if txs:
+                yield current, txs
+            current, txs = b, []
+        txs.append(TxSwaps(int(tx_index[s]), '0x' + hashes[t].hex(),
+                           [pool_hex[i] for i in order[s:e]], is_arbitrage[t], searchers[t]))
+    if txs:
+        yield current, txs
+
+
+def iter_cache_blocks(start_block: int, end_block: int, cache=None,
+                      pools: Optional[Mapping[str, Any]] = None) -> Iterator[Tuple[int, List[TxSwaps]]]:
+    """
+    从 block_cache 逐个分区读取日志，返回每个块中带swap事件的交易
+
+    Args:
+        pools: 池子地址 -> 池子信息（PoolRegistry 或 extended_pool_cache.json 的字典），
+               提供时按TS逻辑只统计已知池子并用 CycleReconstructor 判断是否为套利；
+               不提供时所有带swap的交易都参与判定
+    只支持 swap_decoder 能解码的 V2/V3 类事件，Curve/Balancer/UniswapV4 的swap不计入触达记录。
+    """
+    from .block_cache import BlockCache
+
+    cache = cache or BlockCache()
+    for part_start, part_end, covered in cache.partitions():
+        lo, hi = max(part_start, start_block), min(covered, part_end, end_block)
+        if lo > hi:
+            continue
+        yield from _partition_blocks(cache, lo, hi, pools)
+
+
+def load_ts_labels(batches_dir: str, start_block: int, end_block: int) -> Dict[str, Tuple[str, bool]]:
+    """batch文件中TS的判定结果，交易哈希 -> (type, isBackrun)"""
+    from .batches import iter_arbitrage_transactions
+
+    labels = {}
+    for block, _, tx in iter_arbitrage_transactions(batches_dir):
+        if start_block <= block <= end_block:
+            info = tx['arbitrageInfo']
+            labels[tx['hash']] = (info['type'], bool(info.get('isBackrun', False)))
+    return labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description='inter/begin 与 backrun 判定')
+    parser.add_argument('start_block', type=int)
+    parser.add_argument('end_block', type=int)
+    parser.add_argument('--source', choices=['cache', 'batches'], default='cache')
+    parser.add_argument('--batches-dir', default=DEFAULT_BATCHES_DIR)
+    parser.add_argument('--pool-cache', default='./data/extended_pool_cache.json',
+                        help='cache数据源时用于过滤未知池子和判断套利，不存在时所有swap交易都参与判定')
+    parser.add_argument('--max-gap', type=int, default=1)
+    parser.add_argument('--any-pool', action='store_true', help='任意一个池子满足 max-gap 即为backrun')
+    parser.add_argument('--min-inter-pools', type=int, default=1)
+    parser.add_argument('--output', help='把判定结果逐行写入JSONL文件')
+    args = parser.parse_args()
+
+    rules = BackrunRules(args.max_gap, not args.any_pool, args.min_inter_pools)
+    if args.source == 'batches':
+        blocks = iter_batch_blocks(args.batches_dir, args.start_block, args.end_block)
+    else:
+        pools = None
+        if os.path.exists(args.pool_cache):
+            from .pool_registry import PoolRegistry
+            pools = PoolRegistry.load(args.pool_cache)
+        blocks = iter_cache_blocks(args.start_block, args.end_block, pools=pools)
+
+    labels = load_ts_labels(args.batches_dir, args.start_block, args.end_block) \
+        if os.path.isdir(args.batches_dir) else None
+    counts = Counter()
+    output = open(args.output, 'w') if args.output else None
+    try:
+        for r in classify_blocks(blocks, rules):
+            counts[r.type] += 1
+            counts['backrun'] += r.is_backrun
+            if labels is not None and r.tx_hash in labels:
+                ts_type, ts_backrun = labels[r.tx_hash]
+                counts['compared'] += 1
+                counts['same_type'] += ts_type == r.type
+                counts['same_backrun'] += ts_backrun == r.is_backrun
+            if output:
+                output.write(json.dumps({'blockNumber': r.block_number, 'index': r.tx_index, 'hash': r.tx_hash,
+                                         **r.to_arbitrage_info()}) + '\n')
+    finally:
+        if output:
+            output.close()
+
+    print(f"判定交易数: {counts['begin'] + counts['inter']}")
+    print(f"begin: {counts['begin']}, inter: {counts['inter']}, backrun: {counts['backrun']}")
+    if labels is not None:
+        print(f"与TS结果对比: 共同交易 {counts['compared']}, type一致 {counts['same_type']}, "
+              f"isBackrun一致 {counts['same_backrun']}")
+    if args.output:
+        print(f"结果已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .constants import DEFAULT_BATCHES_DIR, WETH_ADDRESS
+
+
+def iter_batch_files(batches_dir: str = DEFAULT_BATCHES_DIR) -> List[str]:
+    """按文件名顺序列出 analyze-arbitrage.ts 输出的batch文件"""
+    files = [f for f in os.listdir(batches_dir) if f.endswith('.json')]
+    return [os.path.join(batches_dir, f) for f in sorted(files)]
+
+
+def iter_arbitrage_transactions(batches_dir: str = DEFAULT_BATCHES_DIR) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+    """逐笔返回 (blockNumber, timestamp, transaction)"""
+    for batch_file in iter_batch_files(batches_dir):
+        with open(batch_file, 'r') as f:
+            batch = json.load(f)
+        for arb_tx in batch['arbitrageTransactions']:
+            yield arb_tx['blockNumber'], arb_tx['timestamp'], arb_tx['transaction']
+
+
+@dataclass
+class TransactionColumns:
+    """按列存储的套利交易，所有数组长度一致并按 (block_number, tx_index) 排序"""
+    block_number: np.ndarray   # int64
+    timestamp: np.ndarray      # int64, 秒
+    tx_index: np.ndarray       # int32
+    tx_hash: np.ndarray        # object
+    from_address: np.ndarray   # object
+    to_address: np.ndarray     # object, 即searcher合约地址
+    profit_token: np.ndarray   # object
+    profit: np.ndarray         # float64, 以profit_token最小单位/1e18计
+    profit_weth: np.ndarray    # float64, 按同一区块swap价格换算的WETH利润，没有价格时为nan
+    gas_cost: np.ndarray       # float64, ETH
+    is_inter: np.ndarray       # bool
+    is_backrun: np.ndarray     # bool
+
+    def __len__(self) -> int:
+        return len(self.block_number)
+
+    def take(self, idx: np.ndarray) -> 'TransactionColumns':
+        """按索引或布尔掩码取子集"""
+        return TransactionColumns(**{name: getattr(self, name)[idx] for name in self.__dataclass_fields__})
+
+    def weth_only(self) -> 'TransactionColumns':
+        """只保留WETH利润的交易，与TS报告的统计口径一致"""
+        return self.take(self.profit_token == WETH_ADDRESS)
+
+    def weth_normalized(self) -> 'TransactionColumns':
+        """所有能换算的交易，profit 替换为换算后的WETH利润"""
+        columns = self.take(~np.isnan(self.profit_weth))
+        columns.profit = columns.profit_weth
+        return columns
+
+
+def _parse_timestamp(ts: str) -> str:
+    # JSON.stringify(Date) 输出形如 2025-05-01T12:00:00.000Z，numpy不接受时区后缀
+    return ts[:-1] if ts.endswith('Z') else ts
+
+
+def load_transaction_columns(batches_dir: str = DEFAULT_BATCHES_DIR, max_staleness: int = 0) -> TransactionColumns:
+    """
+    把所有batch文件中的套利交易加载为列式数组
+
+    同一遍扫描中收集swap事件，用 weth_prices 按同一区块的成交价格把利润换算为WETH（profit_weth），
+    max_staleness 为本块没有价格时可以使用的旧价格的最大区块差
+    """
+    from .weth_prices import prices_from_events
+
+    block_number, timestamp, tx_index, tx_hash = [], [], [], []
+    from_address, to_address, profit_token = [], [], []
+    profit, gas_cost, is_inter, is_backrun = [], [], [], []
+    swap_block, token_in, token_out, amount_in, amount_out = [], [], [], [], []
+
+    for block, ts, tx in iter_arbitrage_transactions(batches_dir):
+        info = tx['arbitrageInfo']
+        for event in tx['swapEvents']:
+            swap_block.append(block)
+            token_in.append(event['tokenIn'])
+            token_out.append(event['tokenOut'])
+            amount_in.append(event['amountIn'])
+            amount_out.append(event['amountOut'])
+        block_number.append(block)
+        timestamp.append(_parse_timestamp(ts))
+        tx_index.append(tx['index'])
+        tx_hash.append(tx['hash'])
+        from_address.append(tx['from'].lower())
+        to_address.append((tx.get('to') or '').lower())
+        profit_token.append(info['profit']['token'].lower())
+        profit.append(int(info['profit']['amount']) / 1e18)
+        gas_cost.append(int(tx['gasUsed']) * int(tx['gasPrice']) / 1e18)
+        is_inter.append(info['type'] == 'inter')
+        is_backrun.append(bool(info.get('isBackrun', False)))
+
+    block_number = np.asarray(block_number, dtype=np.int64)
+    profit = np.asarray(profit, dtype=np.float64)
+    prices = prices_from_events(swap_block, token_in, token_out, amount_in, amount_out)
+    columns = TransactionColumns(
+        block_number=block_number,
+        timestamp=np.asarray(timestamp, dtype='datetime64[s]').astype(np.int64),
+        tx_index=np.asarray(tx_index, dtype=np.int32),
+        tx_hash=np.asarray(tx_hash, dtype=object),
+        from_address=np.asarray(from_address, dtype=object),
+        to_address=np.asarray(to_address, dtype=object),
+        profit_token=np.asarray(profit_token, dtype=object),
+        profit=profit,
+        profit_weth=prices.to_weth(profit_token, block_number, profit, max_staleness),
+        gas_cost=np.asarray(gas_cost, dtype=np.float64),
+        is_inter=np.asarray(is_inter, dtype=bool),
+        is_backrun=np.asarray(is_backrun, dtype=bool),
+    )
+    order = np.lexsort((columns.tx_index, columns.block_number))
+    return columns.take(order)
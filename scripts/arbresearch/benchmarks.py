@@ -0,0 +1,517 @@
+"""
+Python分析流程的基准测试
+
+    PYTHONPATH=scripts python -m arbresearch.benchmarks --scales 1000 100000
+    PYTHONPATH=scripts python -m arbresearch.benchmarks --stages parse_trace_line create_graph_from_trace \
+        --scales 1000000 --json data/bench/baseline.json
+    PYTHONPATH=scripts python -m arbresearch.benchmarks --compare data/bench/baseline.json
+
+每个阶段在给定规模（行数/交易数/cheatcode数）的合成数据上运行，预热一次后取 repeat 次中最快的耗时
+计算吞吐量，再单独运行一次用 tracemalloc 记录峰值内存（会明显变慢，因此不计入耗时）。
+Neo4j 和大模型接口分别替换为内存实现和本地HTTP服务，整个套件可离线运行。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Callable, Dict, List, Optional
+
+from . import synthetic
+from .cli import SCRIPTS_DIR, load_script
+
+VM_SCRIPT = os.path.join(SCRIPTS_DIR, '..', 'arb_contract', 'lib', 'forge-std', 'scripts', 'vm.py')
+
+
+@dataclass
+class Stage:
+    name: str
+    unit: str
+    # setup(scale, workdir) -> state，不计入耗时
+    setup: Callable[[int, str], Any]
+    # run(state) -> 处理的条目数
+    run: Callable[[Any], int]
+    # 依赖缺失时跳过
+    requires: tuple = ()
+
+
+@dataclass
+class Result:
+    stage: str
+    scale: int
+    unit: str
+    seconds: float
+    per_second: float
+    peak_mb: Optional[float]
+
+
+# ---------- 本地替身 ----------
+
+class _NullSession:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, *args, **kwargs):
+        return []
+
+
+class _NullDriver:
+    def session(self):
+        return _NullSession()
+
+    def close(self):
+        pass
+
+
+class InMemoryNeo4jGraph:
+    """与 Neo4jGraph 接口一致的内存实现，关系按 (token, 池子, 函数) 聚合"""
+
+    def __init__(self, *args, **kwargs):
+        self.driver = _NullDriver()
+        self.tokens = set()
+        self.pools = {}
+        self.relationships = {}
+
+    def close(self):
+        pass
+
+    def create_constraints(self):
+        pass
+
+    def clear_database(self):
+        self.tokens.clear()
+        self.pools.clear()
+        self.relationships.clear()
+
+    def create_token(self, address: str):
+        self.tokens.add(address)
+
+    def create_pool(self, address: str, pool_type: str):
+        self.pools.setdefault(address, pool_type)
+
+    def create_relationship(self, token_address: str, pool_address: str,
+                            function_name: str, function_result: str, value: float = None, observed_at=None):
+        self.merge_relationships([{'token': token_address, 'pool': pool_address, 'function': function_name,
+                                   'count': 1, 'result': function_result, 'value': value,
+                                   'first_seen': observed_at, 'last_seen': observed_at}])
+
+    def merge_tokens(self, addresses, batch_size: int = 5000):
+        self.tokens.update(addresses)
+
+    def merge_pools(self, pools, batch_size: int = 5000):
+        self.pools.update(pools)
+
+    def merge_relationships(self, rows, batch_size: int = 5000):
+        for row in rows:
+            key = (row['token'], row['pool'], row['function'])
+            existing = self.relationships.get(key)
+            if existing is not None:
+                row = dict(row, count=existing['count'] + row['count'], first_seen=existing['first_seen'])
+            self.relationships[key] = row
+
+
+class _CompletionHandler(BaseHTTPRequestHandler):
+    """返回固定内容的 OpenRouter chat/completions 替身"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = json.dumps({'choices': [{'message': {'content': '1. 推测的input数据结构：[4] [32] [32]'}}]})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body.encode())))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@contextlib.contextmanager
+def local_completion_server():
+    server = HTTPServer(('127.0.0.1', 0), _CompletionHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/api/v1/chat/completions"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+# ---------- 各阶段 ----------
+
+def _trace_file(scale: int, workdir: str) -> str:
+    path = os.path.join(workdir, f"trace-{scale}-analyzed.txt")
+    if not os.path.exists(path):
+        synthetic.write_trace_file(path, scale, n_pools=max(100, min(scale // 10, 100000)))
+    return path
+
+
+def _run_parse(state) -> int:
+    script, path = state
+    parse_trace_line = script.parse_trace_line
+    n = 0
+    with open(path, 'r') as f:
+        for line in f:
+            parse_trace_line(line.strip())
+            n += 1
+    return n
+
+
+@contextlib.contextmanager
+def _trace_cache_setting(value: str):
+    """create_graph_from_trace 调用时读取 ARBRESEARCH_TRACE_CACHE，只在计时期间设置"""
+    from .trace_cache import ENV_VAR
+
+    previous = os.environ.get(ENV_VAR)
+    os.environ[ENV_VAR] = value
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop(ENV_VAR, None)
+        else:
+            os.environ[ENV_VAR] = previous
+
+
+def _setup_graph(scale: int, workdir: str):
+    # 关闭解析缓存，每次重复都计入完整解析
+    script = load_script('trace-graph')
+    script.Neo4jGraph = InMemoryNeo4jGraph
+    return script, _trace_file(scale, workdir), scale, 'off'
+
+
+def _setup_graph_cached(scale: int, workdir: str):
+    # 缓存放在workdir下，先运行一次写入缓存，计时的是命中缓存的情况
+    script, path, scale, _ = _setup_graph(scale, workdir)
+    state = script, path, scale, os.path.join(workdir, 'trace_cache')
+    _run_graph(state)
+    return state
+
+
+def _run_graph(state) -> int:
+    script, path, scale, cache = state
+    with _trace_cache_setting(cache), contextlib.redirect_stdout(io.StringIO()):
+        script.create_graph_from_trace(path)
+    return scale
+
+
+def _setup_extract(scale: int, workdir: str):
+    return load_script('report'), synthetic.analysis_report(scale)
+
+
+def _run_extract(state) -> int:
+    script, data = state
+    return len(script.extract_from_to_data(data))
+
+
+def _searcher_txs(scale: int):
+    script = load_script('searcher-input')
+    analyzer = script.SearcherInputAnalyzer('bench', 'http://127.0.0.1:0')
+    data = synthetic.inter_dominant_analysis(max(1, scale // 5), txs_per_searcher=5)
+    return script, analyzer, data
+
+
+def _setup_prompt(scale: int, workdir: str):
+    _, analyzer, data = _searcher_txs(scale)
+    txs = [analyzer.convert_transaction(tx)
+           for searcher in data['searchers'].values() for tx in searcher['exampleTxs']]
+    # 每次请求最多5笔交易，与 analyze_searcher 一致
+    return analyzer, [txs[i:i + 5] for i in range(0, len(txs), 5)]
+
+
+def _run_prompt(state) -> int:
+    analyzer, groups = state
+    n = 0
+    for txs in groups:
+        analyzer.create_prompt(txs)
+        n += len(txs)
+    return n
+
+
+def _setup_llm(scale: int, workdir: str):
+    return _searcher_txs(scale)
+
+
+def _run_llm(state) -> int:
+    _, analyzer, data = state
+    n = 0
+    with local_completion_server() as url, contextlib.redirect_stdout(io.StringIO()):
+        analyzer.api_url = url
+        for address in data['searchers']:
+            # convert_transaction 会修改输入，每次运行使用副本
+            searcher_copy = {'searchers': {address: json.loads(json.dumps(data['searchers'][address]))}}
+            n += len(analyzer.analyze_searcher(address, searcher_copy, max_txs=5))
+    return n
+
+
+def _setup_cheatcodes(scale: int, workdir: str):
+    import importlib.util
+
+    if 'forge_std_vm' not in sys.modules:
+        spec = importlib.util.spec_from_file_location('forge_std_vm', VM_SCRIPT)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['forge_std_vm'] = module
+        spec.loader.exec_module(module)
+    return sys.modules['forge_std_vm'], synthetic.cheatcodes_json(scale)
+
+
+def _run_cheatcodes(state) -> int:
+    vm, json_str = state
+    return len(vm.Cheatcodes.from_json(json_str).cheatcodes)
+
+
+def _setup_simulate(scale: int, workdir: str):
+    import numpy as np
+    from .simulator import CycleBatch, Q96
+
+    # 2~4跳的环，一半为V3（其中三成带tick边界），汇率在1附近随机扰动
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(2, 5, scale)
+    hops = int(lengths.sum())
+    is_v3 = rng.random(hops) < 0.5
+    sqrt_price = (1 + rng.normal(0, 0.02, hops)) * Q96
+    bounded = is_v3 & (rng.random(hops) < 0.3)
+    reserve0 = 10 ** rng.uniform(18, 24, hops)
+    return CycleBatch, dict(
+        lengths=lengths, is_v3=is_v3, zero_for_one=rng.random(hops) < 0.5,
+        fee=np.where(is_v3, rng.choice([100, 500, 3000, 10000], hops), 3000),
+        reserve0=reserve0, reserve1=reserve0 * np.exp(rng.normal(0, 0.02, hops)),
+        sqrt_price_x96=sqrt_price, liquidity=10 ** rng.uniform(17, 22, hops),
+        sqrt_price_lower_x96=np.where(bounded, sqrt_price * 0.999, np.nan),
+        sqrt_price_upper_x96=np.where(bounded, sqrt_price * 1.001, np.nan),
+    )
+
+
+def _run_simulate(state) -> int:
+    from .simulator import optimize
+
+    cycle_batch, hops = state
+    return len(optimize(cycle_batch.from_hops(**hops)).profit)
+
+
+def _setup_match_inputs(scale: int, workdir: str):
+    import random
+
+    rng = random.Random(0)
+    txs = [synthetic.example_transaction(rng, synthetic.random_address(rng), rng.randint(2, 4)) for _ in range(scale)]
+    return [tx['input'] for tx in txs], [tx['swapEvents'] for tx in txs]
+
+
+def _run_match_inputs(state) -> int:
+    from .input_matcher import match_transactions
+
+    inputs, swap_events = state
+    return len(match_transactions(inputs, swap_events))
+
+
+def _setup_contention(scale: int, workdir: str):
+    import random
+    from .backrun import TxSwaps
+    from .contention import build_index
+
+    # 每块0~8笔套利交易，七成swap集中在300个热门池子上
+    rng = random.Random(0)
+    pools = [synthetic.random_address(rng) for _ in range(max(300, scale // 20))]
+    searchers = [synthetic.random_address(rng) for _ in range(200)]
+    blocks = [(b, [TxSwaps(i, '', [rng.choice(pools[:300] if rng.random() < 0.7 else pools)
+                                   for _ in range(rng.randint(2, 4))], searcher=rng.choice(searchers))
+                   for i in range(rng.randint(0, 8))]) for b in range(scale)]
+    return build_index(blocks), scale
+
+
+def _run_contention(state) -> int:
+    index, scale = state
+    index.top_contended(20, max(0, scale - 50000), scale - 1)
+    return min(scale, 50000)
+
+
+def _setup_clusters(scale: int, workdir: str):
+    import random
+    from .searcher_clusters import SearcherIncidence
+
+    # 每个运营方1~5个searcher合约，共用一组40个池子；池子总数为searcher数的50倍
+    rng = random.Random(0)
+    pools = [synthetic.random_address(rng) for _ in range(scale * 50)]
+    tokens = [synthetic.random_address(rng) for _ in range(200)]
+    txs = []
+    while len(txs) < scale * 10:
+        base = rng.sample(pools, 40)
+        for _ in range(rng.choice([1, 1, 2, 3, 5])):
+            searcher = synthetic.random_address(rng)
+            txs.extend({'to': searcher, 'swapEvents': [
+                {'poolAddress': pool, 'tokenIn': rng.choice(tokens), 'tokenOut': rng.choice(tokens)}
+                for pool in rng.sample(base, 3)]} for _ in range(10))
+    return SearcherIncidence.from_transactions(txs)
+
+
+def _run_clusters(incidence) -> int:
+    from .searcher_clusters import cluster_searchers
+
+    cluster_searchers(incidence)
+    return len(incidence)
+
+
+def _setup_weth_prices(scale: int, workdir: str):
+    import numpy as np
+    from .constants import WETH_ADDRESS
+    from .interner import AddressInterner
+
+    # 每块约20笔swap，token0为WETH的占三成，其余在500个token之间
+    rng = np.random.default_rng(0)
+    interner = AddressInterner([WETH_ADDRESS])
+    interner.intern_many('0x%040x' % i for i in range(1, 501))
+    blocks = np.sort(rng.integers(0, max(1, scale // 20), scale))
+    token_in = np.where(rng.random(scale) < 0.3, 0, rng.integers(1, 501, scale))
+    token_out = rng.integers(1, 501, scale)
+    return interner, blocks, token_in, token_out, 10 ** rng.uniform(15, 22, scale), 10 ** rng.uniform(15, 22, scale)
+
+
+def _run_weth_prices(state) -> int:
+    from .weth_prices import WethPriceCache
+
+    interner, blocks, token_in, token_out, amount_in, amount_out = state
+    cache = WethPriceCache.from_swaps(blocks, token_in, token_out, amount_in, amount_out, interner)
+    cache.lookup(token_out, blocks)
+    return len(blocks)
+
+
+def _setup_query(scale: int, workdir: str):
+    import random
+    from .query import FLAG_COLUMNS, FROM_TO_TYPES, AnalysisDB
+
+    # scale 行 from -> to 统计，to地址取自1000个searcher
+    rng = random.Random(0)
+    searchers = [synthetic.random_address(rng) for _ in range(1000)]
+    path = os.path.join(workdir, f'from_to_{scale}.csv')
+    if not os.path.exists(path):
+        with open(path, 'w') as f:
+            f.write(','.join(FROM_TO_TYPES) + '\n')
+            for _ in range(scale):
+                total = rng.randint(1, 1000)
+                arb = rng.randint(0, total)
+                profit, gas = rng.random(), rng.random() / 100
+                flags = [rng.randint(0, arb) for _ in FLAG_COLUMNS]
+                f.write(f"{synthetic.random_address(rng)},{rng.choice(searchers)},{total},{arb},{arb / total},"
+                        f"{profit},{profit / total},{gas},{gas / total},{total * 200000},200000,"
+                        f"{','.join(map(str, flags))}\n")
+    db = AnalysisDB()
+    db.register_from_to(path)
+    return db, scale
+
+
+def _run_query(state) -> int:
+    db, scale = state
+    db.top_searchers(20, 'net_profit')
+    db.flag_distribution()
+    return scale
+
+
+STAGES: Dict[str, Stage] = {stage.name: stage for stage in [
+    Stage('parse_trace_line', 'lines', lambda scale, workdir: (load_script('trace-graph'), _trace_file(scale, workdir)),
+          _run_parse),
+    Stage('create_graph_from_trace', 'lines', _setup_graph, _run_graph, requires=('networkx',)),
+    Stage('create_graph_from_trace_cached', 'lines', _setup_graph_cached, _run_graph, requires=('networkx',)),
+    Stage('extract_from_to_data', 'rows', _setup_extract, _run_extract, requires=('pandas',)),
+    Stage('create_prompt', 'txs', _setup_prompt, _run_prompt),
+    Stage('llm_request', 'requests', _setup_llm, _run_llm, requires=('requests',)),
+    Stage('cheatcodes_from_json', 'cheatcodes', _setup_cheatcodes, _run_cheatcodes),
+    Stage('optimize_cycles', 'cycles', _setup_simulate, _run_simulate),
+    Stage('match_inputs', 'txs', _setup_match_inputs, _run_match_inputs),
+    Stage('top_contended_pools', 'blocks', _setup_contention, _run_contention),
+    Stage('cluster_searchers', 'searchers', _setup_clusters, _run_clusters, requires=('scipy',)),
+    Stage('weth_prices', 'swaps', _setup_weth_prices, _run_weth_prices),
+    Stage('query_top_searchers', 'rows', _setup_query, _run_query, requires=('duckdb',)),
+]}
+
+
+def _missing(stage: Stage) -> List[str]:
+    import importlib.util
+    return [m for m in stage.requires if importlib.util.find_spec(m) is None]
+
+
+def run_stage(stage: Stage, scale: int, workdir: str, repeat: int = 3, memory: bool = True) -> Result:
+    state = stage.setup(scale, workdir)
+    # 预热一次，排除函数内部延迟导入等一次性开销
+    stage.run(state)
+    best, items = float('inf'), 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = stage.run(state)
+        best = min(best, time.perf_counter() - start)
+
+    peak_mb = None
+    if memory:
+        tracemalloc.start()
+        try:
+            stage.run(state)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        finally:
+            tracemalloc.stop()
+    return Result(stage.name, scale, stage.unit, best, items / best if best > 0 else float('inf'), peak_mb)
+
+
+def print_results(results: List[Result], baseline: Dict[str, float] = None, threshold: float = 0.2):
+    print(f"{'阶段':<26}{'规模':>10}{'耗时(秒)':>12}{'吞吐量/秒':>16}{'':<11}{'峰值内存(MB)':>14}{'对比基线':>10}")
+    for r in results:
+        peak = f"{r.peak_mb:.1f}" if r.peak_mb is not None else '-'
+        compare = ''
+        key = f"{r.stage}@{r.scale}"
+        if baseline and key in baseline:
+            change = r.seconds / baseline[key] - 1
+            compare = f"{change:+.0%}" + (' !' if change > threshold else '')
+        print(f"{r.stage:<26}{r.scale:>10}{r.seconds:>12.4f}{r.per_second:>16,.0f} {r.unit:<10}{peak:>14}{compare:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Python分析流程基准测试')
+    parser.add_argument('--stages', nargs='*', default=list(STAGES), choices=list(STAGES))
+    parser.add_argument('--scales', nargs='*', type=int, default=[1000, 10000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help='不统计峰值内存')
+    parser.add_argument('--workdir', help='合成数据目录，默认使用临时目录（trace文件可复用）')
+    parser.add_argument('--json', help='把结果写入JSON文件，可作为 --compare 的基线')
+    parser.add_argument('--compare', help='与之前保存的JSON结果对比耗时')
+    parser.add_argument('--threshold', type=float, default=0.2, help='耗时增加超过该比例时标记为回归')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = {f"{r['stage']}@{r['scale']}": r['seconds'] for r in json.load(f)['results']}
+
+    with contextlib.ExitStack() as stack:
+        workdir = args.workdir or stack.enter_context(tempfile.TemporaryDirectory(prefix='arbresearch-bench-'))
+        os.makedirs(workdir, exist_ok=True)
+        results = []
+        for name in args.stages:
+            stage = STAGES[name]
+            missing = _missing(stage)
+            if missing:
+                print(f"跳过 {name}: 缺少依赖 {', '.join(missing)}")
+                continue
+            for scale in args.scales:
+                results.append(run_stage(stage, scale, workdir, args.repeat, not args.no_memory))
+
+    print_results(results, baseline, args.threshold)
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, 'w') as f:
+            json.dump({'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': sys.version.split()[0],
+                       'results': [asdict(r) for r in results]}, f, indent=2)
+        print(f"\n结果已保存到: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
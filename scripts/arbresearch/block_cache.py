@@ -0,0 +1,267 @@
+import os
+import re
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as ipc
+
+DEFAULT_CACHE_DIR = './data/block_cache'
+DEFAULT_PARTITION_SIZE = 10000
+
+# 只保留分析需要的字段；地址/哈希/话题以定长二进制存储，便于直接做numpy字节视图
+BLOCKS_SCHEMA = pa.schema([
+    ('block_number', pa.int64()),
+    ('timestamp', pa.timestamp('ms', tz='UTC')),
+    ('base_fee_per_gas', pa.uint64()),
+    ('trx_number', pa.int32()),
+])
+
+TRANSACTIONS_SCHEMA = pa.schema([
+    ('block_number', pa.int64()),
+    ('tx_index', pa.int32()),
+    ('hash', pa.binary(32)),
+    ('from', pa.binary(20)),
+    ('to', pa.binary(20)),
+    ('input', pa.binary()),
+    ('gas_used', pa.uint64()),
+    ('gas_price', pa.uint64()),
+    ('status', pa.int8()),
+])
+
+LOGS_SCHEMA = pa.schema([
+    ('block_number', pa.int64()),
+    ('tx_index', pa.int32()),
+    ('log_index', pa.int32()),
+    ('address', pa.binary(20)),
+    ('topic0', pa.binary(32)),
+    ('topic1', pa.binary(32)),
+    ('topic2', pa.binary(32)),
+    ('topic3', pa.binary(32)),
+    ('data', pa.binary()),
+])
+
+TABLE_SCHEMAS = {
+    'blocks': BLOCKS_SCHEMA,
+    'transactions': TRANSACTIONS_SCHEMA,
+    'logs': LOGS_SCHEMA,
+}
+
+_PARTITION_RE = re.compile(r'^(\d+)-(\d+)$')
+
+
+def to_int(value: Any) -> Optional[int]:
+    """兼容RPC原始receipt中的十六进制字符串和viem序列化后的十进制字符串"""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.startswith('0x'):
+        return int(value, 16)
+    return int(value)
+
+
+def to_bytes(value: Optional[str]) -> Optional[bytes]:
+    if value is None:
+        return None
+    return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+
+
+def to_hex(value: Optional[bytes]) -> Optional[str]:
+    return None if value is None else '0x' + value.hex()
+
+
+def _block_columns(blocks: Iterable) -> Tuple[Dict[str, list], Dict[str, list], Dict[str, list]]:
+    """把BlockRow展开成三张表的列"""
+    block_cols = {name: [] for name in BLOCKS_SCHEMA.names}
+    tx_cols = {name: [] for name in TRANSACTIONS_SCHEMA.names}
+    log_cols = {name: [] for name in LOGS_SCHEMA.names}
+
+    for block in blocks:
+        block_number = block.blockNumber
+        block_cols['block_number'].append(block_number)
+        block_cols['timestamp'].append(block.timestamp)
+        block_cols['base_fee_per_gas'].append(to_int(block.baseFeePerGas))
+        block_cols['trx_number'].append(block.trxNumber)
+
+        receipts = {to_int(r['transactionIndex']): r for r in block.receipts}
+        for i, tx in enumerate(block.transactions):
+            if isinstance(tx, str):
+                continue
+            tx_index = to_int(tx.get('transactionIndex', i))
+            receipt = receipts.get(tx_index, {})
+            tx_cols['block_number'].append(block_number)
+            tx_cols['tx_index'].append(tx_index)
+            tx_cols['hash'].append(to_bytes(tx['hash']))
+            tx_cols['from'].append(to_bytes(tx['from']))
+            tx_cols['to'].append(to_bytes(tx.get('to')))
+            tx_cols['input'].append(to_bytes(tx.get('input', '0x')))
+            tx_cols['gas_used'].append(to_int(receipt.get('gasUsed')))
+            # EIP-1559交易以receipt中的实际gas价格为准
+            tx_cols['gas_price'].append(to_int(receipt.get('effectiveGasPrice', tx.get('gasPrice'))))
+            status = receipt.get('status')
+            tx_cols['status'].append(None if status is None else int(status in ('0x1', 'success', 1, '1')))
+
+            for log in receipt.get('logs', []):
+                topics = log.get('topics', [])
+                log_cols['block_number'].append(block_number)
+                log_cols['tx_index'].append(tx_index)
+                log_cols['log_index'].append(to_int(log['logIndex']))
+                log_cols['address'].append(to_bytes(log['address']))
+                for k in range(4):
+                    log_cols[f'topic{k}'].append(to_bytes(topics[k]) if k < len(topics) else None)
+                log_cols['data'].append(to_bytes(log.get('data', '0x')))
+
+    return block_cols, tx_cols, log_cols
+
+
+class BlockCache:
+    """
+    Block表的本地列式缓存
+
+    按区块区间分区，每个分区一个目录，内含 blocks/transactions/logs 三个未压缩的Arrow IPC文件，
+    读取时直接内存映射，不需要反序列化。
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, partition_size: int = DEFAULT_PARTITION_SIZE):
+        self.root = root
+        self.partition_size = partition_size
+
+    def partition_range(self, block_number: int) -> Tuple[int, int]:
+        start = block_number // self.partition_size * self.partition_size
+        return start, start + self.partition_size - 1
+
+    def _partition_dir(self, start: int, end: int) -> str:
+        return os.path.join(self.root, f"{start:010d}-{end:010d}")
+
+    def partitions(self) -> List[Tuple[int, int, int]]:
+        """已缓存的分区，返回 (分区起点, 分区终点, 实际已覆盖到的区块号)"""
+        if not os.path.isdir(self.root):
+            return []
+        result = []
+        for name in sorted(os.listdir(self.root)):
+            match = _PARTITION_RE.match(name)
+            if not match:
+                continue
+            start, end = int(match.group(1)), int(match.group(2))
+            path = os.path.join(self.root, name, 'blocks.arrow')
+            if not os.path.exists(path):
+                continue
+            with pa.memory_map(path) as source:
+                metadata = ipc.open_file(source).schema.metadata or {}
+            covered = int(metadata.get(b'covered_end', end))
+            result.append((start, end, covered))
+        return result
+
+    def _write_partition(self, start: int, end: int, covered_end: int, blocks: Iterable):
+        block_cols, tx_cols, log_cols = _block_columns(blocks)
+        part_dir = self._partition_dir(start, end)
+        tmp_dir = part_dir + '.tmp'
+        os.makedirs(tmp_dir, exist_ok=True)
+        for name, cols in (('blocks', block_cols), ('transactions', tx_cols), ('logs', log_cols)):
+            schema = TABLE_SCHEMAS[name].with_metadata({'covered_end': str(covered_end)})
+            table = pa.Table.from_pydict(cols, schema=schema)
+            with ipc.new_file(os.path.join(tmp_dir, f'{name}.arrow'), schema) as writer:
+                writer.write_table(table, max_chunksize=65536)
+        # 整个分区写完后再替换，避免中断留下半个分区
+        if os.path.isdir(part_dir):
+            for f in os.listdir(part_dir):
+                os.remove(os.path.join(part_dir, f))
+            os.rmdir(part_dir)
+        os.rename(tmp_dir, part_dir)
+
+    def fill(self, reader, start_block: int, end_block: int) -> List[Tuple[int, int]]:
+        """
+        从数据库增量填充缓存，已完整缓存的分区会被跳过
+
+        Args:
+            reader: block_reader.BlockReader
+        Returns:
+            本次写入的分区列表
+        """
+        _, db_max = reader.get_block_range()
+        if db_max is None:
+            return []
+        end_block = min(end_block, db_max)
+        covered = {(s, e): c for s, e, c in self.partitions()}
+        written = []
+        part_start, _ = self.partition_range(start_block)
+        while part_start <= end_block:
+            part_end = part_start + self.partition_size - 1
+            covered_end = min(part_end, db_max)
+            if covered.get((part_start, part_end), -1) < covered_end:
+                print(f"缓存分区 {part_start} - {part_end} (覆盖到 {covered_end})")
+                blocks = reader.iter_blocks(part_start, covered_end)
+                self._write_partition(part_start, part_end, covered_end, blocks)
+                written.append((part_start, part_end))
+            part_start += self.partition_size
+        return written
+
+    def read(self, table: str, start_block: int, end_block: int, columns: List[str] = None) -> pa.Table:
+        """
+        内存映射读取 [start_block, end_block] 区间的某张表
+
+        Args:
+            table: 'blocks'、'transactions' 或 'logs'
+            columns: 只取部分列，默认全部
+        """
+        if table not in TABLE_SCHEMAS:
+            raise ValueError(f"未知的表: {table}")
+        pieces = []
+        for start, end, _ in self.partitions():
+            if end < start_block or start > end_block:
+                continue
+            source = pa.memory_map(os.path.join(self._partition_dir(start, end), f'{table}.arrow'))
+            piece = ipc.open_file(source).read_all()
+            if start < start_block or end > end_block:
+                blocks = piece.column('block_number')
+                mask = pc.and_(pc.greater_equal(blocks, start_block), pc.less_equal(blocks, end_block))
+                piece = piece.filter(mask)
+            if columns:
+                piece = piece.select(columns)
+            pieces.append(piece.replace_schema_metadata(None))
+        if not pieces:
+            schema = TABLE_SCHEMAS[table]
+            if columns:
+                schema = pa.schema([schema.field(c) for c in columns])
+            return schema.empty_table()
+        return pa.concat_tables(pieces)
+
+    def missing_ranges(self, start_block: int, end_block: int) -> List[Tuple[int, int]]:
+        """缓存中尚未覆盖的区块区间"""
+        covered = sorted((s, c) for s, _, c in self.partitions())
+        missing, cursor = [], start_block
+        for s, c in covered:
+            if c < cursor:
+                continue
+            if s > end_block:
+                break
+            if s > cursor:
+                missing.append((cursor, min(s - 1, end_block)))
+            cursor = c + 1
+        if cursor <= end_block:
+            missing.append((cursor, end_block))
+        return missing
+
+
+def main():
+    from .block_reader import BlockReader
+
+    cache = BlockCache()
+    with BlockReader() as reader:
+        db_min, db_max = reader.get_block_range()
+        if db_min is None:
+            print("数据库中没有区块")
+            return
+        start_block = int(sys.argv[1]) if len(sys.argv) > 1 else db_min
+        end_block = int(sys.argv[2]) if len(sys.argv) > 2 else db_max
+        written = cache.fill(reader, start_block, end_block)
+    print(f"本次写入 {len(written)} 个分区，缓存目录: {os.path.abspath(cache.root)}")
+
+    logs = cache.read('logs', start_block, end_block, columns=['block_number', 'topic0'])
+    print(f"缓存中 {start_block} - {end_block} 的日志数: {logs.num_rows}")
+
+
+if __name__ == "__main__":
+    main()
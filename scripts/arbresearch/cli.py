@@ -0,0 +1,296 @@
+"""
+arbresearch 命令行入口
+
+    PYTHONPATH=scripts python -m arbresearch trace-graph data/trace/0x...-analyzed.txt --stats-only
+    PYTHONPATH=scripts python -m arbresearch report --no-plots
+    PYTHONPATH=scripts python -m arbresearch searcher-input --max-searchers 3
+    PYTHONPATH=scripts python -m arbresearch check-imports --budget 0.5
+
+本模块只依赖标准库。各子命令对应的脚本在执行时才加载，networkx、plotly、neo4j、
+pandas、matplotlib、seaborn 等重量级依赖也只在真正用到的函数内部导入。
+"""
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import time
+from types import ModuleType
+from typing import List
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 子命令 -> 对应的脚本（相对 scripts/ 目录）
+SCRIPTS = {
+    'trace-graph': 'trace-analysis/analyze-trace-graph.py',
+    'searcher-input': 'analyze/analyze_searcher_input.py',
+    'report': 'analyze_arb_results.py',
+}
+
+# 加载脚本时不应被导入的重量级模块
+HEAVY_MODULES = ['networkx', 'plotly', 'neo4j', 'pandas', 'matplotlib', 'seaborn', 'scipy', 'requests', 'duckdb']
+
+
+def load_script(command: str) -> ModuleType:
+    """按文件路径加载子命令对应的脚本（脚本文件名含连字符，无法直接import）"""
+    path = os.path.join(SCRIPTS_DIR, SCRIPTS[command])
+    name = os.path.splitext(os.path.basename(path))[0].replace('-', '_')
+    if name in sys.modules:
+        return sys.modules[name]
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _print_counts(title: str, counts: dict, limit: int = None):
+    print(f"\n=== {title} ===")
+    items = sorted(counts.items(), key=lambda x: -x[1])
+    for key, count in items[:limit]:
+        print(f"{key}: {count}")
+
+
+def cmd_trace_graph(args):
+    script = load_script('trace-graph')
+    allowed_tokens = args.tokens or None
+
+    if args.stats_only:
+        for trace_file in args.trace_files:
+            stats = script.collect_trace_stats(trace_file, allowed_tokens, args.workers)
+            print(f"\n{trace_file}")
+            _print_counts("协议统计", stats['protocols'])
+            _print_counts("函数统计", stats['functions'])
+            _print_counts("token对统计", stats['token_pairs'], args.top)
+        return
+
+    interner = script.AddressInterner.load(args.interner) if args.interner else script.AddressInterner()
+
+    if args.backend == 'csr':
+        graph = script.create_csr_graph_from_traces(args.trace_files, allowed_tokens, interner, args.workers)
+        n_components, _ = graph.connected_components()
+        print("\n=== 基本统计信息 ===")
+        print(f"图中节点数量: {graph.number_of_nodes}")
+        print(f"图中边数量: {graph.number_of_edges}")
+        print(f"连通分量数量: {n_components}")
+        print(json.dumps(graph.degree_stats(), indent=2, ensure_ascii=False))
+        print("\n=== 度最高的token ===")
+        for address, degree in graph.top_degree(n=args.top):
+            print(f"{address}: {degree}")
+        G, stats = (graph.to_networkx(), {}) if args.plot else (None, None)
+    else:
+        if len(args.trace_files) != 1:
+            sys.exit("networkx 后端每次只处理一个轨迹文件，合并多个文件请使用 --backend csr")
+        pool_cache = args.pool_cache
+        pool_registry = script.PoolRegistry.load(pool_cache) if pool_cache and os.path.exists(pool_cache) else None
+        observations = None
+        if args.observations:
+            if not args.interner:
+                sys.exit("--observations 中只保存地址ID，必须同时指定 --interner 持久化地址ID表")
+            from .observations import ObservationStore
+            observations = ObservationStore(args.observations)
+        G, stats = script.create_graph_from_trace(args.trace_files[0], allowed_tokens, pool_registry, interner,
+                                                  clear=not args.append, observations=observations)
+        print("\n=== 基本统计信息 ===")
+        print(f"图中节点数量: {G.number_of_nodes()}")
+        print(f"图中边数量: {G.number_of_edges()}")
+        _print_counts("协议统计", stats['protocols'])
+        _print_counts("函数统计", stats['functions'])
+
+    if args.interner:
+        interner.save(args.interner)
+    if args.plot:
+        output_file = script.create_plotly_graph(G, stats, args.plot)
+        print(f"\n交互式图已生成: {os.path.abspath(output_file)}")
+
+
+def cmd_graph_query(args):
+    script = load_script('trace-graph')
+    graph = script.Neo4jGraph(args.uri, args.user, args.password)
+    try:
+        if args.query == 'pair':
+            result = graph.pools_for_token_pair(args.token_a, args.token_b, args.function)
+        elif args.query == 'protocol':
+            result = graph.pools_by_protocol(args.protocol, args.limit) if args.protocol else graph.protocol_pool_counts()
+        elif args.query == 'paths':
+            result = graph.token_paths(args.source, args.target, args.max_pools, args.limit)
+        elif args.query == 'hottest':
+            result = graph.hottest_pools(args.limit, args.function)
+        else:
+            result = graph.get_statistics()
+    finally:
+        graph.close()
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+def cmd_neo4j_import(args):
+    from . import neo4j_import
+
+    script = load_script('trace-graph')
+    export = neo4j_import.Neo4jCSVExport()
+    for trace_file in args.trace_files:
+        added = export.add_trace_file(trace_file, script.parse_trace_line, args.tokens or None, args.workers)
+        print(f"{trace_file}: {added} 行")
+    paths = export.write(args.export_dir)
+    print(f"\nToken: {len(export.tokens)}, 池子: {len(export.pools)}, 关系: {len(export)}")
+    for path in paths.values():
+        print(f"已写入: {path}")
+    if args.export_only:
+        print("\n导入命令: " + ' '.join(neo4j_import.import_command(args.export_dir)))
+        return
+
+    neo4j_import.run_import(args.export_dir, args.compose_file, args.service)
+    neo4j_import.create_schema(script.Neo4jGraph, args.uri, args.user, args.password)
+    print("导入完成")
+
+
+def cmd_report(args):
+    script = load_script('report')
+    script.main(args.input, args.output_csv, args.output_dir, plots=not args.no_plots,
+                clusters_from=args.batches_dir if args.clusters else None, workers=args.workers, force=args.force)
+
+
+def cmd_searcher_input(args):
+    script = load_script('searcher-input')
+    script.main(args.analysis_file, args.output_dir, args.max_searchers, workers=args.workers, force=args.force)
+
+
+def _import_time(command: str) -> dict:
+    """在新进程中加载脚本，返回耗时和被意外导入的重量级模块"""
+    code = (
+        "import json, sys, time\n"
+        f"sys.path.insert(0, {SCRIPTS_DIR!r})\n"
+        "from arbresearch.cli import load_script, HEAVY_MODULES\n"
+        "start = time.perf_counter()\n"
+        f"load_script({command!r})\n"
+        "elapsed = time.perf_counter() - start\n"
+        "loaded = [m for m in HEAVY_MODULES if m in sys.modules]\n"
+        "print(json.dumps({'seconds': elapsed, 'heavy': loaded}))\n"
+    )
+    proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {'seconds': None, 'heavy': [], 'error': proc.stderr.strip().splitlines()[-1:]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def cmd_check_imports(args):
+    unknown = [c for c in args.commands if c not in SCRIPTS]
+    if unknown:
+        sys.exit(f"未知的子命令: {', '.join(unknown)}")
+    failed = False
+    for command in args.commands or list(SCRIPTS):
+        result = _import_time(command)
+        if result.get('error'):
+            print(f"{command}: 加载失败 {result['error']}")
+            failed = True
+            continue
+        over = result['seconds'] > args.budget
+        status = '超出预算' if over or result['heavy'] else 'OK'
+        heavy = f"，启动时导入了 {', '.join(result['heavy'])}" if result['heavy'] else ''
+        print(f"{command}: {result['seconds'] * 1000:.1f} ms {status}{heavy}")
+        failed = failed or over or bool(result['heavy'])
+    if failed:
+        sys.exit(1)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='arbresearch', description='base链套利数据分析工具')
+    parser.add_argument('--metrics', metavar='SPEC',
+                        help='开启阶段计时，格式同 ARBRESEARCH_METRICS，例如 summary,trace=data/trace.json')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('trace-graph', help='解析 -analyzed.txt 轨迹文件，构建token-池子图')
+    p.add_argument('trace_files', nargs='+')
+    p.add_argument('--tokens', nargs='*', help='只保留这些token之间的池子')
+    p.add_argument('--stats-only', action='store_true', help='只统计协议/函数/token对，不构建图')
+    p.add_argument('--backend', choices=['networkx', 'csr'], default='networkx',
+                   help='networkx 会同时写入Neo4j；csr 可合并多个文件且不连接Neo4j')
+    p.add_argument('--pool-cache', default='data/extended_pool_cache.json')
+    p.add_argument('--interner', help='持久化的地址ID表路径，例如 data/address_ids.txt')
+    p.add_argument('--append', action='store_true', help='不清空Neo4j，观测次数累加到已有的聚合关系上')
+    p.add_argument('--observations', metavar='DIR',
+                   help='把每次观测写入时间序列存储，例如 data/observations（必须同时指定 --interner）')
+    p.add_argument('--plot', metavar='HTML', help='生成plotly交互式网络图')
+    p.add_argument('--top', type=int, default=10)
+    p.add_argument('--workers', type=int, default=1, help='--stats-only 和 csr 后端按行边界分块多进程解析')
+    p.set_defaults(func=cmd_trace_graph)
+
+    p = subparsers.add_parser('graph-query', help='查询 trace-graph 写入Neo4j的token-池子图')
+    p.add_argument('--uri', default='bolt://localhost:7688')
+    p.add_argument('--user', default='neo4j')
+    p.add_argument('--password', default='password123')
+    queries = p.add_subparsers(dest='query', required=True)
+    q = queries.add_parser('pair', help='同时连接两个token的池子')
+    q.add_argument('token_a')
+    q.add_argument('token_b')
+    q.add_argument('--function', help='只看 slot0 或 getReserves 等函数的关系')
+    q = queries.add_parser('protocol', help='指定协议的池子；不指定协议时输出各协议池子数')
+    q.add_argument('protocol', nargs='?')
+    q.add_argument('--limit', type=int, default=1000)
+    q = queries.add_parser('paths', help='两个token之间经过不超过N个池子的路径')
+    q.add_argument('source')
+    q.add_argument('target')
+    q.add_argument('--max-pools', type=int, default=3)
+    q.add_argument('--limit', type=int, default=100)
+    q = queries.add_parser('hottest', help='关系数最多的池子')
+    q.add_argument('--limit', type=int, default=20)
+    q.add_argument('--function')
+    queries.add_parser('stats', help='节点、关系和协议统计')
+    p.set_defaults(func=cmd_graph_query)
+
+    p = subparsers.add_parser('neo4j-import', help='把轨迹文件导出为CSV，用 neo4j-admin 离线导入本地Neo4j容器')
+    p.add_argument('trace_files', nargs='+')
+    p.add_argument('--tokens', nargs='*', help='只保留这些token之间的池子')
+    p.add_argument('--workers', type=int, default=1, help='按行边界分块多进程解析')
+    p.add_argument('--export-dir', default='./neo4j/import/trace_graph', help='必须位于 ./neo4j/import 下')
+    p.add_argument('--export-only', action='store_true', help='只生成CSV，不停止容器执行导入')
+    p.add_argument('--compose-file', default='docker-compose.yml')
+    p.add_argument('--service', default='neo4j')
+    p.add_argument('--uri', default='bolt://localhost:7688')
+    p.add_argument('--user', default='neo4j')
+    p.add_argument('--password', default='password123')
+    p.set_defaults(func=cmd_neo4j_import)
+
+    p = subparsers.add_parser('report', help='从 analysis_report.json 生成CSV和统计图')
+    p.add_argument('--input', default='./data/arbitrage_analysis_full/analysis_report.json')
+    p.add_argument('--output-csv', default='./data/arbitrage_analysis_full/arbitrage_analysis_full.csv')
+    p.add_argument('--output-dir', default='./data/arbitrage_analysis_full/visualizations')
+    p.add_argument('--no-plots', action='store_true', help='只导出CSV，不加载matplotlib/seaborn')
+    p.add_argument('--clusters', action='store_true', help='从batch文件按共用池子/token聚类，增加cluster列')
+    p.add_argument('--batches-dir', default='./data/arbitrage_analysis_full/batches')
+    p.add_argument('--workers', type=int, default=1, help='并行执行互不依赖的阶段（CSV和各图表）')
+    p.add_argument('--force', action='store_true', help='忽略阶段缓存全部重新执行')
+    p.set_defaults(func=cmd_report)
+
+    p = subparsers.add_parser('searcher-input', help='调用大模型分析searcher的示例交易')
+    p.add_argument('--analysis-file', default='data/arbitrage_analysis/inter_dominant_analysis.json')
+    p.add_argument('--output-dir', default='data/searcher_analysis')
+    p.add_argument('--max-searchers', type=int, default=5)
+    p.add_argument('--workers', type=int, default=1, help='同时分析的searcher数')
+    p.add_argument('--force', action='store_true', help='忽略阶段缓存全部重新请求')
+    p.set_defaults(func=cmd_searcher_input)
+
+    p = subparsers.add_parser('check-imports', help='检查各子命令脚本的加载耗时是否在预算内')
+    p.add_argument('commands', nargs='*', help=f"默认检查全部: {', '.join(SCRIPTS)}")
+    p.add_argument('--budget', type=float, default=0.5, help='每个脚本的加载耗时上限（秒）')
+    p.set_defaults(func=cmd_check_imports)
+
+    return parser
+
+
+def main(argv: List[str] = None):
+    start = time.perf_counter()
+    args = build_parser().parse_args(argv)
+    if args.metrics:
+        from . import metrics
+        metrics.enable_from_spec(args.metrics)
+    args.func(args)
+    if os.getenv('ARBRESEARCH_TIMING'):
+        print(f"\n总耗时: {time.perf_counter() - start:.3f} 秒", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
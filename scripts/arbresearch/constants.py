@@ -0,0 +1,17 @@
+"""与 src/common/constants.ts 保持一致的常量"""
+
+WETH_ADDRESS = "0x4200000000000000000000000000000000000006"
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# 默认数据路径（与TS脚本的输出位置一致）
+DEFAULT_BATCHES_DIR = "./data/arbitrage_analysis_full/batches"
+DEFAULT_REPORT_FILE = "./data/arbitrage_analysis_full/analysis_report.json"
+
+# 与 src/common/events.ts 中的 logTopicsMap 一致（AeroV3Swap 与 V3Swap 相同）
+LOG_TOPICS = {
+    'V2Swap': "0xd78ad95fa46c994b6551d0da85fc275fe613ce37657fb8d5e3d130840159d822",
+    'AeroV2Swap': "0xb3e2773606abfd36b5bd91394b3a54d1398336c65005baf7bf7a05efeffaf75b",
+    'V3Swap': "0xc42079f94a6350d7e6235f29174924f928cc2ac818eb64fed8004e115fbcca67",
+    'PancakeV3Swap': "0x19b47279256b2a23a1665c810c8d55a1758940ee09377d4f8d26497a3577dc83",
+    'Transfer': "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef",
+}
@@ -0,0 +1,245 @@
+"""
+池子争夺索引：每个 (区块, 池子) 上按交易顺序排列的searcher和交易下标
+
+按区块顺序流式扫描 backrun 的区块序列（区块缓存或batch文件），每笔交易对它swap过的每个池子记录一次
+触达（同一交易多次swap同一池子只记一次）。构建后所有触达按 (区块, 池子, 交易下标) 排序，保存为整数列：
+
+- touch_pool / touch_tx_index / touch_searcher: 每次触达的池子、交易下标和searcher（交易的to地址），地址为驻留表ID
+- group_block / group_pool: 每个 (区块, 池子) 分组，group_block 有序，同一区块内 group_pool 有序
+- group_offsets: 分组在触达列中的起止位置
+- group_txs / group_searchers: 分组内的交易数和不同searcher数
+
+按区块区间查询时在 group_block 上二分得到连续的分组区间，再用 bincount 按池子聚合，
+"最近5万个块中争夺最激烈的池子"只需几毫秒。索引可以保存为 .npz 文件重复使用。
+
+    PYTHONPATH=scripts python -m arbresearch.contention 29000000 29050000 --top 20
+"""
+import argparse
+import os
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .backrun import TxSwaps
+from .constants import DEFAULT_BATCHES_DIR
+from .interner import AddressInterner
+
+DEFAULT_INDEX_FILE = './data/contention_index.npz'
+
+
+@dataclass
+class ContendedPool:
+    pool: str
+    contended_blocks: int       # 至少 min_searchers 个searcher swap过该池子的区块数
+    contended_txs: int          # 这些区块中触达该池子的交易数
+    searchers: int              # 区间内swap过该池子的不同searcher数
+
+
+class ContentionIndexBuilder:
+    """一遍扫描区块序列，累积触达记录"""
+
+    def __init__(self, interner: AddressInterner = None, arbitrage_only: bool = True):
+        self.interner = interner or AddressInterner()
+        # False 时普通swap交易也计入（区块缓存数据源中才有普通交易）
+        self.arbitrage_only = arbitrage_only
+        self._block: List[int] = []
+        self._pool: List[int] = []
+        self._tx_index: List[int] = []
+        self._searcher: List[int] = []
+
+    def add_block(self, block_number: int, txs: Iterable[TxSwaps]):
+        intern = self.interner.intern
+        for tx in txs:
+            if self.arbitrage_only and not tx.is_arbitrage:
+                continue
+            searcher = intern(tx.searcher)
+            for pool in dict.fromkeys(tx.pools):
+                self._block.append(block_number)
+                self._pool.append(intern(pool))
+                self._tx_index.append(tx.tx_index)
+                self._searcher.append(searcher)
+
+    def add_blocks(self, blocks: Iterable[Tuple[int, Iterable[TxSwaps]]]) -> 'ContentionIndexBuilder':
+        for block_number, txs in blocks:
+            self.add_block(block_number, txs)
+        return self
+
+    def build(self) -> 'ContentionIndex':
+        return ContentionIndex.from_touches(
+            np.asarray(self._block, dtype=np.int64), np.asarray(self._pool, dtype=np.int32),
+            np.asarray(self._tx_index, dtype=np.int32), np.asarray(self._searcher, dtype=np.int32),
+            self.interner)
+
+
+@dataclass
+class ContentionIndex:
+    touch_pool: np.ndarray      # int32，驻留表ID
+    touch_tx_index: np.ndarray  # int32
+    touch_searcher: np.ndarray  # int32，驻留表ID
+    group_block: np.ndarray     # int64，有序
+    group_pool: np.ndarray      # int32，驻留表ID，同一区块内有序
+    group_offsets: np.ndarray   # int64，长度为分组数+1
+    group_txs: np.ndarray       # int32
+    group_searchers: np.ndarray  # int32
+    interner: AddressInterner
+
+    def __len__(self) -> int:
+        return len(self.group_block)
+
+    @classmethod
+    def from_touches(cls, block: np.ndarray, pool: np.ndarray, tx_index: np.ndarray, searcher: np.ndarray,
+                     interner: AddressInterner) -> 'ContentionIndex':
+        order = np.lexsort((tx_index, pool, block))
+        block, pool, tx_index, searcher = block[order], pool[order], tx_index[order], searcher[order]
+        starts = np.flatnonzero(np.concatenate(([True], (np.diff(block) != 0) | (np.diff(pool) != 0)))) \
+            if len(block) else np.zeros(0, dtype=np.int64)
+        offsets = np.append(starts, len(block)).astype(np.int64)
+
+        # 分组内不同searcher数：对 (分组, searcher) 去重后按分组计数
+        group_id = np.repeat(np.arange(len(starts), dtype=np.int64), np.diff(offsets))
+        pairs = np.unique((group_id << 32) | searcher.astype(np.int64))
+        group_searchers = np.bincount(pairs >> 32, minlength=len(starts)).astype(np.int32)
+        return cls(pool, tx_index, searcher, block[starts], pool[starts], offsets,
+                   np.diff(offsets).astype(np.int32), group_searchers, interner)
+
+    def _group_range(self, start_block: Optional[int], end_block: Optional[int]) -> Tuple[int, int]:
+        lo = 0 if start_block is None else int(np.searchsorted(self.group_block, start_block, 'left'))
+        hi = len(self) if end_block is None else int(np.searchsorted(self.group_block, end_block, 'right'))
+        return lo, max(lo, hi)
+
+    @property
+    def last_block(self) -> Optional[int]:
+        return int(self.group_block[-1]) if len(self) else None
+
+    def pool_touches(self, block_number: int, pool: str) -> List[Tuple[int, str]]:
+        """某个块中swap过该池子的 (交易下标, searcher)，按交易顺序"""
+        pool_id = self.interner.id_of(pool)
+        if pool_id is None:
+            return []
+        lo, hi = self._group_range(block_number, block_number)
+        i = lo + int(np.searchsorted(self.group_pool[lo:hi], pool_id))
+        if i >= hi or self.group_pool[i] != pool_id:
+            return []
+        s, e = self.group_offsets[i], self.group_offsets[i + 1]
+        return list(zip(self.touch_tx_index[s:e].tolist(), self.interner.lookup(self.touch_searcher[s:e].tolist())))
+
+    def top_contended(self, k: int = 20, start_block: int = None, end_block: int = None,
+                      min_searchers: int = 2) -> List[ContendedPool]:
+        """
+        区间内争夺最激烈的k个池子
+
+        按被至少 min_searchers 个不同searcher在同一块内swap的区块数排序，相同时按这些区块中的交易数排序
+        """
+        lo, hi = self._group_range(start_block, end_block)
+        contended = self.group_searchers[lo:hi] >= min_searchers
+        pools = self.group_pool[lo:hi][contended]
+        txs = self.group_txs[lo:hi][contended]
+        n = len(self.interner)
+        blocks = np.bincount(pools, minlength=n)
+        touches = np.bincount(pools, weights=txs, minlength=n).astype(np.int64)
+
+        candidates = np.flatnonzero(blocks)
+        top = candidates[np.lexsort((-touches[candidates], -blocks[candidates]))[:k]]
+        if len(top) == 0:
+            return []
+
+        # 只对前k个池子统计区间内的不同searcher数
+        s, e = self.group_offsets[lo], self.group_offsets[hi]
+        is_top = np.zeros(n, dtype=bool)
+        is_top[top] = True
+        touch_pool = self.touch_pool[s:e]
+        keep = is_top[touch_pool]
+        pairs = np.unique((touch_pool[keep].astype(np.int64) << 32) | self.touch_searcher[s:e][keep])
+        searchers = np.bincount(pairs >> 32, minlength=n)
+
+        return [ContendedPool(self.interner.address(p), int(blocks[p]), int(touches[p]), int(searchers[p]))
+                for p in top.tolist()]
+
+    def save(self, path: str = DEFAULT_INDEX_FILE):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp.npz'
+        np.savez(
+            tmp,
+            touch_pool=self.touch_pool,
+            touch_tx_index=self.touch_tx_index,
+            touch_searcher=self.touch_searcher,
+            group_block=self.group_block,
+            group_pool=self.group_pool,
+            group_offsets=self.group_offsets,
+            group_txs=self.group_txs,
+            group_searchers=self.group_searchers,
+            addresses=np.frombuffer('\n'.join(self.interner.addresses).encode(), dtype=np.uint8),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INDEX_FILE) -> 'ContentionIndex':
+        with np.load(path) as data:
+            addresses = data['addresses'].tobytes().decode()
+            return cls(
+                touch_pool=data['touch_pool'],
+                touch_tx_index=data['touch_tx_index'],
+                touch_searcher=data['touch_searcher'],
+                group_block=data['group_block'],
+                group_pool=data['group_pool'],
+                group_offsets=data['group_offsets'],
+                group_txs=data['group_txs'],
+                group_searchers=data['group_searchers'],
+                interner=AddressInterner(addresses.split('\n') if addresses else ()),
+            )
+
+
+def build_index(blocks: Iterable[Tuple[int, Iterable[TxSwaps]]], arbitrage_only: bool = True) -> ContentionIndex:
+    return ContentionIndexBuilder(arbitrage_only=arbitrage_only).add_blocks(blocks).build()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按区块统计多个searcher争夺的池子')
+    parser.add_argument('start_block', type=int)
+    parser.add_argument('end_block', type=int)
+    parser.add_argument('--source', choices=['cache', 'batches'], default='cache')
+    parser.add_argument('--batches-dir', default=DEFAULT_BATCHES_DIR)
+    parser.add_argument('--pool-cache', default='./data/extended_pool_cache.json',
+                        help='cache数据源时用于过滤未知池子和判断套利')
+    parser.add_argument('--all-txs', action='store_true', help='普通swap交易也计入（仅cache数据源）')
+    parser.add_argument('--index', default=DEFAULT_INDEX_FILE, help='索引文件，存在时直接加载')
+    parser.add_argument('--rebuild', action='store_true')
+    parser.add_argument('--last-blocks', type=int, default=50000)
+    parser.add_argument('--min-searchers', type=int, default=2)
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    if os.path.exists(args.index) and not args.rebuild:
+        index = ContentionIndex.load(args.index)
+        print(f"已加载索引: {args.index}")
+    else:
+        from .backrun import iter_batch_blocks, iter_cache_blocks
+
+        if args.source == 'batches':
+            blocks = iter_batch_blocks(args.batches_dir, args.start_block, args.end_block)
+        else:
+            pools = None
+            if os.path.exists(args.pool_cache):
+                from .pool_registry import PoolRegistry
+                pools = PoolRegistry.load(args.pool_cache)
+            blocks = iter_cache_blocks(args.start_block, args.end_block, pools=pools)
+        index = build_index(blocks, arbitrage_only=not args.all_txs)
+        index.save(args.index)
+        print(f"索引已保存到: {args.index}")
+
+    end_block = min(args.end_block, index.last_block or args.end_block)
+    start_block = max(args.start_block, end_block - args.last_blocks + 1)
+    started = time.perf_counter()
+    top = index.top_contended(args.top, start_block, end_block, args.min_searchers)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    print(f"区块 {start_block}-{end_block}，(区块, 池子) 分组 {len(index)} 个，查询耗时 {elapsed:.1f} ms")
+    print(f"{'池子':<44}{'争夺区块':>10}{'交易数':>10}{'searcher':>10}")
+    for p in top:
+        print(f"{p.pool:<44}{p.contended_blocks:>10}{p.contended_txs:>10}{p.searchers:>10}")
+
+
+if __name__ == "__main__":
+    main()
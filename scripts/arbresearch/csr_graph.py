@@ -0,0 +1,290 @@
+"""
+token-池子二分图的CSR存储
+
+NetworkX 的 dict-of-dicts 图在合并大量trace时内存和速度都成为瓶颈。这里把边先累积到
+扁平数组中，build() 时去重并转成压缩稀疏行（CSR）邻接结构，边属性（函数名、池子类型、
+解码后的价格、原始返回值、观测次数）按列保存。度统计、邻居查询和连通分量都直接在数组上计算，
+只有在需要绘图等场景时才按需导出为 NetworkX 图。
+"""
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from .interner import AddressInterner
+from .trace_cache import ParsedLine, ParsedTrace, default_cache, parse_trace
+from .trace_reader import decode_price
+
+NODE_TOKEN = 0
+NODE_POOL = 1
+
+class _Labels:
+    """字符串 -> 小整数编码，用于函数名和池子类型列"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: str) -> int:
+        idx = self.ids.get(value)
+        if idx is None:
+            idx = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return idx
+
+
+class CSRGraphBuilder:
+    """累积trace中的 token-池子 边，build() 后得到 CSRGraph"""
+
+    def __init__(self, interner: Optional[AddressInterner] = None):
+        self.interner = interner if interner is not None else AddressInterner()
+        self.functions = _Labels()
+        self.pool_types = _Labels()
+        self._token = array('i')
+        self._pool = array('i')
+        self._function = array('h')
+        self._pool_type = array('h')
+        self._price = array('d')
+        # 每行trace的原始返回值，两条边共用，_row 为边对应的行号
+        self._row = array('i')
+        self._results: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._token)
+
+    def add(self, token0: str, token1: str, pool_address: str, pool_type: str,
+            function_name: str, function_result: str):
+        """添加一行trace产生的两条边（token0-池子、token1-池子）"""
+        intern = self.interner.intern
+        pool_id = intern(pool_address)
+        function_code = self.functions.code(function_name)
+        pool_type_code = self.pool_types.code(pool_type)
+        price = decode_price(function_name, function_result)
+        row = len(self._results)
+        self._results.append(function_result)
+        for token in (token0, token1):
+            self._token.append(intern(token))
+            self._pool.append(pool_id)
+            self._function.append(function_code)
+            self._pool_type.append(pool_type_code)
+            self._price.append(price)
+            self._row.append(row)
+
+    def add_trace_file(self, trace_file: str, parse_line: Callable[[str], Optional[ParsedLine]],
+                       allowed_tokens: Optional[Iterable[str]] = None, workers: int = 1) -> int:
+        """
+        用 parse_line 解析文件中的 slot0/getReserves 行并添加，返回添加的行数
+
+        解析结果通过 trace_cache 缓存；workers > 1 时多进程解析，parse_line 需要可以被pickle
+        """
+        return self.add_parsed(parse_trace(trace_file, parse_line, workers, default_cache()), allowed_tokens)
+
+    def add_parsed(self, parsed: ParsedTrace, allowed_tokens: Optional[Iterable[str]] = None) -> int:
+        """按列批量添加 ParsedTrace，每个字符串只驻留一次"""
+        ids = self.interner.intern_many(parsed.strings)
+        token0, token1, pool = ids[parsed.token0], ids[parsed.token1], ids[parsed.pool]
+        keep = np.ones(len(parsed), dtype=bool)
+        if allowed_tokens:
+            allowed = self.interner.intern_many(list(allowed_tokens))
+            keep = np.isin(token0, allowed) & np.isin(token1, allowed)
+        function = np.asarray([self.functions.code(f) for f in parsed.functions], dtype=np.int16)[parsed.function]
+        pool_type = np.asarray([self.pool_types.code(p) for p in parsed.protocols], dtype=np.int16)[parsed.protocol]
+
+        # 每行两条边（token0-池子、token1-池子），与 add 的顺序一致
+        def pairs(column: np.ndarray, dtype) -> bytes:
+            return np.repeat(column[keep].astype(dtype), 2).tobytes()
+
+        self._token.frombytes(np.stack([token0[keep], token1[keep]], axis=1).astype(np.int32).tobytes())
+        self._pool.frombytes(pairs(pool, np.int32))
+        self._function.frombytes(pairs(function, np.int16))
+        self._pool_type.frombytes(pairs(pool_type, np.int16))
+        self._price.frombytes(pairs(parsed.value, np.float64))
+        kept = np.flatnonzero(keep)
+        self._row.frombytes(np.repeat(np.arange(len(self._results), len(self._results) + len(kept)), 2)
+                            .astype(np.int32).tobytes())
+        self._results.extend(parsed.results[i] for i in kept.tolist())
+        return len(kept)
+
+    def build(self) -> 'CSRGraph':
+        token = np.frombuffer(self._token, dtype=np.int32)
+        pool = np.frombuffer(self._pool, dtype=np.int32)
+
+        # 压缩为图内的连续下标，node_ids[i] 为第i个节点的全局地址ID
+        node_ids, inverse = np.unique(np.concatenate([token, pool]), return_inverse=True)
+        src, dst = inverse[:len(token)], inverse[len(token):]
+        kind = np.full(len(node_ids), NODE_TOKEN, dtype=np.int8)
+        kind[dst] = NODE_POOL
+
+        # 同一 (token, 池子) 的多次观测合并为一条边，属性取最后一次观测（与 nx.Graph.add_edge 一致）
+        n = len(node_ids)
+        keys = src.astype(np.int64) * n + dst
+        unique_keys, first, counts = np.unique(keys[::-1], return_index=True, return_counts=True)
+        last = len(keys) - 1 - first
+        edge_token = (unique_keys // n).astype(np.int32)
+        edge_pool = (unique_keys % n).astype(np.int32)
+
+        # 无向图：每条边在两个端点的邻接表中各出现一次，edge_of 保存边编号
+        # （不经过 scipy 构造，避免重复坐标的值被相加）
+        edge_index = np.arange(len(unique_keys), dtype=np.int32)
+        rows = np.concatenate([edge_token, edge_pool])
+        cols = np.concatenate([edge_pool, edge_token])
+        order = np.lexsort((cols, rows))
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=indptr[1:])
+
+        return CSRGraph(
+            interner=self.interner,
+            node_ids=node_ids.astype(np.int32),
+            node_kind=kind,
+            indptr=indptr,
+            indices=cols[order],
+            edge_of=np.concatenate([edge_index, edge_index])[order],
+            edge_token=edge_token,
+            edge_pool=edge_pool,
+            edge_function=np.frombuffer(self._function, dtype=np.int16)[last],
+            edge_pool_type=np.frombuffer(self._pool_type, dtype=np.int16)[last],
+            edge_price=np.frombuffer(self._price, dtype=np.float64)[last],
+            edge_count=counts.astype(np.int32),
+            edge_result=np.frombuffer(self._row, dtype=np.int32)[last],
+            functions=list(self.functions.values),
+            pool_types=list(self.pool_types.values),
+            results=self._results,
+        )
+
+
+class CSRGraph:
+    """只读的 token-池子 无向二分图"""
+
+    def __init__(self, interner: AddressInterner, node_ids: np.ndarray, node_kind: np.ndarray,
+                 indptr: np.ndarray, indices: np.ndarray, edge_of: np.ndarray,
+                 edge_token: np.ndarray, edge_pool: np.ndarray, edge_function: np.ndarray,
+                 edge_pool_type: np.ndarray, edge_price: np.ndarray, edge_count: np.ndarray,
+                 edge_result: np.ndarray, functions: List[str], pool_types: List[str], results: List[str]):
+        self.interner = interner
+        self.node_ids = node_ids          # int32, 图内下标 -> 全局地址ID（有序）
+        self.node_kind = node_kind        # int8, NODE_TOKEN / NODE_POOL
+        self.indptr = indptr              # 节点i的邻居为 indices[indptr[i]:indptr[i+1]]
+        self.indices = indices
+        self.edge_of = edge_of            # 与indices对齐的边编号
+        self.edge_token = edge_token
+        self.edge_pool = edge_pool
+        self.edge_function = edge_function
+        self.edge_pool_type = edge_pool_type
+        self.edge_price = edge_price
+        self.edge_count = edge_count      # 同一边被观测到的次数
+        self.edge_result = edge_result    # results 的下标，最后一次观测的原始返回值
+        self.functions = functions
+        self.pool_types = pool_types
+        self.results = results
+
+    @property
+    def number_of_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def number_of_edges(self) -> int:
+        return len(self.edge_token)
+
+    def node_index(self, node: Union[str, int]) -> Optional[int]:
+        """地址 -> 图内下标，不在图中时返回None"""
+        address_id = self.interner.id_of(node) if isinstance(node, str) else node
+        if address_id is None:
+            return None
+        i = int(np.searchsorted(self.node_ids, address_id))
+        if i < len(self.node_ids) and self.node_ids[i] == address_id:
+            return i
+        return None
+
+    def address(self, i: int) -> str:
+        return self.interner.address(int(self.node_ids[i]))
+
+    def degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def degree_stats(self) -> Dict[str, Dict[str, float]]:
+        """按节点类型统计度分布"""
+        degree = self.degree()
+        stats = {}
+        for name, kind in (('token', NODE_TOKEN), ('pool', NODE_POOL)):
+            d = degree[self.node_kind == kind]
+            if len(d) == 0:
+                continue
+            stats[name] = {
+                'count': int(len(d)),
+                'min': int(d.min()),
+                'max': int(d.max()),
+                'mean': float(d.mean()),
+                'median': float(np.median(d)),
+            }
+        return stats
+
+    def top_degree(self, kind: int = NODE_TOKEN, n: int = 10) -> List[Tuple[str, int]]:
+        degree = self.degree()
+        candidates = np.flatnonzero(self.node_kind == kind)
+        order = candidates[np.argsort(-degree[candidates], kind='stable')[:n]]
+        return [(self.address(i), int(degree[i])) for i in order]
+
+    def neighbors(self, node: Union[str, int]) -> List[str]:
+        i = self.node_index(node)
+        if i is None:
+            return []
+        return [self.address(j) for j in self.indices[self.indptr[i]:self.indptr[i + 1]]]
+
+    def edges_of(self, node: Union[str, int]) -> np.ndarray:
+        """与节点相连的边编号，可用于索引 edge_* 列"""
+        i = self.node_index(node)
+        if i is None:
+            return np.empty(0, dtype=np.int32)
+        return self.edge_of[self.indptr[i]:self.indptr[i + 1]]
+
+    def _adjacency(self) -> sparse.csr_matrix:
+        n = self.number_of_nodes
+        return sparse.csr_matrix((np.ones(len(self.indices), dtype=np.int8), self.indices, self.indptr),
+                                 shape=(n, n))
+
+    def connected_components(self) -> Tuple[int, np.ndarray]:
+        """返回 (分量数, 每个节点所属分量编号)"""
+        return csgraph.connected_components(self._adjacency(), directed=False)
+
+    def component_sizes(self) -> np.ndarray:
+        """各连通分量的节点数，从大到小排列"""
+        _, labels = self.connected_components()
+        return np.sort(np.bincount(labels))[::-1]
+
+    def to_networkx(self, nodes: Optional[Iterable[Union[str, int]]] = None):
+        """
+        导出为 nx.Graph，节点为地址字符串
+
+        节点和边带有 create_graph_from_trace 的属性（type/pool_type/address，function/result），
+        边上另有解码后的价格 price 和观测次数 count。指定nodes时只导出这些节点及其之间的边
+        """
+        import networkx as nx
+
+        if nodes is None:
+            keep = np.ones(self.number_of_nodes, dtype=bool)
+        else:
+            keep = np.zeros(self.number_of_nodes, dtype=bool)
+            for node in nodes:
+                i = self.node_index(node)
+                if i is not None:
+                    keep[i] = True
+
+        G = nx.Graph()
+        # 每个池子的类型取其任一条边上记录的类型
+        pool_type_of = np.full(self.number_of_nodes, -1, dtype=np.int32)
+        pool_type_of[self.edge_pool] = self.edge_pool_type
+        for i in np.flatnonzero(keep):
+            if self.node_kind[i] == NODE_TOKEN:
+                G.add_node(self.address(i), type='token', address=self.address(i))
+            else:
+                G.add_node(self.address(i), type='pool', pool_type=self.pool_types[pool_type_of[i]],
+                           address=self.address(i))
+        for e in np.flatnonzero(keep[self.edge_token] & keep[self.edge_pool]):
+            G.add_edge(self.address(self.edge_token[e]), self.address(self.edge_pool[e]),
+                       function=self.functions[self.edge_function[e]],
+                       result=self.results[self.edge_result[e]],
+                       price=float(self.edge_price[e]),
+                       count=int(self.edge_count[e]))
+        return G
@@ -0,0 +1,324 @@
+"""
+从交易内按顺序排列的swap事件重建套利环和各地址的代币余额变化
+
+逻辑与 src/lib/chain/arb.helper.ts 中的 buildSwapGraph / validateSwapGraphTokenChanges /
+findArbitrageCycles / analyzeTokenTransfers 保持一致。批量处理时先把所有token和池子
+编码为整数，内层的图搜索只在整数键上进行。
+"""
+import json
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .constants import DEFAULT_BATCHES_DIR, LOG_TOPICS, WETH_ADDRESS
+from .interner import AddressInterner
+
+
+@dataclass
+class SwapBatch:
+    """
+    多笔交易的swap事件，按交易拼接成扁平数组
+
+    第i笔交易的事件为 [tx_offsets[i], tx_offsets[i+1])
+    """
+    tx_offsets: np.ndarray      # int64, 长度为交易数+1
+    token_in: np.ndarray        # int32
+    token_out: np.ndarray       # int32
+    pool: np.ndarray            # int32
+    protocol: np.ndarray        # int32
+    amount_in: List[int]        # 精确金额
+    amount_out: List[int]
+    tokens: List[str]
+    pools: List[str]
+    protocols: List[str]
+
+    def __len__(self) -> int:
+        return len(self.tx_offsets) - 1
+
+    @classmethod
+    def from_swap_events(cls, txs_events: Iterable[Sequence[Dict[str, Any]]],
+                         interner: Optional[AddressInterner] = None) -> 'SwapBatch':
+        """
+        从每笔交易的 StandardSwapEvent 字典列表构建（即batch文件中的 swapEvents）
+
+        传入共享的interner时，token和池子ID使用同一个全局地址ID空间
+        """
+        if interner is not None:
+            tokens = pools = interner
+        else:
+            tokens, pools = AddressInterner(), AddressInterner()
+        protocols = AddressInterner()
+        offsets = [0]
+        token_in, token_out, pool, protocol = [], [], [], []
+        amount_in, amount_out = [], []
+        for events in txs_events:
+            for event in events:
+                token_in.append(tokens.intern(event['tokenIn']))
+                token_out.append(tokens.intern(event['tokenOut']))
+                pool.append(pools.intern(event['poolAddress']))
+                protocol.append(protocols.intern(event['protocol']))
+                amount_in.append(int(event['amountIn']))
+                amount_out.append(int(event['amountOut']))
+            offsets.append(len(token_in))
+        return cls(
+            tx_offsets=np.asarray(offsets, dtype=np.int64),
+            token_in=np.asarray(token_in, dtype=np.int32),
+            token_out=np.asarray(token_out, dtype=np.int32),
+            pool=np.asarray(pool, dtype=np.int32),
+            protocol=np.asarray(protocol, dtype=np.int32),
+            amount_in=amount_in,
+            amount_out=amount_out,
+            tokens=tokens.addresses,
+            pools=pools.addresses,
+            protocols=protocols.addresses,
+        )
+
+
+@dataclass
+class ArbitrageRules:
+    """判定规则，默认与TS的 analyzeTransaction 一致"""
+    # 多个token为正时优先作为利润token的地址
+    preferred_profit_token: str = WETH_ADDRESS
+    # True 时与 getArbitrageInfo 一致，要求至少找到一个环
+    require_cycles: bool = False
+    # 单个环最多经过的边数，None表示不限制
+    max_cycle_length: Optional[int] = None
+
+
+@dataclass
+class _Edge:
+    amount_in: int
+    amount_out: int
+    pool: int
+    protocol: int
+
+
+def _find_cycle(graph: Dict[int, Dict[int, _Edge]], start: int, current: int, visited: set,
+                edges: List[Tuple[int, int, _Edge]], max_length: Optional[int]):
+    if edges and current == start:
+        changes: Dict[int, int] = {}
+        for token_in, token_out, edge in edges:
+            changes[token_in] = changes.get(token_in, 0) - edge.amount_in
+            changes[token_out] = changes.get(token_out, 0) + edge.amount_out
+        profit_token, max_profit = None, 0
+        for token, change in changes.items():
+            if change < 0:
+                return None
+            if change > max_profit:
+                profit_token, max_profit = token, change
+        if profit_token is None:
+            return None
+        return list(edges), profit_token, max_profit, changes
+
+    if current in visited or (max_length is not None and len(edges) >= max_length):
+        return None
+
+    visited.add(current)
+    for next_token, edge in graph.get(current, {}).items():
+        edges.append((current, next_token, edge))
+        cycle = _find_cycle(graph, start, next_token, visited, edges, max_length)
+        edges.pop()
+        if cycle:
+            return cycle
+    visited.discard(current)
+    return None
+
+
+class CycleReconstructor:
+    """批量重建套利信息"""
+
+    def __init__(self, rules: ArbitrageRules = None):
+        self.rules = rules or ArbitrageRules()
+
+    def _tx_cycles(self, batch: SwapBatch, lo: int, hi: int):
+        graph: Dict[int, Dict[int, _Edge]] = {}
+        cycles = []
+        for i in range(lo, hi):
+            token_in, token_out = int(batch.token_in[i]), int(batch.token_out[i])
+            edges = graph.setdefault(token_in, {})
+            existing = edges.get(token_out)
+            if existing:
+                edges[token_out] = _Edge(existing.amount_in + batch.amount_in[i],
+                                         existing.amount_out + batch.amount_out[i],
+                                         int(batch.pool[i]), int(batch.protocol[i]))
+            else:
+                edges[token_out] = _Edge(batch.amount_in[i], batch.amount_out[i],
+                                         int(batch.pool[i]), int(batch.protocol[i]))
+
+            cycle = _find_cycle(graph, token_in, token_in, set(), [], self.rules.max_cycle_length)
+            if cycle:
+                cycles.append(cycle)
+                # 移除环中使用的边
+                for edge_in, edge_out, _ in cycle[0]:
+                    out_edges = graph.get(edge_in)
+                    if out_edges is not None:
+                        out_edges.pop(edge_out, None)
+                        if not out_edges:
+                            del graph[edge_in]
+        return cycles
+
+    def _graph_token_changes(self, batch: SwapBatch, lo: int, hi: int) -> Dict[int, int]:
+        # 与buildSwapGraph + calculateSwapGraphTokenChanges 等价，token的遍历顺序也保持一致
+        graph: Dict[int, Dict[int, None]] = {}
+        for i in range(lo, hi):
+            graph.setdefault(int(batch.token_in[i]), {})[int(batch.token_out[i])] = None
+        changes: Dict[int, int] = {}
+        for token_in, outs in graph.items():
+            changes.setdefault(token_in, 0)
+            for token_out in outs:
+                changes.setdefault(token_out, 0)
+        for i in range(lo, hi):
+            changes[int(batch.token_in[i])] -= batch.amount_in[i]
+            changes[int(batch.token_out[i])] += batch.amount_out[i]
+        return changes
+
+    def reconstruct(self, batch: SwapBatch) -> List[Optional[Dict[str, Any]]]:
+        """
+        返回每笔交易的套利信息，结构与TS的 arbitrageInfo 中
+        profit / arbitrageCycles / cyclesLength 以及 tokenChanges 一致；不是套利时为None
+        """
+        tokens, pools, protocols = batch.tokens, batch.pools, batch.protocols
+        preferred = self.rules.preferred_profit_token.lower()
+        results: List[Optional[Dict[str, Any]]] = []
+
+        for tx in range(len(batch)):
+            lo, hi = int(batch.tx_offsets[tx]), int(batch.tx_offsets[tx + 1])
+            if lo == hi:
+                results.append(None)
+                continue
+
+            changes = self._graph_token_changes(batch, lo, hi)
+            profit_token = None
+            valid = True
+            for token, change in changes.items():
+                if change < 0:
+                    valid = False
+                    break
+                if change > 0 and (profit_token is None or tokens[token].lower() == preferred):
+                    profit_token = token
+            if not valid or profit_token is None:
+                results.append(None)
+                continue
+
+            cycles = self._tx_cycles(batch, lo, hi)
+            if self.rules.require_cycles and not cycles:
+                results.append(None)
+                continue
+
+            results.append({
+                'arbitrageCycles': [{
+                    'edges': [{
+                        'tokenIn': tokens[edge_in],
+                        'tokenOut': tokens[edge_out],
+                        'amountIn': str(edge.amount_in),
+                        'amountOut': str(edge.amount_out),
+                        'poolAddress': pools[edge.pool],
+                        'protocol': protocols[edge.protocol],
+                    } for edge_in, edge_out, edge in edges],
+                    'profitToken': tokens[cycle_token],
+                    'profitAmount': str(cycle_profit),
+                    'tokenChanges': {tokens[t]: str(c) for t, c in cycle_changes.items()},
+                } for edges, cycle_token, cycle_profit, cycle_changes in cycles],
+                'cyclesLength': len(cycles),
+                'profit': {
+                    'token': tokens[profit_token],
+                    'amount': str(changes[profit_token]),
+                },
+                'tokenChanges': {tokens[t]: str(c) for t, c in changes.items()},
+            })
+        return results
+
+
+def decode_transfers(topic0: Any, address: Any, data: Any, topic1: Any, topic2: Any):
+    """
+    批量解码ERC20 Transfer日志
+
+    Returns:
+        (日志下标, token, from, to, amount)，地址为 (n, 20) uint8，amount为精确整数列表
+    """
+    from .swap_decoder import _fixed_width, _flat_binary, _gather_rows, _limbs, limbs_to_int
+
+    topics = np.ascontiguousarray(_fixed_width(topic0, 32)).view('<u8')
+    signature = np.frombuffer(bytes.fromhex(LOG_TOPICS['Transfer'][2:]), dtype=np.uint8).view('<u8')
+    buf, offsets = _flat_binary(data)
+    # ERC721的Transfer也是同一个topic，但tokenId在topic3中、data为空
+    selected = np.flatnonzero((topics == signature).all(axis=1) & (offsets[1:] - offsets[:-1] >= 32))
+    token = _fixed_width(address, 20)[selected]
+    sender = _fixed_width(topic1, 32)[selected, 12:]
+    receiver = _fixed_width(topic2, 32)[selected, 12:]
+    amount = limbs_to_int(_limbs(_gather_rows(buf, offsets[selected], 32), 0))
+    return selected, token, sender, receiver, amount
+
+
+def address_token_changes(tx_ids: np.ndarray, token: np.ndarray, sender: np.ndarray,
+                          receiver: np.ndarray, amount: Sequence[int]) -> Dict[int, Dict[str, List[Dict[str, str]]]]:
+    """
+    按交易统计每个地址的代币净变化（排除铸造和销毁的零地址一侧）
+
+    Args:
+        tx_ids: 每条Transfer所属的交易编号
+        token/sender/receiver: decode_transfers 返回的 (n, 20) 地址矩阵
+    Returns:
+        交易编号 -> {地址: [{token, change}]}，与TS的 addressTokenChanges 结构一致
+    """
+    from .swap_decoder import _address_hex
+
+    n = len(tx_ids)
+    # 每条Transfer拆成两条记录：from减少、to增加
+    holders = np.concatenate([sender, receiver])
+    tokens = np.concatenate([token, token])
+    txs = np.concatenate([tx_ids, tx_ids])
+    signs = np.concatenate([np.full(n, -1), np.full(n, 1)])
+    keep = holders.any(axis=1)
+
+    holder_hex = np.asarray(_address_hex(holders), dtype=object)
+    token_hex = np.asarray(_address_hex(tokens), dtype=object)
+    holder_names, holder_codes = np.unique(holder_hex, return_inverse=True)
+    token_names, token_codes = np.unique(token_hex, return_inverse=True)
+
+    # 以 (交易, 地址, token) 分组，组内按出现顺序累加精确金额
+    key = (txs.astype(np.int64) * len(holder_names) + holder_codes) * len(token_names) + token_codes
+    groups, group_of = np.unique(key[keep], return_inverse=True)
+    totals = [0] * len(groups)
+    amounts = list(amount) * 2
+    for g, row, sign in zip(group_of, np.flatnonzero(keep), signs[keep]):
+        totals[g] += int(sign) * amounts[row]
+
+    result: Dict[int, Dict[str, List[Dict[str, str]]]] = {}
+    for g, k in enumerate(groups):
+        k, token_code = divmod(int(k), len(token_names))
+        tx, holder_code = divmod(k, len(holder_names))
+        changes = result.setdefault(tx, {}).setdefault(holder_names[holder_code], [])
+        changes.append({'token': token_names[token_code], 'change': str(totals[g])})
+    return result
+
+
+def main():
+    from .batches import iter_arbitrage_transactions
+
+    batches_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_BATCHES_DIR
+    txs = [tx for _, _, tx in iter_arbitrage_transactions(batches_dir)]
+    batch = SwapBatch.from_swap_events(tx['swapEvents'] for tx in txs)
+    print(f"交易数: {len(batch)}, swap事件数: {len(batch.token_in)}, token数: {len(batch.tokens)}")
+
+    results = CycleReconstructor().reconstruct(batch)
+
+    # 与TS批处理结果对比
+    same_profit = same_cycles = 0
+    for tx, result in zip(txs, results):
+        if result is None:
+            continue
+        info = tx['arbitrageInfo']
+        same_profit += result['profit'] == {'token': info['profit']['token'], 'amount': info['profit']['amount']}
+        same_cycles += result['cyclesLength'] == len(info['arbitrageCycles'])
+    identified = sum(r is not None for r in results)
+    print(f"识别为套利: {identified}")
+    print(f"利润与TS一致: {same_profit}, 环数量与TS一致: {same_cycles}")
+    if results and results[0] is not None:
+        print(json.dumps(results[0], indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
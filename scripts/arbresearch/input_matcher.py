@@ -0,0 +1,340 @@
+"""
+用多模式前缀索引批量判断交易input中是否出现池子地址、token地址和金额
+
+匹配语义与 src/lib/arbAnalyzer/swapEventAnalyzer.ts 的 analyzeSwapInput 一致：
+
+- 池子/token地址：去掉0x的小写十六进制，按任意十六进制字符位置匹配，计数为不重叠的出现次数（与 RegExp 'g' 一致）
+- 金额：amount.toString(16)，只要在input中出现即算找到
+- 池子按swap事件计数（同一池子出现多次时重复计入），token按去重后的集合计数
+
+一组交易的input用分隔符拼接后只扫描一次：把每个位置开始的8个十六进制字符打包成uint32，
+先用所有模式前缀的高24位位图粗筛，再按 (交易, 前缀) 在排序数组中查找该交易自己的模式，
+最后逐字符向量化校验完整模式。不足8个字符的模式（很小的金额）直接用 str.find 查找。
+偏移量为去掉0x后的十六进制字符下标，包含所有（可重叠的）出现位置。
+
+（逐字符推进的 Aho–Corasick 自动机在NumPy中每个字符都要一次Python级循环，实测比逐个 str.find 还慢，
+且其他交易的短金额模式会在补零区域产生大量无关命中，因此改用按交易过滤的前缀索引。）
+
+    PYTHONPATH=scripts python -m arbresearch.input_matcher [batches目录] [进程数]
+"""
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import chain
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .constants import DEFAULT_BATCHES_DIR
+
+POOL, TOKEN, AMOUNT = 0, 1, 2
+_INVALID = 16
+# 前缀索引的键长度：8个十六进制字符（32位），更短的模式直接在input中查找
+PREFIX = 8
+
+# flagStats 的分类，下标为 poolsMatch | tokensMatch << 1 | amountsMatch << 2
+FLAG_CATEGORIES = ['allNotMatch', 'poolsMatch', 'tokensMatch', 'poolsAndTokensMatch',
+                   'amountsMatch', 'poolsAndAmountsMatch', 'tokensAndAmountsMatch', 'allMatch']
+
+_NIBBLES = np.full(256, _INVALID, dtype=np.uint8)
+for _i, _c in enumerate(b'0123456789abcdef'):
+    _NIBBLES[_c] = _i
+for _i, _c in enumerate(b'ABCDEF'):
+    _NIBBLES[_c] = 10 + _i
+
+
+def _strip(value: str) -> str:
+    value = value.lower()
+    return value[2:] if value.startswith('0x') else value
+
+
+def _patterns(swap_events: Sequence[Dict[str, Any]]) -> Tuple[List[str], int]:
+    """池子、去重后的token、金额依次排列的模式列表，以及token的个数"""
+    # 与TS的 toLowerCase().replace('0x', '') 一致
+    patterns = [event['poolAddress'].lower().replace('0x', '', 1) for event in swap_events]
+    tokens = dict.fromkeys(event[key].lower().replace('0x', '', 1)
+                           for event in swap_events for key in ('tokenIn', 'tokenOut'))
+    patterns += tokens
+    patterns += [format(int(event[key]), 'x') for event in swap_events for key in ('amountIn', 'amountOut')]
+    return patterns, len(tokens)
+
+
+def transaction_patterns(swap_events: Sequence[Dict[str, Any]]) -> List[Tuple[int, str]]:
+    """一笔交易需要查找的 (类型, 模式)，顺序与TS的统计顺序一致"""
+    patterns, n_tokens = _patterns(swap_events)
+    n_pools = len(swap_events)
+    kinds = [POOL] * n_pools + [TOKEN] * n_tokens + [AMOUNT] * (len(patterns) - n_pools - n_tokens)
+    return list(zip(kinds, patterns))
+
+
+@dataclass
+class InputMatches:
+    """每笔交易的三个标志，以及属于该交易的所有匹配（按交易、偏移排序）"""
+    pools_match: np.ndarray     # bool
+    tokens_match: np.ndarray    # bool
+    amounts_match: np.ndarray   # bool
+    match_tx: np.ndarray        # int64
+    match_kind: np.ndarray      # int8，POOL/TOKEN/AMOUNT
+    match_pattern: np.ndarray   # int64，patterns 的下标
+    match_offset: np.ndarray    # int64，十六进制字符偏移
+    patterns: List[str]
+
+    def __len__(self) -> int:
+        return len(self.pools_match)
+
+    def flag_category(self) -> np.ndarray:
+        """FLAG_CATEGORIES 的下标"""
+        return (self.pools_match.astype(np.int8) | self.tokens_match.astype(np.int8) << 1
+                | self.amounts_match.astype(np.int8) << 2)
+
+    def flag_stats(self, mask: np.ndarray = None) -> Dict[str, int]:
+        """与 analysis_report.json 的 flagStats 结构一致"""
+        category = self.flag_category()
+        if mask is not None:
+            category = category[mask]
+        counts = np.bincount(category, minlength=len(FLAG_CATEGORIES))
+        return {name: int(counts[i]) for i, name in enumerate(FLAG_CATEGORIES)}
+
+    def offsets(self, tx: int, kind: int = None) -> List[Tuple[str, int]]:
+        """一笔交易的 (模式, 偏移) 列表"""
+        lo, hi = np.searchsorted(self.match_tx, [tx, tx + 1])
+        return [(self.patterns[p], int(o))
+                for k, p, o in zip(self.match_kind[lo:hi], self.match_pattern[lo:hi], self.match_offset[lo:hi])
+                if kind is None or k == kind]
+
+    def input_analysis(self, tx: int, swap_events: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        """还原TS analyzeSwapInput 的返回结构（金额为十进制字符串）"""
+        found: Dict[Tuple[int, str], List[int]] = {}
+        for kind in (POOL, TOKEN, AMOUNT):
+            for pattern, offset in self.offsets(tx, kind):
+                found.setdefault((kind, pattern), []).append(offset)
+
+        def count(kind: int, pattern: str) -> int:
+            # 与 RegExp 'g' 一致，只统计不重叠的出现
+            n, end = 0, -1
+            for offset in found.get((kind, pattern), []):
+                if offset >= end:
+                    n, end = n + 1, offset + len(pattern)
+            return n
+
+        patterns = transaction_patterns(swap_events)
+        pools = [pattern for kind, pattern in patterns if kind == POOL]
+        tokens = [pattern for kind, pattern in patterns if kind == TOKEN]
+        amounts = {'inputAmounts': [], 'outputAmounts': []}
+        for event in swap_events:
+            for side, key in (('inputAmounts', 'amountIn'), ('outputAmounts', 'amountOut')):
+                hex_format = format(int(event[key]), 'x')
+                amounts[side].append({'amount': str(event[key]), 'found': (AMOUNT, hex_format) in found,
+                                      'hexFormat': hex_format})
+        return {
+            'flags': {
+                'poolsMatch': bool(self.pools_match[tx]),
+                'tokensMatch': bool(self.tokens_match[tx]),
+                'amountsMatch': bool(self.amounts_match[tx]),
+            },
+            'poolAnalysis': {'total': len(pools), 'found': sum(count(POOL, p) > 0 for p in pools),
+                             'details': {p: count(POOL, p) for p in pools}},
+            'tokenAnalysis': {'total': len(tokens), 'found': sum(count(TOKEN, t) > 0 for t in tokens),
+                              'details': {t: count(TOKEN, t) for t in tokens}},
+            'amounts': amounts,
+        }
+
+
+def _find_all(text: str, pattern: str) -> List[int]:
+    offsets = []
+    i = text.find(pattern)
+    while i >= 0:
+        offsets.append(i)
+        i = text.find(pattern, i + 1)
+    return offsets
+
+
+def _pack_windows(nibbles: np.ndarray) -> np.ndarray:
+    """每个位置开始的 PREFIX 个十六进制字符打包成uint32（非法字符按0参与，之后逐字符校验时排除）"""
+    v = (nibbles & 0xF).astype(np.uint32)
+    w2 = v[:-1] << 4 | v[1:]
+    w4 = w2[:-2] << 8 | w2[2:]
+    return w4[:-4] << 16 | w4[4:]
+
+
+def _match_chunk(inputs: Sequence[str], swap_events: Sequence[Sequence[Dict[str, Any]]]):
+    """
+    处理一组交易
+
+    Returns:
+        (flags (3, n), 交易下标, 类型, 模式下标, 偏移, 模式列表)，模式下标指向本组的模式列表
+    """
+    n = len(inputs)
+    texts = [_strip(text) for text in inputs]
+    flags = np.zeros((3, n), dtype=bool)
+
+    # 每笔交易的模式依次为 池子 * 事件数、token * n_tokens、金额 * 2 * 事件数
+    per_tx = [_patterns(events) for events in swap_events]
+    flat = list(chain.from_iterable(patterns for patterns, _ in per_tx))
+    pattern_ids = {pattern: i for i, pattern in enumerate(dict.fromkeys(flat))}
+    patterns = list(pattern_ids)
+    prefixes = np.fromiter((int(pattern[:PREFIX], 16) if len(pattern) >= PREFIX else -1 for pattern in patterns),
+                           dtype=np.int64, count=len(patterns))
+    pids = np.fromiter(map(pattern_ids.__getitem__, flat), dtype=np.int64, count=len(flat))
+    n_events = np.fromiter(map(len, swap_events), dtype=np.int64, count=n)
+    n_tokens = np.fromiter((count for _, count in per_tx), dtype=np.int64, count=n)
+    kinds = np.repeat(np.tile([POOL, TOKEN, AMOUNT], n), np.stack([n_events, n_tokens, 2 * n_events], axis=1).ravel())
+    tx_ids = np.repeat(np.arange(n), n_events * 3 + n_tokens)
+    # 同一交易中重复的 (类型, 模式) 只保留一次
+    owner_keys = np.unique(((tx_ids * 3 + kinds) << 40) | pids)
+    owner_tx, owner_kind = np.divmod(owner_keys >> 40, 3)
+    owner_pattern = owner_keys & ((1 << 40) - 1)
+    owner_prefix = prefixes[owner_pattern]
+
+    # 短模式直接查找
+    short = {name: [] for name in ('tx', 'kind', 'pattern', 'offset')}
+    for tx, kind, pid in zip(*(column[owner_prefix < 0].tolist() for column in (owner_tx, owner_kind, owner_pattern))):
+        offsets = _find_all(texts[tx], patterns[pid])
+        if offsets:
+            short['tx'] += [tx] * len(offsets)
+            short['kind'] += [kind] * len(offsets)
+            short['pattern'] += [pid] * len(offsets)
+            short['offset'] += offsets
+            flags[kind, tx] = True
+    short = [np.asarray(short[name], dtype=np.int8 if name == 'kind' else np.int64)
+             for name in ('tx', 'kind', 'pattern', 'offset')]
+    indexed = owner_prefix >= 0
+    if not indexed.any():
+        return (flags, *short, patterns)
+    owner_tx, owner_kind = owner_tx[indexed], owner_kind[indexed].astype(np.int8)
+    owner_pattern, owner_prefix = owner_pattern[indexed], owner_prefix[indexed]
+
+    # 所有input用非法字符隔开后拼接，第i笔交易从 starts[i] 开始
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=n)
+    starts = np.zeros(n, dtype=np.int64)
+    np.cumsum(lengths[:-1] + 1, out=starts[1:])
+    joined = 'g'.join(texts) + 'g' * PREFIX
+    nibbles = _NIBBLES[np.frombuffer(joined.encode('ascii', 'replace'), dtype=np.uint8)]
+    windows = _pack_windows(nibbles)
+
+    # 先用前缀高24位的位图粗筛，再按 (交易, 前缀) 精确查找该交易自己的模式
+    bitmap = np.zeros(1 << 24, dtype=bool)
+    bitmap[owner_prefix >> 8] = True
+    positions = np.flatnonzero(bitmap[windows >> 8])
+    position_tx = np.searchsorted(starts, positions, side='right') - 1
+    keys = position_tx << 32 | windows[positions].astype(np.int64)
+    owner_keys = owner_tx << 32 | owner_prefix
+    order = np.argsort(owner_keys, kind='stable')
+    owner_keys = owner_keys[order]
+    first = np.searchsorted(owner_keys, keys, side='left')
+    count = np.searchsorted(owner_keys, keys, side='right') - first
+    # 同一前缀可能对应该交易的多个模式，逐个展开
+    candidate = np.repeat(np.arange(len(positions)), count)
+    owner = order[np.repeat(first, count) + np.arange(len(candidate)) - np.repeat(np.cumsum(count) - count, count)]
+    positions, position_tx = positions[candidate], position_tx[candidate]
+
+    # 逐字符校验完整模式：取出候选位置之后的 max_len 个字符与模式矩阵比较，超出模式长度的列视为相等
+    pid = owner_pattern[owner]
+    unique_pids, local = np.unique(pid, return_inverse=True)
+    pattern_texts = [patterns[i] for i in unique_pids.tolist()]
+    pattern_lengths = np.fromiter(map(len, pattern_texts), dtype=np.int64, count=len(pattern_texts))
+    max_len = int(pattern_lengths.max(initial=0))
+    pattern_nibbles = np.full((len(pattern_texts), max_len), _INVALID, dtype=np.uint8)
+    if len(pattern_texts):
+        raw = np.frombuffer(''.join(pattern_texts).encode('ascii'), dtype=np.uint8)
+        rows = np.repeat(np.arange(len(pattern_texts)), pattern_lengths)
+        cols = np.arange(len(raw)) - np.repeat(np.cumsum(pattern_lengths) - pattern_lengths, pattern_lengths)
+        pattern_nibbles[rows, cols] = _NIBBLES[raw]
+    matched = np.zeros(len(positions), dtype=bool)
+    tail = np.arange(max_len)
+    for block in range(0, len(positions), 65536):
+        rows = slice(block, block + 65536)
+        window = nibbles[np.minimum(positions[rows, None] + tail, len(nibbles) - 1)]
+        equal = (window == pattern_nibbles[local[rows]]) | (tail >= pattern_lengths[local[rows], None])
+        matched[rows] = equal.all(axis=1)
+
+    tx = position_tx[matched]
+    kind = owner_kind[owner[matched]]
+    for k in (POOL, TOKEN, AMOUNT):
+        flags[k, tx[kind == k]] = True
+    return (flags,
+            np.concatenate([tx, short[0]]),
+            np.concatenate([kind, short[1]]),
+            np.concatenate([pid[matched], short[2]]),
+            np.concatenate([positions[matched] - starts[tx], short[3]]),
+            patterns)
+
+
+def _match_chunk_args(args):
+    return _match_chunk(*args)
+
+
+def match_transactions(inputs: Sequence[str], swap_events: Sequence[Sequence[Dict[str, Any]]],
+                       chunk_size: int = 16384, workers: int = 1) -> InputMatches:
+    """
+    批量计算每笔交易input中的池子/token/金额匹配
+
+    每 chunk_size 笔交易共用一个索引，限制中间数组的大小；workers > 1 时各组用多进程处理
+    """
+    n = len(inputs)
+    bounds = [(lo, min(lo + chunk_size, n)) for lo in range(0, n, chunk_size)]
+    chunks = ((inputs[lo:hi], swap_events[lo:hi]) for lo, hi in bounds)
+    if workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(_match_chunk_args, chunks)
+    else:
+        executor = None
+        results = map(_match_chunk_args, chunks)
+
+    pattern_ids: Dict[str, int] = {}
+    flags = np.zeros((3, n), dtype=bool)
+    parts = {name: [] for name in ('tx', 'kind', 'pattern', 'offset')}
+    try:
+        for (lo, hi), (chunk_flags, tx, kind, pid, offset, patterns) in zip(bounds, results):
+            # 各组的模式下标映射到全局
+            global_ids = np.fromiter((pattern_ids.setdefault(p, len(pattern_ids)) for p in patterns),
+                                     dtype=np.int64, count=len(patterns))
+            flags[:, lo:hi] = chunk_flags
+            parts['tx'].append(lo + tx)
+            parts['kind'].append(kind)
+            parts['pattern'].append(global_ids[pid])
+            parts['offset'].append(offset)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    columns = {name: np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int64)
+               for name, chunks in parts.items()}
+    order = np.lexsort((columns['offset'], columns['tx']))
+    return InputMatches(
+        pools_match=flags[POOL],
+        tokens_match=flags[TOKEN],
+        amounts_match=flags[AMOUNT],
+        match_tx=columns['tx'][order],
+        match_kind=columns['kind'][order].astype(np.int8),
+        match_pattern=columns['pattern'][order],
+        match_offset=columns['offset'][order],
+        patterns=list(pattern_ids),
+    )
+
+
+def main():
+    from .batches import iter_arbitrage_transactions
+
+    batches_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_BATCHES_DIR
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    txs = [tx for _, _, tx in iter_arbitrage_transactions(batches_dir)]
+    start = time.perf_counter()
+    matches = match_transactions([tx['input'] for tx in txs], [tx['swapEvents'] for tx in txs], workers=workers)
+    elapsed = time.perf_counter() - start
+    print(f"交易数: {len(matches)}, 匹配数: {len(matches.match_tx)}, 耗时: {elapsed:.2f}s")
+    print(matches.flag_stats())
+
+    # 与TS批处理结果对比
+    labelled = [i for i, tx in enumerate(txs) if 'inputAnalysis' in tx]
+    same = sum(
+        (bool(matches.pools_match[i]), bool(matches.tokens_match[i]), bool(matches.amounts_match[i]))
+        == tuple(txs[i]['inputAnalysis']['flags'][name] for name in ('poolsMatch', 'tokensMatch', 'amountsMatch'))
+        for i in labelled
+    )
+    print(f"与TS标志一致: {same}/{len(labelled)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+地址驻留表：把地址字符串映射为连续的int32 ID
+
+图、统计表等内部结构只保存ID，按ID做哈希、比较和group-by，输出时再转换回地址。
+地址不区分大小写（以小写形式作为键），输出时使用第一次出现的写法，CSV、Neo4j节点等与原始数据中的
+checksum地址保持一致；trace中以symbol表示的token等非地址字符串区分大小写。
+ID表可以持久化为文本文件（第i行即ID为i的地址），多次运行间保持ID稳定。
+"""
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+DEFAULT_INTERNER_FILE = './data/address_ids.txt'
+
+
+def normalize_address(value: str) -> str:
+    """驻留表的键：地址转为小写，其他字符串不变"""
+    if len(value) == 42 and value.startswith(('0x', '0X')):
+        return value.lower()
+    return value
+
+
+class AddressInterner:
+    """地址 <-> 连续整数ID"""
+
+    def __init__(self, addresses: Optional[Iterable[str]] = None):
+        # 键为 normalize_address 后的地址，addresses 中保存第一次出现的写法
+        self.ids: Dict[str, int] = {}
+        self.addresses: List[str] = []
+        # 已写入文件的条目数，save时只追加新条目
+        self._persisted = 0
+        for address in addresses or ():
+            self.intern(address)
+
+    def __len__(self) -> int:
+        return len(self.addresses)
+
+    def __contains__(self, address: str) -> bool:
+        return normalize_address(address) in self.ids
+
+    def intern(self, address: str) -> int:
+        key = normalize_address(address)
+        idx = self.ids.get(key)
+        if idx is None:
+            idx = len(self.addresses)
+            self.ids[key] = idx
+            self.addresses.append(address)
+        return idx
+
+    def intern_many(self, addresses: Iterable[str]) -> np.ndarray:
+        intern = self.intern
+        return np.fromiter((intern(a) for a in addresses), dtype=np.int32)
+
+    def id_of(self, address: str) -> Optional[int]:
+        """只查询不插入"""
+        return self.ids.get(normalize_address(address))
+
+    def address(self, idx: int) -> str:
+        return self.addresses[idx]
+
+    def lookup(self, ids: Iterable[int]) -> List[str]:
+        addresses = self.addresses
+        return [addresses[i] for i in ids]
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_INTERNER_FILE) -> 'AddressInterner':
+        """加载ID表，文件不存在时返回空表"""
+        interner = cls()
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                addresses = f.read().splitlines()
+            interner.addresses = addresses
+            interner.ids = {normalize_address(address): i for i, address in enumerate(addresses)}
+            interner._persisted = len(addresses)
+        return interner
+
+    def save(self, path: str = DEFAULT_INTERNER_FILE):
+        """把新驻留的地址追加到文件末尾，已有条目的ID保持不变"""
+        if self._persisted == len(self.addresses) and os.path.exists(path):
+            return
+        if self._persisted == 0 or not os.path.exists(path):
+            mode, start = 'w', 0
+        else:
+            mode, start = 'a', self._persisted
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, mode) as f:
+            for address in self.addresses[start:]:
+                f.write(address + '\n')
+        self._persisted = len(self.addresses)
@@ -0,0 +1,311 @@
+"""
+分析脚本的阶段计时、计数器和内存快照
+
+    from arbresearch import metrics
+
+    with metrics.stage('load_json'):
+        data = json.load(f)
+    for line in f:
+        with metrics.accumulate('parse_trace_line'):
+            result = parse_trace_line(line)
+        metrics.count('trace_lines')
+
+默认关闭，此时 stage/accumulate 返回共享的空上下文，count 只做一次布尔判断。
+通过环境变量或 enable() 开启：
+
+    ARBRESEARCH_METRICS=summary,json=data/metrics.json,trace=data/trace.json,memory,profile=create_graph_from_trace
+
+- summary: 进程退出时打印各阶段汇总表
+- json=PATH: 写入JSON格式的汇总指标
+- trace=PATH: 写入 Chrome trace-event 文件，可在 chrome://tracing 或 Perfetto 中查看
+- memory: 用 tracemalloc 记录每个阶段的内存变化和峰值（有明显开销）
+- profile=NAME[:NAME...]: 对指定阶段启用 cProfile，结果写入 profile_dir（默认 data/profiles）
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+ENV_VAR = 'ARBRESEARCH_METRICS'
+
+_enabled = False
+
+
+class _StageStats:
+    __slots__ = ('calls', 'total', 'max', 'mem_delta', 'mem_peak')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.mem_delta = 0
+        self.mem_peak = 0
+
+    def add(self, seconds: float):
+        self.calls += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self) -> Dict[str, float]:
+        d = {'calls': self.calls, 'total_seconds': self.total, 'max_seconds': self.max,
+             'mean_seconds': self.total / self.calls if self.calls else 0.0}
+        if self.mem_peak:
+            d['mem_delta_mb'] = self.mem_delta / 2 ** 20
+            d['mem_peak_mb'] = self.mem_peak / 2 ** 20
+        return d
+
+
+class _Recorder:
+    def __init__(self):
+        self.stages: Dict[str, _StageStats] = defaultdict(_StageStats)
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.events: List[dict] = []
+        self.lock = threading.Lock()
+        self.origin = time.perf_counter()
+        self.summary = False
+        self.json_path: Optional[str] = None
+        self.trace_path: Optional[str] = None
+        self.memory = False
+        # 内层阶段开始时会重置tracemalloc的峰值，重置前外层已达到的峰值记在这里
+        self.peak_floor = 0
+        self.profile: set = set()
+        self.profile_dir = 'data/profiles'
+
+
+_recorder = _Recorder()
+
+
+class _NullContext:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullContext()
+
+
+class _Stage:
+    __slots__ = ('name', 'record_event', 'start', 'mem_start', 'outer_peak', 'profiler')
+
+    def __init__(self, name: str, record_event: bool):
+        self.name = name
+        self.record_event = record_event
+        self.profiler = None
+
+    def __enter__(self):
+        if self.name in _recorder.profile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+        if _recorder.memory:
+            import tracemalloc
+            # 每个阶段从当前内存开始统计峰值，否则之后的阶段都会报告此前最大阶段的峰值
+            self.mem_start, peak = tracemalloc.get_traced_memory()
+            with _recorder.lock:
+                self.outer_peak = max(_recorder.peak_floor, peak)
+                _recorder.peak_floor = 0
+            tracemalloc.reset_peak()
+        if self.profiler is not None:
+            self.profiler.enable()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.disable()
+            _dump_profile(self.name, self.profiler)
+        seconds = end - self.start
+        with _recorder.lock:
+            stats = _recorder.stages[self.name]
+            stats.add(seconds)
+            if _recorder.memory:
+                import tracemalloc
+                current, peak = tracemalloc.get_traced_memory()
+                # 嵌套的内层阶段重置过峰值时，它们的峰值也计入本阶段
+                peak = max(peak, _recorder.peak_floor)
+                stats.mem_delta += current - self.mem_start
+                stats.mem_peak = max(stats.mem_peak, peak)
+                _recorder.peak_floor = max(self.outer_peak, peak)
+            if self.record_event and _recorder.trace_path:
+                _recorder.events.append({
+                    'name': self.name, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                    'ts': (self.start - _recorder.origin) * 1e6, 'dur': seconds * 1e6,
+                })
+        return False
+
+
+def _dump_profile(name: str, profiler):
+    import pstats
+
+    os.makedirs(_recorder.profile_dir, exist_ok=True)
+    path = os.path.join(_recorder.profile_dir, f"{name}.prof")
+    profiler.dump_stats(path)
+    print(f"\n=== cProfile: {name}（已保存到 {path}）===", file=sys.stderr)
+    pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(15)
+
+
+def stage(name: str):
+    """记录一个流水线阶段的耗时，并在trace文件中生成一个事件"""
+    if not _enabled:
+        return _NULL
+    return _Stage(name, True)
+
+
+def accumulate(name: str):
+    """用于循环内部的细粒度计时，只累加汇总数据，不生成trace事件"""
+    if not _enabled:
+        return _NULL
+    return _Stage(name, False)
+
+
+def count(name: str, n: int = 1):
+    if not _enabled:
+        return
+    # 与 _Stage.__exit__ 一样在锁内更新，线程池中并发计数不会丢失
+    with _recorder.lock:
+        _recorder.counters[name] += n
+
+
+def timed(name: Optional[str] = None):
+    """函数装饰器，把整个函数调用记为一个阶段"""
+    def decorator(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Stage(stage_name, True):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(summary: bool = True, json_path: Optional[str] = None, trace_path: Optional[str] = None,
+           memory: bool = False, profile: Iterable[str] = (), profile_dir: Optional[str] = None):
+    """开启记录，进程退出时按配置输出汇总表、JSON和trace文件"""
+    global _enabled
+    _recorder.summary = summary
+    _recorder.json_path = json_path
+    _recorder.trace_path = trace_path
+    _recorder.memory = memory
+    _recorder.profile = set(profile)
+    if profile_dir:
+        _recorder.profile_dir = profile_dir
+    if memory:
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+    if not _enabled:
+        atexit.register(report)
+    _enabled = True
+
+
+def enable_from_spec(spec: str):
+    """解析 ARBRESEARCH_METRICS 格式的配置，例如 'summary,json=metrics.json'"""
+    options = dict(summary=False, json_path=None, trace_path=None, memory=False, profile=[])
+    for item in filter(None, (s.strip() for s in spec.split(','))):
+        key, _, value = item.partition('=')
+        if key == 'summary':
+            options['summary'] = True
+        elif key == 'json':
+            options['json_path'] = value
+        elif key == 'trace':
+            options['trace_path'] = value
+        elif key == 'memory':
+            options['memory'] = True
+        elif key == 'profile':
+            options['profile'] = value.split(':')
+        else:
+            raise ValueError(f"未知的metrics选项: {item}")
+    if not any((options['summary'], options['json_path'], options['trace_path'])):
+        options['summary'] = True
+    enable(**options)
+
+
+def snapshot() -> dict:
+    with _recorder.lock:
+        return {
+            'stages': {name: stats.to_dict() for name, stats in _recorder.stages.items()},
+            'counters': dict(_recorder.counters),
+            'wall_seconds': time.perf_counter() - _recorder.origin,
+        }
+
+
+def print_summary(file=None):
+    file = file or sys.stderr
+    data = snapshot()
+    memory = any('mem_peak_mb' in s for s in data['stages'].values())
+    print("\n=== 阶段耗时 ===", file=file)
+    header = f"{'阶段':<32}{'次数':>8}{'总耗时(秒)':>14}{'平均(毫秒)':>14}{'最大(毫秒)':>14}"
+    print(header + (f"{'内存变化(MB)':>14}{'峰值(MB)':>12}" if memory else ''), file=file)
+    for name, s in sorted(data['stages'].items(), key=lambda x: -x[1]['total_seconds']):
+        row = (f"{name:<32}{s['calls']:>8}{s['total_seconds']:>14.3f}"
+               f"{s['mean_seconds'] * 1000:>14.3f}{s['max_seconds'] * 1000:>14.3f}")
+        if memory:
+            row += f"{s.get('mem_delta_mb', 0):>14.1f}{s.get('mem_peak_mb', 0):>12.1f}"
+        print(row, file=file)
+    if data['counters']:
+        print("\n=== 计数器 ===", file=file)
+        for name, value in sorted(data['counters'].items()):
+            print(f"{name}: {value}", file=file)
+    print(f"\n总运行时间: {data['wall_seconds']:.3f} 秒", file=file)
+
+
+def write_json(path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(snapshot(), f, indent=2, ensure_ascii=False)
+
+
+def write_trace(path: str):
+    """Chrome trace-event 格式（JSON对象格式），计数器以 C 事件写在末尾"""
+    with _recorder.lock:
+        events = list(_recorder.events)
+        end_ts = (time.perf_counter() - _recorder.origin) * 1e6
+        events.extend({'name': name, 'ph': 'C', 'pid': os.getpid(), 'ts': end_ts, 'args': {name: value}}
+                      for name, value in _recorder.counters.items())
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+def report():
+    if not _enabled:
+        return
+    if _recorder.summary:
+        print_summary()
+    if _recorder.json_path:
+        write_json(_recorder.json_path)
+        print(f"指标已保存到: {_recorder.json_path}", file=sys.stderr)
+    if _recorder.trace_path:
+        write_trace(_recorder.trace_path)
+        print(f"trace事件已保存到: {_recorder.trace_path}", file=sys.stderr)
+
+
+def reset():
+    """清空已记录的数据（保留开启状态）"""
+    with _recorder.lock:
+        _recorder.stages.clear()
+        _recorder.counters.clear()
+        _recorder.events.clear()
+        _recorder.peak_floor = 0
+        _recorder.origin = time.perf_counter()
+
+
+if os.getenv(ENV_VAR):
+    enable_from_spec(os.environ[ENV_VAR])
@@ -0,0 +1,209 @@
+"""
+用 neo4j-admin database import 批量导入 token-池子图
+
+首次导入大量trace时，即使是批量Cypher写入也比离线导入器慢几个数量级。这里先把所有trace中的
+节点和关系在内存中去重聚合（与 Neo4jGraph.merge_relationships 的聚合语义一致），写成带表头的CSV：
+
+- tokens.csv:       address:ID(Token)
+- pools.csv:        address:ID(Pool), type
+- connects_to.csv:  :START_ID(Token), :END_ID(Pool), function, count:long, first_seen:datetime,
+                    last_seen:datetime, result, value:double
+
+再停止 docker-compose 中的 neo4j 服务，用同一镜像运行 neo4j-admin 覆盖导入 neo4j 数据库，
+重新启动后创建约束和索引。CSV目录必须位于 ./neo4j/import 下（容器内挂载为 /import）。
+
+    PYTHONPATH=scripts python -m arbresearch neo4j-import data/trace/*-analyzed.txt --workers 4
+"""
+import csv
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from . import metrics
+from .interner import AddressInterner, normalize_address
+
+DEFAULT_IMPORT_ROOT = './neo4j/import'
+DEFAULT_EXPORT_DIR = os.path.join(DEFAULT_IMPORT_ROOT, 'trace_graph')
+CONTAINER_IMPORT_ROOT = '/import'
+
+TOKENS_FILE = 'tokens.csv'
+POOLS_FILE = 'pools.csv'
+RELATIONSHIPS_FILE = 'connects_to.csv'
+
+
+class Neo4jCSVExport:
+    """
+    去重聚合后的节点和关系，接口与 Neo4jGraph 的 merge_tokens/merge_pools/merge_relationships 一致，
+    可以直接传给 create_graph_from_trace 的 export 参数。地址按 normalize_address 去重，
+    与 create_graph_from_trace 一样保留第一次出现的写法
+    """
+
+    def __init__(self):
+        self._interner = AddressInterner()
+        self.tokens: Dict[str, None] = {}
+        self.pools: Dict[str, Optional[str]] = {}
+        # (token, 池子, 函数) -> [观测次数, first_seen, last_seen, 最新返回值, 最新价格]
+        self.relationships: Dict[Tuple[str, str, str], list] = {}
+
+    def __len__(self) -> int:
+        return len(self.relationships)
+
+    def _key(self, address: str) -> str:
+        return self._interner.address(self._interner.intern(address))
+
+    def merge_tokens(self, addresses: Iterable[str], batch_size: int = None):
+        for address in addresses:
+            self.tokens[self._key(address)] = None
+
+    def merge_pools(self, pools: Dict[str, str], batch_size: int = None):
+        for address, pool_type in pools.items():
+            self.pools[self._key(address)] = pool_type
+
+    def merge_relationships(self, rows: Iterable[Dict], batch_size: int = None):
+        for row in rows:
+            self._merge(row['token'], row['pool'], row['function'], row['count'],
+                        row['first_seen'], row['last_seen'], row['result'], row['value'])
+
+    def _merge(self, token: str, pool: str, function: str, count: int, first_seen: datetime,
+               last_seen: datetime, result: str, value: Optional[float]):
+        token, pool = self._key(token), self._key(pool)
+        self.tokens[token] = None
+        self.pools.setdefault(pool, None)
+        entry = self.relationships.get((token, pool, function))
+        if entry is None:
+            self.relationships[(token, pool, function)] = [count, first_seen, last_seen, result, value]
+        else:
+            entry[0] += count
+            entry[2:] = [last_seen, result, value]
+
+    def add_trace_file(self, trace_file: str, parse_line: Callable, allowed_tokens: Iterable[str] = None,
+                       workers: int = 1, observed_at: datetime = None) -> int:
+        """
+        直接解析trace文件并聚合（不构建NetworkX图），返回接受的行数
+
+        解析结果通过 trace_cache 缓存；workers > 1 时多进程解析，parse_line 需要可以被pickle
+        """
+        from .trace_cache import default_cache, parse_trace
+
+        allowed = {normalize_address(token) for token in allowed_tokens} if allowed_tokens else None
+        observed_at = observed_at or datetime.now(timezone.utc)
+        parsed = parse_trace(trace_file, parse_line, workers, default_cache())
+        added = 0
+        for (token0, token1, pool_address, pool_type, function_name, function_result), value in \
+                zip(parsed.rows(), parsed.value.tolist()):
+            if allowed and (normalize_address(token0) not in allowed or normalize_address(token1) not in allowed):
+                continue
+            value = value if value == value else None
+            self.pools[self._key(pool_address)] = pool_type
+            self._merge(token0, pool_address, function_name, 1, observed_at, observed_at, function_result, value)
+            self._merge(token1, pool_address, function_name, 1, observed_at, observed_at, function_result, value)
+            added += 1
+        return added
+
+    def write(self, out_dir: str = DEFAULT_EXPORT_DIR) -> Dict[str, str]:
+        """写出三个CSV文件，返回 {'tokens': 路径, 'pools': 路径, 'relationships': 路径}"""
+        os.makedirs(out_dir, exist_ok=True)
+        paths = {
+            'tokens': os.path.join(out_dir, TOKENS_FILE),
+            'pools': os.path.join(out_dir, POOLS_FILE),
+            'relationships': os.path.join(out_dir, RELATIONSHIPS_FILE),
+        }
+        with open(paths['tokens'], 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['address:ID(Token)'])
+            writer.writerows([address] for address in self.tokens)
+        with open(paths['pools'], 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['address:ID(Pool)', 'type'])
+            writer.writerows(self.pools.items())
+        with open(paths['relationships'], 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow([':START_ID(Token)', ':END_ID(Pool)', 'function', 'count:long',
+                             'first_seen:datetime', 'last_seen:datetime', 'result', 'value:double'])
+            for (token, pool, function), (count, first_seen, last_seen, result, value) in self.relationships.items():
+                writer.writerow([token, pool, function, count, _iso(first_seen), _iso(last_seen), result,
+                                 '' if value is None else repr(value)])
+        return paths
+
+
+def _iso(value: Optional[datetime]) -> str:
+    return '' if value is None else value.isoformat()
+
+
+def container_path(host_path: str, import_root: str = DEFAULT_IMPORT_ROOT) -> str:
+    """把 ./neo4j/import 下的主机路径转换为容器内 /import 下的路径"""
+    relative = os.path.relpath(os.path.abspath(host_path), os.path.abspath(import_root))
+    if relative.startswith('..'):
+        raise ValueError(f"{host_path} 不在 {import_root} 下，容器内无法访问")
+    return f"{CONTAINER_IMPORT_ROOT}/{relative.replace(os.sep, '/')}"
+
+
+def import_command(export_dir: str, database: str = 'neo4j',
+                   import_root: str = DEFAULT_IMPORT_ROOT) -> List[str]:
+    directory = container_path(export_dir, import_root)
+    return [
+        'neo4j-admin', 'database', 'import', 'full', database,
+        '--overwrite-destination',
+        f"--nodes=Token={directory}/{TOKENS_FILE}",
+        f"--nodes=Pool={directory}/{POOLS_FILE}",
+        f"--relationships=CONNECTS_TO={directory}/{RELATIONSHIPS_FILE}",
+    ]
+
+
+def _compose(compose: List[str], compose_file: str, *args: str):
+    cmd = [*compose, '-f', compose_file, *args]
+    print('$ ' + ' '.join(cmd))
+    subprocess.run(cmd, check=True)
+
+
+def wait_for_neo4j(uri: str, user: str, password: str, timeout: float = 120.0):
+    """轮询直到bolt端口可用"""
+    from neo4j import GraphDatabase
+    from neo4j.exceptions import ServiceUnavailable
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with GraphDatabase.driver(uri, auth=(user, password)) as driver:
+                driver.verify_connectivity()
+            return
+        except (ServiceUnavailable, OSError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(2)
+
+
+def run_import(export_dir: str = DEFAULT_EXPORT_DIR, compose_file: str = 'docker-compose.yml',
+               service: str = 'neo4j', compose: List[str] = None, import_root: str = DEFAULT_IMPORT_ROOT):
+    """停止neo4j服务，用同一镜像执行 neo4j-admin 覆盖导入，然后重新启动"""
+    compose = compose or ['docker', 'compose']
+    _compose(compose, compose_file, 'stop', service)
+    try:
+        with metrics.stage('neo4j_admin_import'):
+            _compose(compose, compose_file, 'run', '--rm', '--no-deps', service,
+                     *import_command(export_dir, import_root=import_root))
+    finally:
+        _compose(compose, compose_file, 'start', service)
+
+
+def create_schema(graph_factory: Callable, uri: str, user: str, password: str, timeout: float = 120.0):
+    """导入后创建约束和索引（离线导入器不会创建）"""
+    wait_for_neo4j(uri, user, password, timeout)
+    graph = graph_factory(uri, user, password)
+    try:
+        graph.create_constraints()
+    finally:
+        graph.close()
+
+
+def main():
+    from .cli import main as cli_main
+
+    cli_main(['neo4j-import', *sys.argv[1:]])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+slot0/getReserves 观测记录的紧凑时间序列存储
+
+Neo4j 中每个 (token, 池子, 函数) 只保留一条聚合关系（观测次数、首次/最近观测时间、最新值），
+完整的观测历史写到这里。每次写入追加一个 .npz 段文件，按列保存：
+
+- observed_at: int64，毫秒时间戳
+- token / pool: int32，AddressInterner 中的ID（必须配合持久化的地址ID表使用，命令行要求同时指定 --interner）
+- function: int8，functions 数组的下标
+- value: float64，decode_price 解码后的价格
+
+每行约 21 字节，段文件内还记录来源（通常是trace文件名）。读取时按需过滤并拼接所有段。
+"""
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+DEFAULT_OBSERVATIONS_DIR = './data/observations'
+
+_SEGMENT_RE = re.compile(r'^obs-(\d{8})\.npz$')
+
+
+@dataclass
+class Observations:
+    observed_at: np.ndarray     # int64，毫秒
+    token: np.ndarray           # int32
+    pool: np.ndarray            # int32
+    function: np.ndarray        # int8，functions 的下标
+    value: np.ndarray           # float64
+    functions: List[str]
+
+    def __len__(self) -> int:
+        return len(self.observed_at)
+
+    def function_names(self) -> np.ndarray:
+        return np.asarray(self.functions, dtype=object)[self.function]
+
+
+def _to_millis(observed_at: Optional[datetime]) -> int:
+    observed_at = observed_at or datetime.now(timezone.utc)
+    return int(observed_at.timestamp() * 1000)
+
+
+class ObservationStore:
+    """追加写入的观测记录，add 先缓存在内存中，flush 时写成一个段文件"""
+
+    def __init__(self, root: str = DEFAULT_OBSERVATIONS_DIR):
+        self.root = root
+        self.functions: List[str] = []
+        self._function_ids = {}
+        self._observed_at: List[int] = []
+        self._token: List[int] = []
+        self._pool: List[int] = []
+        self._function: List[int] = []
+        self._value: List[float] = []
+
+    def __len__(self) -> int:
+        """尚未写入的观测数"""
+        return len(self._token)
+
+    def add(self, token_id: int, pool_id: int, function: str, value: float,
+            observed_at: Optional[datetime] = None):
+        code = self._function_ids.get(function)
+        if code is None:
+            code = self._function_ids[function] = len(self.functions)
+            self.functions.append(function)
+        self._observed_at.append(_to_millis(observed_at))
+        self._token.append(token_id)
+        self._pool.append(pool_id)
+        self._function.append(code)
+        self._value.append(value)
+
+    def segments(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return [os.path.join(self.root, f) for f in sorted(os.listdir(self.root)) if _SEGMENT_RE.match(f)]
+
+    def flush(self, source: str = '') -> Optional[str]:
+        """把缓存的观测写成新的段文件，返回文件路径；没有数据时返回None"""
+        if not self._token:
+            return None
+        os.makedirs(self.root, exist_ok=True)
+        existing = [int(_SEGMENT_RE.match(os.path.basename(p)).group(1)) for p in self.segments()]
+        path = os.path.join(self.root, f"obs-{max(existing, default=-1) + 1:08d}.npz")
+        np.savez(
+            path,
+            observed_at=np.asarray(self._observed_at, dtype=np.int64),
+            token=np.asarray(self._token, dtype=np.int32),
+            pool=np.asarray(self._pool, dtype=np.int32),
+            function=np.asarray(self._function, dtype=np.int8),
+            value=np.asarray(self._value, dtype=np.float64),
+            functions=np.asarray(self.functions, dtype=str),
+            source=np.asarray(source),
+        )
+        for column in (self._observed_at, self._token, self._pool, self._function, self._value):
+            column.clear()
+        return path
+
+    def read(self, pools: Iterable[int] = None, tokens: Iterable[int] = None,
+             since: Optional[datetime] = None, until: Optional[datetime] = None) -> Observations:
+        """
+        读取所有段文件中的观测，可按池子/token ID和时间范围过滤，结果按观测时间排序
+
+        各段的函数编码不同，读取时统一映射到返回值的 functions 上
+        """
+        function_ids = {}
+        parts = {name: [] for name in ('observed_at', 'token', 'pool', 'function', 'value')}
+        pools = np.fromiter(pools, dtype=np.int32) if pools is not None else None
+        tokens = np.fromiter(tokens, dtype=np.int32) if tokens is not None else None
+        for path in self.segments():
+            with np.load(path) as segment:
+                mask = np.ones(len(segment['token']), dtype=bool)
+                if pools is not None:
+                    mask &= np.isin(segment['pool'], pools)
+                if tokens is not None:
+                    mask &= np.isin(segment['token'], tokens)
+                if since is not None:
+                    mask &= segment['observed_at'] >= _to_millis(since)
+                if until is not None:
+                    mask &= segment['observed_at'] < _to_millis(until)
+                remap = np.asarray([function_ids.setdefault(name, len(function_ids))
+                                    for name in segment['functions'].tolist()], dtype=np.int8)
+                for name in parts:
+                    column = segment[name][mask]
+                    parts[name].append(remap[column] if name == 'function' and len(remap) else column)
+        functions = list(function_ids)
+        dtypes = {'observed_at': np.int64, 'token': np.int32, 'pool': np.int32, 'function': np.int8, 'value': np.float64}
+        columns = {name: np.concatenate(chunks) if chunks else np.zeros(0, dtype=dtypes[name])
+                   for name, chunks in parts.items()}
+        order = np.argsort(columns['observed_at'], kind='stable')
+        return Observations(functions=functions, **{name: column[order] for name, column in columns.items()})
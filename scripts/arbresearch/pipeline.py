@@ -0,0 +1,452 @@
+"""
+按内容哈希缓存的阶段DAG
+
+报告脚本每次都从头执行 加载 -> DataFrame -> CSV -> 各个图表，searcher分析每次都重新请求大模型。
+这里把流程拆成声明了输入和输出的阶段：
+
+- inputs: 上游阶段名，上游的返回值按名称作为关键字参数传入
+- files: 读取的文件或目录，按内容哈希
+- outputs: 写出的文件，缺失或被修改时阶段失效
+- params: 其余参数（可JSON序列化），也按关键字参数传入
+
+阶段的缓存键为 阶段代码版本（函数及其调用的项目代码的字节码哈希，或显式指定的version）、params、输入文件内容哈希
+和上游返回值的哈希。返回值pickle后保存在 data/pipeline_cache/<流水线>/ 下，上游重新执行但返回值
+不变时下游仍然命中。互不依赖的阶段用进程池（或线程池）并行执行。
+
+设置环境变量 ARBRESEARCH_PIPELINE_CACHE=off 时不读写缓存，所有阶段都执行。
+"""
+import dis
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import pickle
+import re
+import sys
+import sysconfig
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from types import CodeType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from . import metrics
+from .trace_cache import content_hash
+
+ENV_VAR = 'ARBRESEARCH_PIPELINE_CACHE'
+DEFAULT_PIPELINE_CACHE_DIR = './data/pipeline_cache'
+FORMAT_VERSION = 1
+
+HIT = 'hit'
+RAN = 'ran'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+
+def _external_roots() -> tuple:
+    paths = sysconfig.get_paths()
+    return tuple({os.path.abspath(paths[key]) + os.sep for key in ('stdlib', 'platstdlib', 'purelib', 'platlib')})
+
+
+_EXTERNAL_ROOTS = _external_roots()
+
+
+def _is_project_file(path: Optional[str]) -> bool:
+    return bool(path) and path.endswith('.py') and not os.path.abspath(path).startswith(_EXTERNAL_ROOTS)
+
+
+def _is_project_module(name: Optional[str]) -> bool:
+    return _is_project_file(getattr(sys.modules.get(name), '__file__', None))
+
+
+def _stable_repr(value: Any) -> Optional[str]:
+    """基本类型及其容器的repr，含其他对象（repr可能带内存地址）时返回None"""
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        return repr(value)
+    if isinstance(value, (tuple, list, frozenset, set)):
+        items = [_stable_repr(v) for v in value]
+        if any(item is None for item in items):
+            return None
+        return type(value).__name__ + repr(sorted(items) if isinstance(value, (set, frozenset)) else items)
+    if isinstance(value, dict):
+        items = [(_stable_repr(k), _stable_repr(v)) for k, v in value.items()]
+        if any(k is None or v is None for k, v in items):
+            return None
+        return 'dict' + repr(sorted(items))
+    return None
+
+
+def _module_origin(module: str, level: int, package: Optional[str]) -> Optional[str]:
+    """项目模块的源文件路径，第三方模块返回None（先检查顶层包，避免为查找子模块导入第三方包）"""
+    try:
+        name = importlib.util.resolve_name('.' * level + module, package) if level else module
+        top = importlib.util.find_spec(name.split('.')[0])
+        if top is None or not _is_project_file(top.origin):
+            return None
+        spec = importlib.util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    return spec.origin if spec is not None and _is_project_file(spec.origin) else None
+
+
+class _CodeHasher:
+    """
+    阶段函数及其引用的项目代码的哈希
+
+    从函数字节码引用的全局名字出发递归展开：项目中的函数（含装饰器包装的原函数）、类（全部方法和项目中的基类）、
+    模块属性和基本类型的常量；函数内部 import 的项目模块按整个源文件哈希（不为此导入模块）。
+    标准库和第三方包中的代码不展开。
+    """
+
+    def __init__(self):
+        self.h = hashlib.blake2b(digest_size=8)
+        self.seen: Set[int] = set()
+
+    def _code(self, code: CodeType, names: Set[str], imports: Set[Tuple[str, int]]):
+        self.h.update(code.co_code)
+        self.h.update(repr(code.co_names).encode())
+        names.update(code.co_names)
+        instructions = list(dis.get_instructions(code))
+        for i, ins in enumerate(instructions):
+            if ins.opname == 'IMPORT_NAME':
+                # IMPORT_NAME 之前依次加载 level 和 fromlist
+                imports.add((ins.argval, instructions[i - 2].argval if i >= 2 else 0))
+        for const in code.co_consts:
+            if isinstance(const, CodeType):
+                # 嵌套函数和推导式的代码对象，repr中含内存地址，需要递归展开
+                self._code(const, names, imports)
+            else:
+                # frozenset 常量的repr顺序随字符串哈希种子变化
+                self.h.update((_stable_repr(const) or repr(const)).encode())
+
+    def function(self, func: Callable):
+        func = inspect.unwrap(func)
+        code = getattr(func, '__code__', None)
+        if code is None or id(code) in self.seen:
+            return
+        self.seen.add(id(code))
+        self.h.update(f"{func.__module__}.{func.__qualname__}".encode())
+        names: Set[str] = set()
+        imports: Set[Tuple[str, int]] = set()
+        self._code(code, names, imports)
+        for cell in func.__closure__ or ():
+            try:
+                self.value(cell.cell_contents, names)
+            except ValueError:  # 未赋值的闭包变量
+                pass
+        scope = func.__globals__
+        for name in sorted(names):
+            if name in scope:
+                self.h.update(name.encode())
+                self.value(scope[name], names)
+        for module, level in sorted(imports):
+            origin = _module_origin(module, level, scope.get('__package__'))
+            if origin is not None:
+                self.h.update(module.encode() + b'\0' + content_hash(origin).encode())
+
+    def value(self, value: Any, names: Set[str]):
+        if isinstance(value, (staticmethod, classmethod)):
+            value = value.__func__
+        if isinstance(value, property):
+            for accessor in (value.fget, value.fset, value.fdel):
+                if accessor is not None:
+                    self.function(accessor)
+        elif inspect.isfunction(value) or (callable(value) and hasattr(value, '__wrapped__')):
+            if _is_project_module(getattr(inspect.unwrap(value), '__module__', None)):
+                self.function(value)
+        elif inspect.isclass(value):
+            if _is_project_module(value.__module__) and id(value) not in self.seen:
+                self.seen.add(id(value))
+                self.h.update(f"{value.__module__}.{value.__qualname__}".encode())
+                for base in value.__bases__:
+                    self.value(base, names)
+                for attr in sorted(vars(value)):
+                    self.value(vars(value)[attr], names)
+        elif inspect.ismodule(value):
+            # 只展开本函数通过 模块.属性 用到的属性
+            if _is_project_module(value.__name__):
+                for name in sorted(names):
+                    if name in vars(value):
+                        self.value(vars(value)[name], names)
+        else:
+            stable = _stable_repr(value)
+            if stable is not None:
+                self.h.update(stable.encode())
+
+    def hexdigest(self) -> str:
+        return self.h.hexdigest()
+
+
+def code_version(func: Callable) -> str:
+    """
+    阶段代码版本：函数本身及其调用的项目函数、类方法和常量的哈希，修改其中任何一处后阶段自动失效
+
+    通过参数传入的对象上的方法无法静态找到，这种情况需要在 Stage.version 中显式指定版本
+    """
+    hasher = _CodeHasher()
+    hasher.function(func)
+    return hasher.hexdigest()
+
+
+@dataclass
+class Stage:
+    name: str
+    func: Callable[..., Any]
+    inputs: Sequence[str] = ()
+    files: Sequence[str] = ()
+    outputs: Sequence[str] = ()
+    params: Dict[str, Any] = field(default_factory=dict)
+    # 通过参数传入的对象的方法等无法静态找到的依赖修改后，可以手动提升版本号
+    version: Optional[str] = None
+
+    def code_version(self) -> str:
+        return self.version or code_version(self.func)
+
+
+@dataclass
+class PipelineRun:
+    status: Dict[str, str] = field(default_factory=dict)
+    seconds: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, BaseException] = field(default_factory=dict)
+
+    def names(self, status: str) -> List[str]:
+        return [name for name, s in self.status.items() if s == status]
+
+    def summary(self) -> str:
+        return ', '.join(f"{s}: {len(self.names(s))}" for s in (HIT, RAN, FAILED, SKIPPED) if self.names(s))
+
+
+def _run_stage(func: Callable, kwargs: Dict[str, Any]):
+    started = time.perf_counter()
+    return func(**kwargs), time.perf_counter() - started
+
+
+class FileHasher:
+    """文件和目录的内容哈希，大小和mtime与上次记录一致时直接沿用记录的哈希"""
+
+    def __init__(self, known: Dict[str, list] = None):
+        # 路径 -> [size, mtime_ns, hash]
+        self.known: Dict[str, list] = dict(known or {})
+
+    def file(self, path: str) -> Optional[str]:
+        if not os.path.exists(path):
+            return None
+        if os.path.isdir(path):
+            h = hashlib.blake2b(digest_size=16)
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    full = os.path.join(root, name)
+                    h.update(os.path.relpath(full, path).encode() + b'\0' + self.file(full).encode())
+            return h.hexdigest()
+        stat = os.stat(path)
+        entry = self.known.get(path)
+        if entry is None or entry[:2] != [stat.st_size, stat.st_mtime_ns]:
+            entry = self.known[path] = [stat.st_size, stat.st_mtime_ns, content_hash(path)]
+        return entry[2]
+
+
+class Pipeline:
+    def __init__(self, name: str, stages: Iterable[Stage], cache_dir: Optional[str] = DEFAULT_PIPELINE_CACHE_DIR):
+        self.name = name
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"阶段重名: {stage.name}")
+            self.stages[stage.name] = stage
+        for stage in self.stages.values():
+            missing = [i for i in stage.inputs if i not in self.stages]
+            if missing:
+                raise ValueError(f"阶段 {stage.name} 的输入不存在: {missing}")
+        self.order = self._topological_order()
+        self.cache_dir = os.path.join(cache_dir, name) if cache_dir else None
+
+    def _topological_order(self) -> List[str]:
+        order, state = [], {}
+
+        def visit(name: str):
+            if state.get(name) == 1:
+                raise ValueError(f"阶段之间存在环: {name}")
+            if state.get(name) == 2:
+                return
+            state[name] = 1
+            for dep in self.stages[name].inputs:
+                visit(dep)
+            state[name] = 2
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _required(self, targets: Optional[Iterable[str]]) -> List[str]:
+        if targets is None:
+            return self.order
+        needed: Set[str] = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.stages:
+                raise ValueError(f"未知阶段: {name}")
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.stages[name].inputs)
+        return [name for name in self.order if name in needed]
+
+    # 缓存文件
+
+    def _paths(self, name: str):
+        base = os.path.join(self.cache_dir, re.sub(r'[^0-9A-Za-z_.-]', '_', name))
+        return base + '.json', base + '.pkl'
+
+    def _read_meta(self, name: str) -> Optional[dict]:
+        if self.cache_dir is None:
+            return None
+        meta_path, _ = self._paths(name)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        return meta if meta.get('version') == FORMAT_VERSION else None
+
+    def _write(self, name: str, meta: dict, result: bytes):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        meta_path, data_path = self._paths(name)
+        with open(data_path + '.tmp', 'wb') as f:
+            f.write(result)
+        os.replace(data_path + '.tmp', data_path)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def load_result(self, name: str) -> Any:
+        _, data_path = self._paths(name)
+        with open(data_path, 'rb') as f:
+            return pickle.load(f)
+
+    def _key(self, stage: Stage, digests: Dict[str, str], hasher: FileHasher) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(json.dumps({
+            'stage': stage.name,
+            'code': stage.code_version(),
+            'params': stage.params,
+            'files': {path: hasher.file(path) for path in stage.files},
+            'inputs': {name: digests[name] for name in stage.inputs},
+        }, sort_keys=True, default=repr).encode())
+        return h.hexdigest()
+
+    def _is_fresh(self, meta: Optional[dict], key: str, stage: Stage, hasher: FileHasher) -> bool:
+        if meta is None or meta['key'] != key or not os.path.exists(self._paths(stage.name)[1]):
+            return False
+        return all(hasher.file(path) == meta['outputs'].get(path) for path in stage.outputs)
+
+    def run(self, targets: Iterable[str] = None, workers: int = 1, executor: str = 'process',
+            force: Iterable[str] = ()) -> PipelineRun:
+        """
+        执行 targets 及其上游阶段（默认全部），返回各阶段的状态
+
+        Args:
+            workers: 并行执行的阶段数，1时在当前进程中依次执行
+            executor: 'process' 或 'thread'（大模型请求等IO密集的阶段用线程池即可）
+            force: 忽略缓存强制执行的阶段
+        """
+        names = self._required(targets)
+        force = set(force)
+        metas = {name: self._read_meta(name) for name in names}
+        hasher = FileHasher({path: entry for meta in metas.values() if meta
+                             for path, entry in meta.get('file_stats', {}).items()})
+        run = PipelineRun()
+        digests: Dict[str, str] = {}
+        results: Dict[str, Any] = {}
+        pending = list(names)
+        running: Dict[Future, tuple] = {}
+        pool: Optional[Executor] = None
+        if workers > 1:
+            pool = (ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor)(max_workers=workers)
+
+        def result_of(name: str) -> Any:
+            if name not in results:
+                results[name] = self.load_result(name)
+            return results[name]
+
+        def finish(name: str, key: str, value: Any, seconds: float):
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            digests[name] = hashlib.blake2b(data, digest_size=16).hexdigest()
+            results[name] = value
+            run.status[name], run.seconds[name] = RAN, seconds
+            metrics.count('pipeline_stages_ran')
+            if self.cache_dir is not None:
+                stage = self.stages[name]
+                tracked = [*stage.files, *stage.outputs]
+                outputs = {path: hasher.file(path) for path in stage.outputs}
+                # 目录下各文件的记录也保存下来，下次只需 stat
+                stats = {path: entry for path, entry in hasher.known.items()
+                         if any(path == t or path.startswith(t.rstrip(os.sep) + os.sep) for t in tracked)}
+                self._write(name, {
+                    'version': FORMAT_VERSION,
+                    'key': key,
+                    'digest': digests[name],
+                    'outputs': outputs,
+                    'file_stats': stats,
+                    'seconds': seconds,
+                }, data)
+
+        try:
+            while pending or running:
+                progressed = False
+                for name in list(pending):
+                    stage = self.stages[name]
+                    if any(run.status.get(dep) in (FAILED, SKIPPED) for dep in stage.inputs):
+                        run.status[name] = SKIPPED
+                        pending.remove(name)
+                        progressed = True
+                        continue
+                    if any(dep not in digests for dep in stage.inputs):
+                        continue
+                    pending.remove(name)
+                    progressed = True
+                    key = self._key(stage, digests, hasher)
+                    meta = metas[name]
+                    if name not in force and self._is_fresh(meta, key, stage, hasher):
+                        digests[name] = meta['digest']
+                        run.status[name], run.seconds[name] = HIT, 0.0
+                        metrics.count('pipeline_stages_hit')
+                        continue
+                    kwargs = {dep: result_of(dep) for dep in stage.inputs}
+                    kwargs.update(stage.params)
+                    if pool is None:
+                        try:
+                            with metrics.stage(f"pipeline:{name}"):
+                                value, seconds = _run_stage(stage.func, kwargs)
+                        except Exception as e:
+                            run.status[name], run.errors[name] = FAILED, e
+                            continue
+                        finish(name, key, value, seconds)
+                    else:
+                        running[pool.submit(_run_stage, stage.func, kwargs)] = (name, key)
+                if running and not progressed:
+                    done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name, key = running.pop(future)
+                        try:
+                            value, seconds = future.result()
+                        except Exception as e:
+                            run.status[name], run.errors[name] = FAILED, e
+                            continue
+                        finish(name, key, value, seconds)
+                elif not running and not progressed and pending:
+                    raise RuntimeError(f"无法调度的阶段: {pending}")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        run.status = {name: run.status[name] for name in names}
+        return run
+
+
+def default_cache_dir() -> Optional[str]:
+    """ARBRESEARCH_PIPELINE_CACHE 为 off/0 时返回None"""
+    root = os.getenv(ENV_VAR, DEFAULT_PIPELINE_CACHE_DIR)
+    if root.lower() in ('', 'off', '0', 'false'):
+        return None
+    return root
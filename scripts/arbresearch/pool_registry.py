@@ -0,0 +1,251 @@
+"""
+extended_pool_cache.json 的索引化只读视图
+
+scripts/cache-pools.ts 写出的缓存是 {池子地址: {tokens, factory, protocol, poolType}} 的大JSON，
+这里把它加载成按列存储的数组：地址以 (n, 20) 字节矩阵保存，token/factory/protocol/poolType
+编码为整数ID，并建立 池子地址 -> 行号、token对 -> 行号列表 两个哈希索引。
+首次加载后会在JSON旁边写一个 .npz 快照，源文件未变化时直接从快照启动。
+"""
+import json
+import os
+import sys
+import zipfile
+from itertools import combinations
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_POOL_CACHE = './data/extended_pool_cache.json'
+SNAPSHOT_VERSION = 1
+
+
+def _hex_to_matrix(addresses: List[str]) -> np.ndarray:
+    raw = bytes.fromhex(''.join(a[2:] if a.startswith('0x') else a for a in addresses))
+    return np.frombuffer(raw, dtype=np.uint8).reshape(len(addresses), 20)
+
+
+def _matrix_to_hex(mat: np.ndarray) -> List[str]:
+    raw = np.ascontiguousarray(mat).tobytes().hex()
+    return ['0x' + raw[i:i + 40] for i in range(0, len(raw), 40)]
+
+
+class PoolRegistry:
+    """池子元数据注册表"""
+
+    def __init__(self, pool_addresses: np.ndarray, token_addresses: np.ndarray,
+                 token_offsets: np.ndarray, token_ids: np.ndarray,
+                 factory_ids: np.ndarray, protocol_ids: np.ndarray, pool_type_ids: np.ndarray,
+                 factories: List[str], protocols: List[str], pool_types: List[str]):
+        self.pool_addresses = pool_addresses    # (n, 20) uint8
+        self.token_addresses = token_addresses  # (m, 20) uint8
+        self.token_offsets = token_offsets      # int64, 第i个池子的token为 token_ids[offsets[i]:offsets[i+1]]
+        self.token_ids = token_ids              # int32
+        self.factory_ids = factory_ids          # int32, -1表示缺失
+        self.protocol_ids = protocol_ids        # int32
+        self.pool_type_ids = pool_type_ids      # int32, -1表示缺失
+        self.factories = factories
+        self.protocols = protocols
+        self.pool_types = pool_types
+
+        self._pool_hex = _matrix_to_hex(pool_addresses)
+        self._token_hex = _matrix_to_hex(token_addresses)
+        self._pool_index = {address: i for i, address in enumerate(self._pool_hex)}
+        self._token_index = {address: i for i, address in enumerate(self._token_hex)}
+        self._pair_index = self._build_pair_index()
+
+    def __len__(self) -> int:
+        return len(self.pool_addresses)
+
+    def _build_pair_index(self) -> Dict[int, Tuple[int, int]]:
+        counts = np.diff(self.token_offsets)
+        rows, lo, hi = [], [], []
+        # 绝大多数池子只有两个token，直接向量化处理
+        two = np.flatnonzero(counts == 2)
+        first = self.token_ids[self.token_offsets[two]]
+        second = self.token_ids[self.token_offsets[two] + 1]
+        rows.append(two)
+        lo.append(np.minimum(first, second))
+        hi.append(np.maximum(first, second))
+        # curve等多token池子展开成所有两两组合
+        for i in np.flatnonzero(counts > 2):
+            tokens = self.token_ids[self.token_offsets[i]:self.token_offsets[i + 1]]
+            for a, b in combinations(tokens, 2):
+                rows.append(np.array([i]))
+                lo.append(np.array([min(a, b)]))
+                hi.append(np.array([max(a, b)]))
+        rows, lo, hi = np.concatenate(rows), np.concatenate(lo), np.concatenate(hi)
+
+        keys = lo.astype(np.int64) * len(self.token_addresses) + hi
+        order = np.argsort(keys, kind='stable')
+        keys, self._pair_rows = keys[order], rows[order]
+        unique, starts = np.unique(keys, return_index=True)
+        ends = np.append(starts[1:], len(keys))
+        # 键为 lo * token数 + hi，值为 _pair_rows 中的区间
+        return dict(zip(unique.tolist(), zip(starts.tolist(), ends.tolist())))
+
+    @classmethod
+    def from_json(cls, path: str = DEFAULT_POOL_CACHE) -> 'PoolRegistry':
+        with open(path, 'r') as f:
+            cache: Dict[str, Dict[str, Any]] = json.load(f)
+
+        token_index: Dict[str, int] = {}
+        tables = {'factory': {}, 'protocol': {}, 'poolType': {}}
+        pool_hex, token_ids, offsets = [], [], [0]
+        factory_ids, protocol_ids, pool_type_ids = [], [], []
+
+        def intern(table: Dict[str, int], value: Optional[str]) -> int:
+            if value is None:
+                return -1
+            return table.setdefault(value, len(table))
+
+        for address, info in cache.items():
+            # 只索引以地址为键的池子（UniV4的poolId为32字节，不在此列）
+            if len(address) != 42:
+                continue
+            pool_hex.append(address.lower())
+            for token in info.get('tokens', []):
+                token_ids.append(token_index.setdefault(token.lower(), len(token_index)))
+            offsets.append(len(token_ids))
+            factory_ids.append(intern(tables['factory'], info.get('factory')))
+            protocol_ids.append(intern(tables['protocol'], info.get('protocol', 'Unknown')))
+            pool_type_ids.append(intern(tables['poolType'], info.get('poolType')))
+
+        return cls(
+            pool_addresses=_hex_to_matrix(pool_hex),
+            token_addresses=_hex_to_matrix(list(token_index)),
+            token_offsets=np.asarray(offsets, dtype=np.int64),
+            token_ids=np.asarray(token_ids, dtype=np.int32),
+            factory_ids=np.asarray(factory_ids, dtype=np.int32),
+            protocol_ids=np.asarray(protocol_ids, dtype=np.int32),
+            pool_type_ids=np.asarray(pool_type_ids, dtype=np.int32),
+            factories=list(tables['factory']),
+            protocols=list(tables['protocol']),
+            pool_types=list(tables['poolType']),
+        )
+
+    def save_snapshot(self, path: str, source_stat: Tuple[int, int] = (0, 0)):
+        """写入二进制快照，source_stat 为源JSON的 (size, mtime_ns)；先写临时文件再替换，中断时不会留下半个快照"""
+        # 临时文件名带进程号，多个进程同时重建快照时互不覆盖
+        tmp = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(
+            tmp,
+            version=np.array([SNAPSHOT_VERSION, *source_stat], dtype=np.int64),
+            pool_addresses=self.pool_addresses,
+            token_addresses=self.token_addresses,
+            token_offsets=self.token_offsets,
+            token_ids=self.token_ids,
+            factory_ids=self.factory_ids,
+            protocol_ids=self.protocol_ids,
+            pool_type_ids=self.pool_type_ids,
+            factories=np.asarray(self.factories, dtype=str),
+            protocols=np.asarray(self.protocols, dtype=str),
+            pool_types=np.asarray(self.pool_types, dtype=str),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> Tuple['PoolRegistry', Tuple[int, int]]:
+        with np.load(path) as data:
+            version, size, mtime = (int(v) for v in data['version'])
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(f"快照版本不匹配: {version}")
+            registry = cls(
+                pool_addresses=data['pool_addresses'],
+                token_addresses=data['token_addresses'],
+                token_offsets=data['token_offsets'],
+                token_ids=data['token_ids'],
+                factory_ids=data['factory_ids'],
+                protocol_ids=data['protocol_ids'],
+                pool_type_ids=data['pool_type_ids'],
+                factories=data['factories'].tolist(),
+                protocols=data['protocols'].tolist(),
+                pool_types=data['pool_types'].tolist(),
+            )
+        return registry, (size, mtime)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_POOL_CACHE) -> 'PoolRegistry':
+        """优先从快照加载，源JSON的大小或修改时间变化后重新解析并更新快照"""
+        snapshot = os.path.splitext(path)[0] + '.npz'
+        stat = os.stat(path)
+        source_stat = (stat.st_size, stat.st_mtime_ns)
+        if os.path.exists(snapshot):
+            try:
+                registry, cached_stat = cls.load_snapshot(snapshot)
+                if cached_stat == source_stat:
+                    return registry
+            except (ValueError, KeyError, OSError, EOFError, zipfile.BadZipFile) as e:
+                print(f"忽略无效的池子快照 {snapshot}: {e}")
+        registry = cls.from_json(path)
+        registry.save_snapshot(snapshot, source_stat)
+        return registry
+
+    def index_of(self, pool_address: str) -> Optional[int]:
+        return self._pool_index.get(pool_address.lower())
+
+    def get(self, pool_address: str) -> Optional[Dict[str, Any]]:
+        """返回与 extended_pool_cache.json 中相同结构的池子信息"""
+        i = self.index_of(pool_address)
+        return None if i is None else self._info(i)
+
+    def _info(self, i: int) -> Dict[str, Any]:
+        tokens = self.token_ids[self.token_offsets[i]:self.token_offsets[i + 1]]
+        info = {
+            'tokens': [self._token_hex[t] for t in tokens],
+            'protocol': self.protocols[self.protocol_ids[i]],
+        }
+        if self.factory_ids[i] >= 0:
+            info['factory'] = self.factories[self.factory_ids[i]]
+        if self.pool_type_ids[i] >= 0:
+            info['poolType'] = self.pool_types[self.pool_type_ids[i]]
+        return info
+
+    def __contains__(self, pool_address: str) -> bool:
+        return self.index_of(pool_address) is not None
+
+    def __getitem__(self, pool_address: str) -> Dict[str, Any]:
+        info = self.get(pool_address)
+        if info is None:
+            raise KeyError(pool_address)
+        return info
+
+    def pools_for_pair(self, token_a: str, token_b: str) -> List[str]:
+        """包含这两个token的所有池子地址"""
+        a = self._token_index.get(token_a.lower())
+        b = self._token_index.get(token_b.lower())
+        if a is None or b is None:
+            return []
+        span = self._pair_index.get(min(a, b) * len(self.token_addresses) + max(a, b))
+        if span is None:
+            return []
+        return [self._pool_hex[i] for i in self._pair_rows[span[0]:span[1]]]
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        for i, address in enumerate(self._pool_hex):
+            yield address, self._info(i)
+
+    def protocol_counts(self) -> Dict[str, int]:
+        counts = np.bincount(self.protocol_ids, minlength=len(self.protocols))
+        return dict(zip(self.protocols, counts.tolist()))
+
+
+def main():
+    import time
+
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_POOL_CACHE
+    start = time.perf_counter()
+    registry = PoolRegistry.load(path)
+    print(f"加载 {len(registry)} 个池子，{len(registry.token_addresses)} 个token，"
+          f"耗时 {time.perf_counter() - start:.3f} 秒")
+
+    print("\n=== 协议统计 ===")
+    for protocol, count in sorted(registry.protocol_counts().items(), key=lambda x: -x[1]):
+        print(f"{protocol}: {count}")
+
+    weth = "0x4200000000000000000000000000000000000006"
+    usdc = "0x833589fcd6edb6e08f4c7c32d4f71b54bda02913"
+    print(f"\nWETH-USDC 池子数: {len(registry.pools_for_pair(weth, usdc))}")
+
+
+if __name__ == "__main__":
+    main()
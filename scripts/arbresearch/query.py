@@ -0,0 +1,322 @@
+"""
+分析结果的DuckDB查询层
+
+notebook 里把 arbitrage_analysis_full.csv 整个读进pandas再在内存中过滤，数据变大后就放不下了。
+这里把各类输出注册为DuckDB中带固定类型的视图，查询由DuckDB流式执行，超出内存限制时溢写到临时目录：
+
+- from_to:      analyze_arb_results 输出的 from -> to 统计（CSV或Parquet）
+- transactions: batch文件中的套利交易，每行一笔（区块、searcher、利润、gas、inter/backrun、input标志）
+- swaps:        batch文件中的swap事件，每行一个（池子、协议、token、数量）
+- searchers:    inter_dominant_analysis.json 中各searcher的统计
+
+batch文件和searcher JSON直接用 read_json 读取，视图定义中只声明用到的字段；
+export_parquet 可以把视图物化为Parquet文件，之后用 register_table 注册，避免重复解析JSON。
+常用查询（top searchers、协议分布、标志分布）封装为带参数的方法，返回 pandas DataFrame 或 Arrow 表。
+
+    PYTHONPATH=scripts python -m arbresearch.query top-searchers --limit 20
+"""
+import argparse
+import os
+from typing import Any, Dict, List, Optional
+
+from .constants import DEFAULT_BATCHES_DIR
+
+DEFAULT_FROM_TO_FILE = './data/arbitrage_analysis_full/arbitrage_analysis_full.csv'
+DEFAULT_SEARCHERS_FILE = './data/arbitrage_analysis/inter_dominant_analysis.json'
+
+# read_json 的单个JSON对象大小上限，batch文件整个是一个对象；DuckDB按此大小分配读取缓冲区
+DEFAULT_MAX_OBJECT_SIZE = 256 << 20
+
+FROM_TO_TYPES = {
+    'from_address': 'VARCHAR', 'to_address': 'VARCHAR',
+    'total_transactions': 'BIGINT', 'arbitrage_count': 'BIGINT', 'arbitrage_rate': 'DOUBLE',
+    'total_profit': 'DOUBLE', 'average_profit': 'DOUBLE', 'total_gas_cost': 'DOUBLE', 'average_gas_cost': 'DOUBLE',
+    'total_gas_used': 'BIGINT', 'average_gas_used': 'BIGINT',
+    'pools_match': 'BIGINT', 'tokens_match': 'BIGINT', 'amounts_match': 'BIGINT',
+    'pools_and_tokens_match': 'BIGINT', 'pools_and_amounts_match': 'BIGINT', 'tokens_and_amounts_match': 'BIGINT',
+    'all_match': 'BIGINT', 'all_not_match': 'BIGINT',
+}
+
+# from_to 中互斥的标志类别列（与TS flagStats 一致）
+FLAG_COLUMNS = ['all_match', 'pools_and_tokens_match', 'pools_and_amounts_match', 'tokens_and_amounts_match',
+                'pools_match', 'tokens_match', 'amounts_match', 'all_not_match']
+
+_BATCH_COLUMNS = """{'arbitrageTransactions': 'STRUCT(
+    blockNumber BIGINT, "timestamp" TIMESTAMP, "transaction" STRUCT(
+        hash VARCHAR, "index" INTEGER, "from" VARCHAR, "to" VARCHAR, gasUsed VARCHAR, gasPrice VARCHAR,
+        swapEvents STRUCT(poolAddress VARCHAR, protocol VARCHAR, tokenIn VARCHAR, tokenOut VARCHAR,
+                          amountIn VARCHAR, amountOut VARCHAR)[],
+        arbitrageInfo STRUCT("type" VARCHAR, isBackrun BOOLEAN, profit STRUCT(token VARCHAR, amount VARCHAR)),
+        inputAnalysis JSON
+    ))[]'}"""
+
+_SEARCHER_COLUMNS = """{'searchers': 'MAP(VARCHAR, STRUCT(totalTxs BIGINT, interTxs BIGINT, beginTxs BIGINT,
+                                                     wethProfit VARCHAR))'}"""
+
+_TOP_SEARCHER_ORDER = ['total_profit', 'arbitrage_count', 'total_transactions', 'net_profit', 'arbitrage_rate']
+
+
+def _quote(path: str) -> str:
+    return "'" + path.replace("'", "''") + "'"
+
+
+def _json_glob(batches_dir: str) -> str:
+    return os.path.join(batches_dir, '*.json')
+
+
+class AnalysisDB:
+    """
+    DuckDB连接和已注册的视图
+
+    Args:
+        database: 数据库文件，默认内存数据库（视图本身不保存数据，只保存查询定义）
+        memory_limit: 例如 '4GB'，超出时溢写到 temp_directory
+        threads: DuckDB工作线程数
+        max_object_size: 单个JSON文件的大小上限（字节），需小于 memory_limit 的一半
+    """
+
+    def __init__(self, database: str = ':memory:', memory_limit: str = None, temp_directory: str = None,
+                 threads: int = None, max_object_size: int = DEFAULT_MAX_OBJECT_SIZE):
+        import duckdb
+
+        config = {}
+        if memory_limit:
+            config['memory_limit'] = memory_limit
+        if temp_directory:
+            config['temp_directory'] = temp_directory
+        if threads:
+            config['threads'] = threads
+        self.con = duckdb.connect(database, config=config)
+        self.max_object_size = max_object_size
+        self.views: Dict[str, str] = {}
+
+    def close(self):
+        self.con.close()
+
+    def __enter__(self) -> 'AnalysisDB':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _create_view(self, name: str, query: str):
+        self.con.execute(f'CREATE OR REPLACE VIEW "{name}" AS {query}')
+        self.views[name] = query
+
+    # 注册数据源
+
+    def register_table(self, name: str, path: str, types: Dict[str, str] = None):
+        """
+        把CSV或Parquet文件（可以是glob）注册为视图
+
+        types 中的列按指定类型读取，文件中没有的列忽略，其余列由DuckDB推断类型
+        """
+        source = f"read_parquet({_quote(path)})" if path.endswith('.parquet') \
+            else f"read_csv({_quote(path)}, header=true)"
+        columns = self.con.sql(f"SELECT * FROM {source} LIMIT 0").columns
+        types = types or {}
+        select = ', '.join(f'CAST("{c}" AS {types[c]}) AS "{c}"' if c in types else f'"{c}"' for c in columns)
+        self._create_view(name, f"SELECT {select} FROM {source}")
+
+    def register_from_to(self, path: str = DEFAULT_FROM_TO_FILE):
+        # cluster 列由 report --clusters 输出
+        self.register_table('from_to', path, {**FROM_TO_TYPES, 'cluster': 'INTEGER'})
+
+    def register_batches(self, batches_dir: str = DEFAULT_BATCHES_DIR):
+        """batch文件注册为 transactions 和 swaps 两个视图，每个文件单独解析，不会一次读入全部文件"""
+        source = (f"SELECT unnest(arbitrageTransactions) AS t FROM read_json({_quote(_json_glob(batches_dir))}, "
+                  f"maximum_object_size={self.max_object_size}, columns={_BATCH_COLUMNS})")
+        self._create_view('transactions', f"""
+            SELECT
+                t.blockNumber AS block_number,
+                t."timestamp" AS "timestamp",
+                t."transaction"."index" AS tx_index,
+                t."transaction".hash AS tx_hash,
+                lower(t."transaction"."from") AS from_address,
+                lower(coalesce(t."transaction"."to", '')) AS to_address,
+                lower(t."transaction".arbitrageInfo.profit.token) AS profit_token,
+                CAST(t."transaction".arbitrageInfo.profit.amount AS DOUBLE) / 1e18 AS profit,
+                CAST(t."transaction".gasUsed AS DOUBLE) * CAST(t."transaction".gasPrice AS DOUBLE) / 1e18
+                    AS gas_cost,
+                CAST(t."transaction".gasUsed AS BIGINT) AS gas_used,
+                t."transaction".arbitrageInfo."type" = 'inter' AS is_inter,
+                coalesce(t."transaction".arbitrageInfo.isBackrun, false) AS is_backrun,
+                TRY_CAST(t."transaction".inputAnalysis->>'$.flags.poolsMatch' AS BOOLEAN) AS pools_match,
+                TRY_CAST(t."transaction".inputAnalysis->>'$.flags.tokensMatch' AS BOOLEAN) AS tokens_match,
+                TRY_CAST(t."transaction".inputAnalysis->>'$.flags.amountsMatch' AS BOOLEAN) AS amounts_match,
+                len(t."transaction".swapEvents) AS n_swaps
+            FROM ({source})""")
+        self._create_view('swaps', f"""
+            SELECT
+                block_number, tx_hash, to_address, swap_index,
+                lower(e.poolAddress) AS pool,
+                e.protocol AS protocol,
+                lower(e.tokenIn) AS token_in,
+                lower(e.tokenOut) AS token_out,
+                CAST(e.amountIn AS DOUBLE) AS amount_in,
+                CAST(e.amountOut AS DOUBLE) AS amount_out
+            FROM (
+                SELECT
+                    t.blockNumber AS block_number,
+                    t."transaction".hash AS tx_hash,
+                    lower(coalesce(t."transaction"."to", '')) AS to_address,
+                    unnest(t."transaction".swapEvents) AS e,
+                    unnest(range(len(t."transaction".swapEvents))) AS swap_index
+                FROM ({source})
+            )""")
+
+    def register_searchers(self, path: str = DEFAULT_SEARCHERS_FILE):
+        source = (f"SELECT unnest(map_entries(searchers)) AS e FROM read_json({_quote(path)}, "
+                  f"maximum_object_size={self.max_object_size}, columns={_SEARCHER_COLUMNS})")
+        self._create_view('searchers', f"""
+            SELECT
+                lower(e.key) AS address,
+                e.value.totalTxs AS total_txs,
+                e.value.interTxs AS inter_txs,
+                e.value.beginTxs AS begin_txs,
+                CAST(e.value.wethProfit AS DOUBLE) / 1e18 AS weth_profit
+            FROM ({source})""")
+
+    def register_defaults(self, from_to: str = DEFAULT_FROM_TO_FILE, batches_dir: str = DEFAULT_BATCHES_DIR,
+                          searchers: str = DEFAULT_SEARCHERS_FILE) -> List[str]:
+        """注册存在的默认输出，返回注册的视图名"""
+        if from_to and os.path.exists(from_to):
+            self.register_from_to(from_to)
+        if batches_dir and os.path.isdir(batches_dir) and any(f.endswith('.json') for f in os.listdir(batches_dir)):
+            self.register_batches(batches_dir)
+        if searchers and os.path.exists(searchers):
+            self.register_searchers(searchers)
+        return list(self.views)
+
+    def export_parquet(self, view: str, path: str):
+        """把视图物化为Parquet文件"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.con.execute(f'COPY (SELECT * FROM "{view}") TO {_quote(path)} (FORMAT parquet)')
+
+    # 查询
+
+    def query(self, sql: str, params: Optional[List[Any]] = None, output: str = 'pandas'):
+        """执行SQL，output 为 'pandas'、'arrow' 或 'relation'（DuckDB关系，可以继续链式查询）"""
+        if output == 'relation':
+            return self.con.sql(sql, params=params)
+        result = self.con.execute(sql, params or [])
+        if output == 'pandas':
+            return result.df()
+        if output == 'arrow':
+            return result.fetch_arrow_table()
+        raise ValueError(f"未知的输出格式: {output}")
+
+    def top_searchers(self, limit: int = 20, order_by: str = 'total_profit', min_transactions: int = 0,
+                      output: str = 'pandas'):
+        """按to地址（searcher合约）汇总 from_to，返回排名前limit的searcher"""
+        if order_by not in _TOP_SEARCHER_ORDER:
+            raise ValueError(f"order_by 必须是 {_TOP_SEARCHER_ORDER} 之一")
+        return self.query(f"""
+            SELECT
+                to_address,
+                count(*) AS from_addresses,
+                CAST(sum(total_transactions) AS BIGINT) AS total_transactions,
+                CAST(sum(arbitrage_count) AS BIGINT) AS arbitrage_count,
+                sum(arbitrage_count) / nullif(sum(total_transactions), 0) AS arbitrage_rate,
+                sum(total_profit) AS total_profit,
+                sum(total_gas_cost) AS total_gas_cost,
+                sum(total_profit) - sum(total_gas_cost) AS net_profit
+            FROM from_to
+            GROUP BY to_address
+            HAVING sum(total_transactions) >= $min_transactions
+            ORDER BY {order_by} DESC, to_address
+            LIMIT $limit""", {'limit': limit, 'min_transactions': min_transactions}, output)
+
+    def protocol_mix(self, by_searcher: bool = False, start_block: int = None, end_block: int = None,
+                     output: str = 'pandas'):
+        """各协议的swap数和占比，by_searcher 时按searcher分别计算占比"""
+        group = 'to_address, protocol' if by_searcher else 'protocol'
+        partition = 'PARTITION BY to_address' if by_searcher else ''
+        return self.query(f"""
+            SELECT
+                {group},
+                count(*) AS swaps,
+                count(DISTINCT tx_hash) AS transactions,
+                count(*) / sum(count(*)) OVER ({partition}) AS share
+            FROM swaps
+            WHERE block_number >= coalesce($start_block, block_number)
+              AND block_number <= coalesce($end_block, block_number)
+            GROUP BY {group}
+            ORDER BY {'to_address, ' if by_searcher else ''}swaps DESC""",
+                          {'start_block': start_block, 'end_block': end_block}, output)
+
+    def flag_distribution(self, source: str = 'from_to', to_address: str = None, output: str = 'pandas'):
+        """
+        input标志类别的分布
+
+        source='from_to' 时汇总报告中的 flagStats 列，'transactions' 时按每笔交易的 inputAnalysis.flags 分类；
+        to_address 指定时只统计该searcher
+        """
+        params = {'to_address': to_address.lower() if to_address else None}
+        where = "WHERE lower(to_address) = coalesce($to_address, lower(to_address))"
+        if source == 'from_to':
+            sums = ', '.join(f"CAST(sum({c}) AS BIGINT) AS {c}" for c in FLAG_COLUMNS)
+            query = f"""
+                SELECT flag, count, count / nullif(sum(count) OVER (), 0) AS share
+                FROM (UNPIVOT (SELECT {sums} FROM from_to {where}) ON {', '.join(FLAG_COLUMNS)}
+                      INTO NAME flag VALUE count)"""
+        elif source == 'transactions':
+            query = f"""
+                SELECT flag, count(*) AS count, count(*) / sum(count(*)) OVER () AS share
+                FROM (
+                    SELECT CASE
+                        WHEN pools_match AND tokens_match AND amounts_match THEN 'all_match'
+                        WHEN pools_match AND tokens_match THEN 'pools_and_tokens_match'
+                        WHEN pools_match AND amounts_match THEN 'pools_and_amounts_match'
+                        WHEN tokens_match AND amounts_match THEN 'tokens_and_amounts_match'
+                        WHEN pools_match THEN 'pools_match'
+                        WHEN tokens_match THEN 'tokens_match'
+                        WHEN amounts_match THEN 'amounts_match'
+                        WHEN pools_match IS NULL THEN 'unknown'
+                        ELSE 'all_not_match' END AS flag
+                    FROM transactions {where}
+                )
+                GROUP BY flag"""
+        else:
+            raise ValueError(f"未知的数据源: {source}")
+        return self.query(query + " ORDER BY count DESC, flag", params, output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='用DuckDB查询分析结果')
+    parser.add_argument('command', choices=['top-searchers', 'protocol-mix', 'flags', 'sql', 'export'])
+    parser.add_argument('sql', nargs='?', help='sql 命令的查询语句，export 命令的视图名')
+    parser.add_argument('--from-to', default=DEFAULT_FROM_TO_FILE)
+    parser.add_argument('--batches-dir', default=DEFAULT_BATCHES_DIR)
+    parser.add_argument('--searchers', default=DEFAULT_SEARCHERS_FILE)
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--order-by', default='total_profit', choices=_TOP_SEARCHER_ORDER)
+    parser.add_argument('--by-searcher', action='store_true')
+    parser.add_argument('--source', default='from_to', choices=['from_to', 'transactions'])
+    parser.add_argument('--memory-limit', help="例如 4GB，超出时溢写到临时目录")
+    parser.add_argument('--output', help='export 命令的Parquet文件路径')
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    with AnalysisDB(memory_limit=args.memory_limit, temp_directory='./data/duckdb_tmp') as db:
+        views = db.register_defaults(args.from_to, args.batches_dir, args.searchers)
+        print(f"已注册视图: {', '.join(views) or '无'}")
+        if args.command == 'top-searchers':
+            result = db.top_searchers(args.limit, args.order_by)
+        elif args.command == 'protocol-mix':
+            result = db.protocol_mix(args.by_searcher)
+        elif args.command == 'flags':
+            result = db.flag_distribution(args.source)
+        elif args.command == 'sql':
+            result = db.query(args.sql)
+        else:
+            db.export_parquet(args.sql, args.output)
+            print(f"视图 {args.sql} 已导出到: {args.output}")
+            return
+        with pd.option_context('display.max_rows', args.limit, 'display.width', 200):
+            print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+按共用的池子和token对searcher聚类
+
+很多searcher合约属于同一个运营方或使用相同的策略，表现为swap的池子和token高度重合。
+这里从batch文件的套利交易构建两个稀疏关联矩阵（searcher×池子、searcher×token，行是交易的to地址），
+用MinHash签名近似Jaccard相似度，再用LSH分桶只比较落入同一桶的候选对，不做全对比较：
+
+1. 签名：对每个矩阵的非零列下标做 num_perm 个 (a*x+b) mod p 哈希，按行取最小值（np.minimum.reduceat）
+2. 候选：签名切成 bands 段，每段相同的searcher落入同一桶；桶内按排序后相距不超过 window 的两两组合，
+   大桶（例如只共用WETH/USDC的searcher）的候选数因此是线性的
+3. 验证：相似度 = pool_weight * J(池子) + (1 - pool_weight) * J(token)，两者都用签名一致的比例估计
+4. 聚类：相似度不低于 threshold 的候选对作为边，取连通分量
+
+两个以上searcher的簇按大小从0开始编号，其余searcher的簇号为-1。
+
+    PYTHONPATH=scripts python -m arbresearch.searcher_clusters --threshold 0.5
+"""
+import argparse
+import csv
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+
+from .constants import DEFAULT_BATCHES_DIR
+from .interner import AddressInterner
+
+DEFAULT_CLUSTERS_FILE = './data/arbitrage_analysis_full/searcher_clusters.csv'
+
+# 梅森素数 2^31-1，驻留表ID小于它，a*x+b 在int64内不会溢出，哈希值可以用uint32保存
+_PRIME = (1 << 31) - 1
+_EMPTY = np.iinfo(np.uint32).max
+
+
+@dataclass
+class SearcherIncidence:
+    """searcher×池子、searcher×token 关联矩阵，值为触达次数，列为驻留表ID"""
+    searchers: np.ndarray       # int32，第i行searcher的驻留表ID
+    pools: sparse.csr_matrix
+    tokens: sparse.csr_matrix
+    tx_count: np.ndarray        # int64，每个searcher的交易数
+    interner: AddressInterner
+
+    def __len__(self) -> int:
+        return len(self.searchers)
+
+    @classmethod
+    def from_transactions(cls, txs: Iterable[Dict[str, Any]],
+                          interner: AddressInterner = None) -> 'SearcherIncidence':
+        interner = interner or AddressInterner()
+        intern = interner.intern
+        rows: Dict[int, int] = {}
+        tx_searcher, pool_row, pool_col, token_row, token_col = [], [], [], [], []
+        for tx in txs:
+            searcher = intern(tx.get('to') or '')
+            row = rows.setdefault(searcher, len(rows))
+            tx_searcher.append(row)
+            for event in tx['swapEvents']:
+                pool_row.append(row)
+                pool_col.append(intern(event['poolAddress']))
+                token_row.append(row)
+                token_col.append(intern(event['tokenIn']))
+                token_row.append(row)
+                token_col.append(intern(event['tokenOut']))
+
+        shape = (len(rows), len(interner))
+
+        def matrix(r, c):
+            m = sparse.csr_matrix((np.ones(len(r), dtype=np.int64), (r, c)), shape=shape)
+            m.sum_duplicates()
+            return m
+
+        return cls(np.fromiter(rows, dtype=np.int32, count=len(rows)), matrix(pool_row, pool_col),
+                   matrix(token_row, token_col), np.bincount(tx_searcher, minlength=len(rows)), interner)
+
+    @classmethod
+    def from_batches(cls, batches_dir: str = DEFAULT_BATCHES_DIR,
+                     interner: AddressInterner = None) -> 'SearcherIncidence':
+        from .batches import iter_arbitrage_transactions
+
+        return cls.from_transactions((tx for _, _, tx in iter_arbitrage_transactions(batches_dir)), interner)
+
+    def addresses(self) -> List[str]:
+        return self.interner.lookup(self.searchers.tolist())
+
+
+def minhash_signatures(matrix: sparse.csr_matrix, num_perm: int = 128, seed: int = 0,
+                       chunk_size: int = 1 << 22) -> np.ndarray:
+    """
+    每行非零列集合的MinHash签名，形状 (行数, num_perm)，空行全部为 _EMPTY
+
+    哈希按 chunk_size 个元素分批计算，内存占用与 nnz 成正比而不是与列数成正比
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, _PRIME, num_perm, dtype=np.int64)
+    b = rng.integers(0, _PRIME, num_perm, dtype=np.int64)
+    signatures = np.full((matrix.shape[0], num_perm), _EMPTY, dtype=np.uint32)
+    nonempty = np.flatnonzero(np.diff(matrix.indptr))
+    if len(nonempty) == 0:
+        return signatures
+    # 跳过空行后，相邻非空行的起点之间正好是前一行的全部元素
+    starts = matrix.indptr[nonempty]
+    x = matrix.indices.astype(np.int64)[:, None]
+    step = max(1, chunk_size // max(1, len(x)))
+    for lo in range(0, num_perm, step):
+        hi = min(num_perm, lo + step)
+        hashed = ((x * a[lo:hi] + b[lo:hi]) % _PRIME).astype(np.uint32)
+        signatures[nonempty, lo:hi] = np.minimum.reduceat(hashed, starts, axis=0)
+    return signatures
+
+
+def lsh_candidates(signatures: np.ndarray, bands: int = 32, window: int = 32) -> np.ndarray:
+    """
+    LSH候选对，形状 (n, 2)，每行 i < j
+
+    每个band中签名相同的行属于同一个桶；桶内排序后相距不超过window的行两两组成候选，
+    小于window+1的桶等价于桶内全部两两组合。空签名的行不参与。
+    """
+    n, num_perm = signatures.shape
+    rows_per_band = num_perm // bands
+    valid = np.flatnonzero(signatures[:, 0] != _EMPTY)
+    pairs = []
+    for band in range(bands):
+        part = np.ascontiguousarray(signatures[valid, band * rows_per_band:(band + 1) * rows_per_band])
+        keys = part.view(f'V{part.shape[1] * part.itemsize}').ravel()
+        _, bucket = np.unique(keys, return_inverse=True)
+        order = np.argsort(bucket, kind='stable')
+        bucket, members = bucket[order], valid[order]
+        for d in range(1, min(window, len(members) - 1) + 1):
+            same = bucket[d:] == bucket[:-d]
+            if not same.any():
+                break
+            pairs.append(np.stack([members[:-d][same], members[d:][same]], axis=1))
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis=1).astype(np.int64)
+    keys = np.unique(pairs[:, 0] * n + pairs[:, 1])
+    return np.stack([keys // n, keys % n], axis=1)
+
+
+def estimate_jaccard(signatures: np.ndarray, pairs: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """用签名一致的比例估计候选对的Jaccard相似度，有一方为空集时为0"""
+    result = np.zeros(len(pairs), dtype=np.float64)
+    for lo in range(0, len(pairs), chunk_size):
+        i, j = pairs[lo:lo + chunk_size, 0], pairs[lo:lo + chunk_size, 1]
+        left, right = signatures[i], signatures[j]
+        empty = (left[:, 0] == _EMPTY) | (right[:, 0] == _EMPTY)
+        result[lo:lo + chunk_size] = np.where(empty, 0.0, (left == right).mean(axis=1))
+    return result
+
+
+@dataclass
+class SearcherClusters:
+    searchers: List[str]
+    labels: np.ndarray          # int32，-1 表示没有相似的searcher
+    sizes: np.ndarray           # int64，簇号 -> 大小，按大小从大到小排列
+    pairs: np.ndarray           # int64 (n, 2)，相似度不低于阈值的searcher对（行下标）
+    similarity: np.ndarray      # float64
+
+    def label_of(self) -> Dict[str, int]:
+        return dict(zip(self.searchers, self.labels.tolist()))
+
+    def write_csv(self, path: str = DEFAULT_CLUSTERS_FILE, incidence: SearcherIncidence = None):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            header = ['searcher', 'cluster', 'cluster_size']
+            if incidence is not None:
+                header += ['transactions', 'pools', 'tokens']
+            writer.writerow(header)
+            # 按簇号排列，-1 排在最后（sizes[-1] 即单个searcher的簇大小1）
+            sizes = np.append(self.sizes, 1)
+            order = np.argsort(np.where(self.labels < 0, len(self.sizes), self.labels), kind='stable')
+            if incidence is not None:
+                n_pools, n_tokens = np.diff(incidence.pools.indptr), np.diff(incidence.tokens.indptr)
+            for i in order.tolist():
+                label = int(self.labels[i])
+                row = [self.searchers[i], label, int(sizes[label])]
+                if incidence is not None:
+                    row += [int(incidence.tx_count[i]), int(n_pools[i]), int(n_tokens[i])]
+                writer.writerow(row)
+
+
+def cluster_searchers(incidence: SearcherIncidence, threshold: float = 0.5, pool_weight: float = 0.7,
+                      num_perm: int = 128, bands: int = 32, window: int = 32, seed: int = 0) -> SearcherClusters:
+    """
+    按 pool_weight * J(池子) + (1 - pool_weight) * J(token) 聚类
+
+    bands * (num_perm // bands) 个签名位置参与LSH，Jaccard约为 (1/bands)^(bands/num_perm) 的
+    searcher对有一半概率成为候选；默认参数下约为0.42
+    """
+    pool_sig = minhash_signatures(incidence.pools, num_perm, seed)
+    token_sig = minhash_signatures(incidence.tokens, num_perm, seed + 1)
+    n = len(incidence)
+    keys = np.unique(np.concatenate([lsh_candidates(pool_sig, bands, window),
+                                     lsh_candidates(token_sig, bands, window)]) @ np.array([n, 1]))
+    pairs = np.stack([keys // n, keys % n], axis=1)
+    similarity = pool_weight * estimate_jaccard(pool_sig, pairs) + \
+        (1 - pool_weight) * estimate_jaccard(token_sig, pairs)
+    keep = similarity >= threshold
+    pairs, similarity = pairs[keep], similarity[keep]
+
+    graph = sparse.coo_matrix((np.ones(len(pairs), dtype=np.int8), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+    _, components = csgraph.connected_components(graph, directed=False)
+    counts = np.bincount(components)
+    # 多于一个成员的分量按大小（相同时按首个成员）编号
+    multi = np.flatnonzero(counts > 1)
+    first = np.full(len(counts), n, dtype=np.int64)
+    np.minimum.at(first, components, np.arange(n))
+    ranked = multi[np.lexsort((first[multi], -counts[multi]))]
+    relabel = np.full(len(counts), -1, dtype=np.int32)
+    relabel[ranked] = np.arange(len(ranked), dtype=np.int32)
+    return SearcherClusters(incidence.addresses(), relabel[components], counts[ranked], pairs, similarity)
+
+
+def cluster_batches(batches_dir: str = DEFAULT_BATCHES_DIR, **kwargs) -> SearcherClusters:
+    return cluster_searchers(SearcherIncidence.from_batches(batches_dir), **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按共用池子和token对searcher聚类')
+    parser.add_argument('--batches-dir', default=DEFAULT_BATCHES_DIR)
+    parser.add_argument('--output', default=DEFAULT_CLUSTERS_FILE)
+    parser.add_argument('--threshold', type=float, default=0.5)
+    parser.add_argument('--pool-weight', type=float, default=0.7)
+    parser.add_argument('--num-perm', type=int, default=128)
+    parser.add_argument('--bands', type=int, default=32)
+    parser.add_argument('--window', type=int, default=32)
+    args = parser.parse_args()
+
+    incidence = SearcherIncidence.from_batches(args.batches_dir)
+    clusters = cluster_searchers(incidence, args.threshold, args.pool_weight, args.num_perm, args.bands, args.window)
+    clusters.write_csv(args.output, incidence)
+
+    print(f"searcher数: {len(incidence)}, 池子数: {incidence.pools.getnnz(axis=0).astype(bool).sum()}, "
+          f"相似searcher对: {len(clusters.pairs)}")
+    print(f"簇数: {len(clusters.sizes)}, 成簇searcher数: {int(clusters.sizes.sum())}")
+    for label, size in enumerate(clusters.sizes[:10].tolist()):
+        members = [s for s, l in zip(clusters.searchers, clusters.labels.tolist()) if l == label]
+        print(f"  簇 {label}: {size} 个searcher, 例如 {', '.join(members[:3])}")
+    print(f"结果已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+批量模拟套利环在最优输入量下的利润
+
+每个环是一串首尾相接的swap（与 arbitrageCycles 中的 edges 对应），每一跳按池子状态计算输出：
+
+- V2（UniV2/AeroV2/PancakeV2）：恒定乘积，out = R_out * x' / (R_in + x')，x' 为扣除手续费后的输入
+- V3（UniV3/AeroV3/PancakeV3）：只在当前tick内模拟。tick内的集中流动性等价于虚拟储备
+  R0 = L / sqrtP、R1 = L * sqrtP 的恒定乘积池，给出tick边界时输入量不能超过到达边界所需的数量
+
+多跳恒定乘积的复合仍是 out = A * x / (1 + C * x) 的形式，因此没有tick边界的环直接用闭式解：
+最优输入 x* = (sqrt(A) - 1) / C，利润 (sqrt(A) - 1)^2 / C。带tick边界的环利润函数仍是凹函数，
+且最优输入不超过去掉边界后的 x*，在 [0, x*] 上用黄金分割搜索。
+
+所有跳按 (环, 跳) 拼接成扁平数组，计算时按跳的位置逐列向量化，金额用float64（原始单位，未按decimals缩放）。
+
+    PYTHONPATH=scripts python -m arbresearch.simulator data/pool_states.json
+
+pool_states.json 为 {池子地址: 状态}，V2 状态为 {token0, reserve0, reserve1, protocol, fee?}，
+V3 状态为 {token0, sqrtPriceX96, liquidity, fee, sqrtPriceLowerX96?, sqrtPriceUpperX96?}，
+fee 以百万分之一为单位（与V3的fee一致）。
+"""
+import json
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from .constants import DEFAULT_BATCHES_DIR
+from .trace_reader import Q96
+
+FEE_DENOMINATOR = 1_000_000
+# V2池子的默认手续费（AeroV2 的stable池不是恒定乘积，不在模拟范围内）
+V2_FEES = {'UniV2': 3000, 'PancakeV2': 2500, 'AeroV2': 3000}
+GOLDEN_RATIO = (np.sqrt(5) - 1) / 2
+
+
+@dataclass
+class CycleBatch:
+    """
+    多个环的各跳状态，按环拼接成扁平数组
+
+    第i个环的跳为 [hop_offsets[i], hop_offsets[i+1])，第一跳的输入和最后一跳的输出是同一个token
+    """
+    hop_offsets: np.ndarray     # int64, 长度为环数+1
+    reserve_in: np.ndarray      # float64，输入代币的（虚拟）储备
+    reserve_out: np.ndarray     # float64，输出代币的（虚拟）储备
+    fee: np.ndarray             # float64，手续费比例
+    max_in: np.ndarray          # float64，扣费后的输入上限，inf表示不限制
+
+    def __post_init__(self):
+        lengths = np.diff(self.hop_offsets)
+        # 第j列：长度超过j的环及其第j跳的下标
+        self._positions = []
+        for j in range(int(lengths.max(initial=0))):
+            rows = np.flatnonzero(lengths > j)
+            self._positions.append((rows, self.hop_offsets[rows] + j))
+        hop_cycle = np.repeat(np.arange(len(lengths)), lengths)
+        self._bounded = np.bincount(hop_cycle, weights=np.isfinite(self.max_in), minlength=len(lengths)) > 0
+
+    def __len__(self) -> int:
+        return len(self.hop_offsets) - 1
+
+    @classmethod
+    def from_hops(cls, lengths: Sequence[int], is_v3: np.ndarray, zero_for_one: np.ndarray,
+                  fee: np.ndarray, reserve0: np.ndarray = None, reserve1: np.ndarray = None,
+                  sqrt_price_x96: np.ndarray = None, liquidity: np.ndarray = None,
+                  sqrt_price_lower_x96: np.ndarray = None, sqrt_price_upper_x96: np.ndarray = None) -> 'CycleBatch':
+        """
+        从每一跳的池子状态构建，所有数组长度为总跳数
+
+        Args:
+            lengths: 每个环的跳数
+            is_v3: True 的跳使用 sqrt_price_x96/liquidity，否则使用 reserve0/reserve1
+            zero_for_one: True 表示该跳输入token0
+            fee: 手续费，百万分之一
+            sqrt_price_lower_x96/sqrt_price_upper_x96: 当前tick区间的边界，nan表示不限制
+        """
+        is_v3 = np.asarray(is_v3, dtype=bool)
+        zero_for_one = np.asarray(zero_for_one, dtype=bool)
+        n = len(is_v3)
+        nan = np.full(n, np.nan)
+
+        def column(values) -> np.ndarray:
+            return nan if values is None else np.asarray(values, dtype=np.float64)
+
+        reserve0, reserve1 = column(reserve0), column(reserve1)
+        liquidity = column(liquidity)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sqrt_price = column(sqrt_price_x96) / Q96
+            lower = column(sqrt_price_lower_x96) / Q96
+            upper = column(sqrt_price_upper_x96) / Q96
+            # tick内的虚拟储备
+            reserve0 = np.where(is_v3, liquidity / sqrt_price, reserve0)
+            reserve1 = np.where(is_v3, liquidity * sqrt_price, reserve1)
+            # token0输入时价格下降到lower，token1输入时价格上升到upper
+            max_in = np.where(zero_for_one, liquidity * (1 / lower - 1 / sqrt_price), liquidity * (upper - sqrt_price))
+        max_in = np.where(is_v3 & ~np.isnan(max_in), np.maximum(max_in, 0), np.inf)
+
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(
+            hop_offsets=offsets,
+            reserve_in=np.where(zero_for_one, reserve0, reserve1),
+            reserve_out=np.where(zero_for_one, reserve1, reserve0),
+            fee=np.asarray(fee, dtype=np.float64) / FEE_DENOMINATOR,
+            max_in=max_in,
+        )
+
+    @classmethod
+    def from_cycles(cls, cycles: Sequence[Sequence[Dict[str, Any]]],
+                    states: Mapping[str, Dict[str, Any]]) -> Tuple['CycleBatch', np.ndarray]:
+        """
+        从 arbitrageCycles 的 edges 和池子状态构建
+
+        Returns:
+            (CycleBatch, 被保留的环在输入中的下标)；含有缺少状态的池子的环会被跳过
+        """
+        kept, lengths = [], []
+        columns = {name: [] for name in ('is_v3', 'zero_for_one', 'fee', 'reserve0', 'reserve1', 'sqrt_price_x96',
+                                          'liquidity', 'sqrt_price_lower_x96', 'sqrt_price_upper_x96')}
+        for i, edges in enumerate(cycles):
+            hop_states = [states.get(edge['poolAddress'].lower()) for edge in edges]
+            if not edges or any(state is None for state in hop_states):
+                continue
+            kept.append(i)
+            lengths.append(len(edges))
+            for edge, state in zip(edges, hop_states):
+                is_v3 = 'sqrtPriceX96' in state
+                columns['is_v3'].append(is_v3)
+                columns['zero_for_one'].append(edge['tokenIn'].lower() == state['token0'].lower())
+                protocol = state.get('protocol', edge.get('protocol'))
+                columns['fee'].append(float(state['fee']) if 'fee' in state else V2_FEES.get(protocol, 3000))
+                for name, key in (('reserve0', 'reserve0'), ('reserve1', 'reserve1'),
+                                  ('sqrt_price_x96', 'sqrtPriceX96'), ('liquidity', 'liquidity'),
+                                  ('sqrt_price_lower_x96', 'sqrtPriceLowerX96'),
+                                  ('sqrt_price_upper_x96', 'sqrtPriceUpperX96')):
+                    value = state.get(key)
+                    columns[name].append(np.nan if value is None else float(value))
+        return cls.from_hops(lengths, **columns), np.asarray(kept, dtype=np.int64)
+
+    def take(self, cycles: np.ndarray) -> 'CycleBatch':
+        """选取部分环"""
+        lengths = np.diff(self.hop_offsets)[cycles]
+        offsets = np.zeros(len(cycles) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        hops = np.repeat(self.hop_offsets[cycles] - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return CycleBatch(offsets, self.reserve_in[hops], self.reserve_out[hops], self.fee[hops], self.max_in[hops])
+
+    def simulate(self, amount_in: np.ndarray) -> np.ndarray:
+        """每个环以 amount_in 输入时最后一跳的输出"""
+        amount = np.array(amount_in, dtype=np.float64)
+        for rows, hops in self._positions:
+            x = np.minimum(amount[rows] * (1 - self.fee[hops]), self.max_in[hops])
+            amount[rows] = self.reserve_out[hops] * x / (self.reserve_in[hops] + x)
+        return amount
+
+    def profit(self, amount_in: np.ndarray) -> np.ndarray:
+        return self.simulate(amount_in) - amount_in
+
+    def closed_form(self) -> Tuple[np.ndarray, np.ndarray]:
+        """忽略tick边界时的最优输入和利润，无利可图的环为 (0, 0)"""
+        # 复合后 out = A * x / (1 + C * x)
+        a = np.ones(len(self))
+        c = np.zeros(len(self))
+        for rows, hops in self._positions:
+            gamma = 1 - self.fee[hops]
+            c[rows] += gamma * a[rows] / self.reserve_in[hops]
+            a[rows] *= gamma * self.reserve_out[hops] / self.reserve_in[hops]
+        gain = np.sqrt(a) - 1
+        profitable = (gain > 0) & (c > 0)
+        c = np.where(profitable, c, 1)
+        return np.where(profitable, gain / c, 0), np.where(profitable, gain * gain / c, 0)
+
+    def golden_section(self, hi: np.ndarray, iterations: int = 60) -> np.ndarray:
+        """在 [0, hi] 上搜索利润最大的输入，要求利润函数在区间内为凹函数"""
+        lo = np.zeros_like(hi)
+        hi = hi.copy()
+        a = hi - GOLDEN_RATIO * (hi - lo)
+        b = lo + GOLDEN_RATIO * (hi - lo)
+        fa, fb = self.profit(a), self.profit(b)
+        for _ in range(iterations):
+            # fa > fb 时最大值在 [lo, b]，否则在 [a, hi]
+            left = fa > fb
+            hi = np.where(left, b, hi)
+            lo = np.where(left, lo, a)
+            kept, fkept = np.where(left, a, b), np.where(left, fa, fb)
+            probe = np.where(left, hi - GOLDEN_RATIO * (hi - lo), lo + GOLDEN_RATIO * (hi - lo))
+            fprobe = self.profit(probe)
+            a, fa = np.where(left, probe, kept), np.where(left, fprobe, fkept)
+            b, fb = np.where(left, kept, probe), np.where(left, fkept, fprobe)
+        best = np.where(fa > fb, a, b)
+        # 区间端点0对应利润0，搜索结果不赚钱时不交易
+        return np.where(self.profit(best) > 0, best, 0)
+
+
+@dataclass
+class Optimum:
+    amount_in: np.ndarray       # float64，最优输入
+    amount_out: np.ndarray      # float64
+    profit: np.ndarray          # float64
+    bounded: np.ndarray         # bool，是否通过数值搜索求解（含tick边界）
+
+
+def optimize(batch: CycleBatch, iterations: int = 60) -> Optimum:
+    """求每个环的最优输入量和对应利润"""
+    amount_in, _ = batch.closed_form()
+    bounded = batch._bounded & (amount_in > 0)
+    rows = np.flatnonzero(bounded)
+    if len(rows):
+        amount_in[rows] = batch.take(rows).golden_section(amount_in[rows], iterations)
+    amount_out = batch.simulate(amount_in)
+    return Optimum(amount_in, amount_out, amount_out - amount_in, bounded)
+
+
+def main():
+    from .batches import iter_arbitrage_transactions
+
+    if len(sys.argv) < 2:
+        print("用法: python -m arbresearch.simulator <pool_states.json> [batches目录]")
+        return
+    with open(sys.argv[1], 'r') as f:
+        states = {address.lower(): state for address, state in json.load(f).items()}
+    batches_dir = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_BATCHES_DIR
+
+    cycles: List[List[Dict[str, Any]]] = []
+    realized: List[int] = []
+    for _, _, tx in iter_arbitrage_transactions(batches_dir):
+        for cycle in tx['arbitrageInfo']['arbitrageCycles']:
+            cycles.append(cycle['edges'])
+            realized.append(int(cycle['profitAmount']))
+    batch, kept = CycleBatch.from_cycles(cycles, states)
+    print(f"环数: {len(cycles)}, 池子状态齐全: {len(batch)}")
+    if not len(batch):
+        return
+
+    result = optimize(batch)
+    realized = np.asarray(realized, dtype=np.float64)[kept]
+    profitable = result.profit > 0
+    print(f"最优输入下有利润: {int(profitable.sum())}, 其中数值搜索: {int(result.bounded.sum())}")
+    if profitable.any():
+        capture = realized[profitable] / result.profit[profitable]
+        print(f"实际利润 / 最优利润 中位数: {np.median(capture):.4f}, 平均: {capture.mean():.4f}")
+
+
+if __name__ == "__main__":
+    main()
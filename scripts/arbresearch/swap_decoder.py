@@ -0,0 +1,302 @@
+"""
+批量解码 Uniswap V2/V3、Aerodrome V2/V3 和 PancakeV3 的 Swap 事件
+
+与 src/lib/chain/arb.helper.ts 中的 parseSwapEvent 逻辑一致，但不逐条做ABI解析：
+所有字段都是32字节定长ABI word，直接把data按字节切成 (n, 32) 的矩阵，
+再以4个uint64大端limb表示256位整数，做符号/大小比较。
+
+金额按int256补码保存：V3事件的 amountOut 与TS一样取 -amount1 / -amount0，
+异常事件（例如输出方向的数量为正）得到负数，与TS结果一致。V2的uint256金额不会达到2^255，按有符号解释不受影响。
+"""
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .constants import LOG_TOPICS
+
+# 事件类型编码，kind 列中存的是下标
+SWAP_KINDS = ['V2Swap', 'AeroV2Swap', 'V3Swap', 'PancakeV3Swap']
+V2_KINDS = (0, 1)
+# 每种事件data中的word数量（AeroV3Swap与V3Swap相同）
+_DATA_WORDS = {0: 4, 1: 4, 2: 5, 3: 7}
+
+
+def _fixed_width(values: Any, width: int) -> np.ndarray:
+    """
+    把一列定长字节值转成 (n, width) 的uint8矩阵
+
+    支持 pyarrow FixedSizeBinaryArray、numpy 'S{width}' 数组、(n, width) uint8 矩阵，
+    以及 bytes/十六进制字符串列表；空值填0。
+    """
+    if isinstance(values, np.ndarray):
+        if values.dtype == np.uint8 and values.ndim == 2:
+            return values
+        return np.frombuffer(values.astype(f'S{width}').tobytes(), dtype=np.uint8).reshape(-1, width)
+    if hasattr(values, 'combine_chunks'):
+        values = values.combine_chunks()
+    if hasattr(values, 'buffers'):
+        n = len(values)
+        buf = values.buffers()[1]
+        mat = np.frombuffer(buf, dtype=np.uint8, count=(values.offset + n) * width)
+        mat = mat[values.offset * width:].reshape(n, width)
+        if values.null_count:
+            mat = mat.copy()
+            mat[~np.asarray(values.is_valid())] = 0
+        return mat
+    out = np.zeros((len(values), width), dtype=np.uint8)
+    for i, v in enumerate(values):
+        if v is None:
+            continue
+        if isinstance(v, str):
+            v = bytes.fromhex(v[2:] if v.startswith('0x') else v)
+        out[i, width - len(v):] = np.frombuffer(v, dtype=np.uint8)
+    return out
+
+
+def _flat_binary(values: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """把变长字节列转成 (连续缓冲区, offsets)，offsets长度为n+1"""
+    if hasattr(values, 'combine_chunks'):
+        values = values.combine_chunks()
+    if hasattr(values, 'buffers'):
+        n = len(values)
+        offset_type = np.int64 if 'large' in str(values.type) else np.int32
+        offsets = np.frombuffer(values.buffers()[1], dtype=offset_type, count=values.offset + n + 1)
+        offsets = offsets[values.offset:].astype(np.int64)
+        data = values.buffers()[2]
+        buf = np.frombuffer(data, dtype=np.uint8) if data is not None else np.zeros(0, dtype=np.uint8)
+        return buf, offsets
+    chunks = [bytes.fromhex(v[2:] if v.startswith('0x') else v) if isinstance(v, str) else (v or b'')
+              for v in values]
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    np.cumsum([len(c) for c in chunks], out=offsets[1:])
+    return np.frombuffer(b''.join(chunks), dtype=np.uint8), offsets
+
+
+def _gather_rows(buf: np.ndarray, starts: np.ndarray, length: int) -> np.ndarray:
+    """从连续缓冲区中按起点取出 (n, length) 的定长矩阵"""
+    if len(starts) == 0:
+        return np.zeros((0, length), dtype=np.uint8)
+    return buf[starts[:, None] + np.arange(length)]
+
+
+def _limbs(words: np.ndarray, k: int) -> np.ndarray:
+    """取第k个ABI word，返回 (n, 4) 的uint64，高位在前"""
+    word = np.ascontiguousarray(words[:, 32 * k:32 * (k + 1)])
+    return word.view('>u8').astype(np.uint64)
+
+
+def _is_negative(limbs: np.ndarray) -> np.ndarray:
+    return (limbs[:, 0] >> np.uint64(63)).astype(bool)
+
+
+def _negate(limbs: np.ndarray) -> np.ndarray:
+    """256位补码取负"""
+    out = ~limbs
+    carry = np.ones(len(limbs), dtype=np.uint64)
+    for i in range(3, -1, -1):
+        out[:, i] += carry
+        carry = carry & (out[:, i] == 0)
+    return out
+
+
+def _greater(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """逐行比较两个无符号256位数 a > b"""
+    diff = a != b
+    first = diff.argmax(axis=1)
+    rows = np.arange(len(a))
+    return diff.any(axis=1) & (a[rows, first] > b[rows, first])
+
+
+def limbs_to_float(limbs: np.ndarray, signed: bool = False) -> np.ndarray:
+    """signed 时按int256补码解释"""
+    scale = np.array([2.0 ** 192, 2.0 ** 128, 2.0 ** 64, 1.0])
+    if not signed:
+        return limbs.astype(np.float64) @ scale
+    neg = _is_negative(limbs)
+    magnitude = limbs.copy()
+    if neg.any():
+        magnitude[neg] = _negate(limbs[neg])
+    return np.where(neg, -1.0, 1.0) * (magnitude.astype(np.float64) @ scale)
+
+
+def limbs_to_int(limbs: np.ndarray, signed: bool = False) -> List[int]:
+    """精确的Python整数，只在需要输出时使用；signed 时按int256补码解释"""
+    raw = limbs.astype('>u8').tobytes()
+    return [int.from_bytes(raw[i:i + 32], 'big', signed=signed) for i in range(0, len(raw), 32)]
+
+
+def _address_hex(mat: np.ndarray) -> List[str]:
+    width = mat.shape[1] * 2
+    raw = np.ascontiguousarray(mat).tobytes().hex()
+    return ['0x' + raw[i:i + width] for i in range(0, len(raw), width)]
+
+
+@dataclass
+class SwapLogs:
+    """解码后的swap事件，按输入日志顺序排列"""
+    log_index: np.ndarray           # 在输入数组中的位置
+    kind: np.ndarray                # int8，SWAP_KINDS的下标
+    pool: np.ndarray                # (n, 20) uint8
+    sender: np.ndarray              # (n, 20) uint8，未提供topic1时全0
+    recipient: np.ndarray           # (n, 20) uint8，未提供topic2时全0
+    zero_for_one: np.ndarray        # bool，True表示token0换成token1
+    amount_in: np.ndarray           # (n, 4) uint64，int256补码
+    amount_out: np.ndarray          # (n, 4) uint64，int256补码
+    sqrt_price_x96: np.ndarray      # float64，V2事件为nan
+    liquidity: np.ndarray           # float64，V2事件为nan
+    tick: np.ndarray                # int32，V2事件为0
+
+    def __len__(self) -> int:
+        return len(self.log_index)
+
+    def pool_addresses(self) -> List[str]:
+        return _address_hex(self.pool)
+
+    def amount_in_float(self) -> np.ndarray:
+        return limbs_to_float(self.amount_in, signed=True)
+
+    def amount_out_float(self) -> np.ndarray:
+        return limbs_to_float(self.amount_out, signed=True)
+
+    def to_swap_events(self, pools: Mapping[str, Any]) -> List[Optional[Dict[str, Any]]]:
+        """
+        转成与TS StandardSwapEvent 相同结构的字典（金额为十进制字符串）
+
+        Args:
+            pools: 池子地址 -> 池子信息，需包含 tokens 和 protocol，
+                   即 extended_pool_cache.json 的结构；不在其中的池子返回None
+        """
+        addresses = self.pool_addresses()
+        senders = _address_hex(self.sender)
+        recipients = _address_hex(self.recipient)
+        amounts_in = limbs_to_int(self.amount_in, signed=True)
+        amounts_out = limbs_to_int(self.amount_out, signed=True)
+        events = []
+        for i, address in enumerate(addresses):
+            info = pools.get(address)
+            if info is None:
+                events.append(None)
+                continue
+            token0, token1 = info['tokens'][0], info['tokens'][1]
+            zero_for_one = self.zero_for_one[i]
+            events.append({
+                'poolAddress': address,
+                'protocol': info['protocol'],
+                'tokenIn': token0 if zero_for_one else token1,
+                'tokenOut': token1 if zero_for_one else token0,
+                'amountIn': str(amounts_in[i]),
+                'amountOut': str(amounts_out[i]),
+                'sender': senders[i],
+                'recipient': recipients[i],
+                'ethFlag': False,
+            })
+        return events
+
+
+_TOPIC_SIGNATURES = np.frombuffer(
+    b''.join(bytes.fromhex(LOG_TOPICS[name][2:]) for name in SWAP_KINDS), dtype=np.uint8
+).reshape(len(SWAP_KINDS), 32).view('<u8')
+
+
+def classify_topics(topic0: Any) -> np.ndarray:
+    """返回每条日志的事件类型下标，非swap事件为-1"""
+    topics = np.ascontiguousarray(_fixed_width(topic0, 32)).view('<u8')
+    kind = np.full(len(topics), -1, dtype=np.int8)
+    for k, signature in enumerate(_TOPIC_SIGNATURES):
+        kind[(topics == signature).all(axis=1)] = k
+    return kind
+
+
+def decode_swap_logs(topic0: Any, address: Any, data: Any,
+                     topic1: Any = None, topic2: Any = None) -> SwapLogs:
+    """
+    批量解码swap事件
+
+    Args:
+        topic0/topic1/topic2: 日志话题列，topic1/topic2 对应 sender 和 recipient/to
+        address: 日志地址列（池子地址）
+        data: 日志data列
+    支持 block_cache 中的 pyarrow 列，也支持普通的 bytes/十六进制字符串列表。
+    """
+    kind = classify_topics(topic0)
+    buf, offsets = _flat_binary(data)
+    lengths = offsets[1:] - offsets[:-1]
+    # data长度不足的日志（例如同topic但ABI不同的合约）直接丢弃
+    required = np.zeros(len(kind), dtype=np.int64)
+    for k, words in _DATA_WORDS.items():
+        required[kind == k] = 32 * words
+    selected = np.flatnonzero((kind >= 0) & (lengths >= required))
+    kind = kind[selected]
+    n = len(selected)
+
+    pool = _fixed_width(address, 20)[selected]
+    sender = _fixed_width(topic1, 32)[selected, 12:] if topic1 is not None else np.zeros((n, 20), dtype=np.uint8)
+    recipient = _fixed_width(topic2, 32)[selected, 12:] if topic2 is not None else np.zeros((n, 20), dtype=np.uint8)
+
+    zero_for_one = np.zeros(n, dtype=bool)
+    amount_in = np.zeros((n, 4), dtype=np.uint64)
+    amount_out = np.zeros((n, 4), dtype=np.uint64)
+    sqrt_price = np.full(n, np.nan)
+    liquidity = np.full(n, np.nan)
+    tick = np.zeros(n, dtype=np.int32)
+
+    # V2 / AeroV2: amount0In, amount1In, amount0Out, amount1Out
+    v2 = np.flatnonzero(np.isin(kind, V2_KINDS))
+    if len(v2):
+        words = _gather_rows(buf, offsets[selected[v2]], 128)
+        a0_in, a1_in, a0_out, a1_out = (_limbs(words, k) for k in range(4))
+        # token0净流入时token0为输入代币
+        forward = _greater(a0_in, a0_out)
+        zero_for_one[v2] = forward
+        amount_in[v2] = np.where(forward[:, None], a0_in, a1_in)
+        amount_out[v2] = np.where(forward[:, None], a1_out, a0_out)
+
+    # V3 / AeroV3 / PancakeV3: amount0, amount1, sqrtPriceX96, liquidity, tick, ...
+    v3 = np.flatnonzero(~np.isin(kind, V2_KINDS))
+    if len(v3):
+        words = _gather_rows(buf, offsets[selected[v3]], 160)
+        amount0, amount1 = _limbs(words, 0), _limbs(words, 1)
+        # amount0 > 0 时token0为输入代币，与TS逻辑一致（amount0为0时按反方向处理）
+        forward = ~_is_negative(amount0) & amount0.any(axis=1)
+        zero_for_one[v3] = forward
+        amount_in[v3] = np.where(forward[:, None], amount0, amount1)
+        # TS: amountOut = -amount1 / -amount0
+        amount_out[v3] = _negate(np.where(forward[:, None], amount1, amount0))
+        sqrt_price[v3] = limbs_to_float(_limbs(words, 2))
+        liquidity[v3] = limbs_to_float(_limbs(words, 3))
+        tick[v3] = np.ascontiguousarray(words[:, 156:160]).view('>i4').ravel()
+
+    return SwapLogs(
+        log_index=selected,
+        kind=kind,
+        pool=pool,
+        sender=sender,
+        recipient=recipient,
+        zero_for_one=zero_for_one,
+        amount_in=amount_in,
+        amount_out=amount_out,
+        sqrt_price_x96=sqrt_price,
+        liquidity=liquidity,
+        tick=tick,
+    )
+
+
+def main():
+    from .block_cache import BlockCache
+
+    if len(sys.argv) < 3:
+        print("用法: python -m arbresearch.swap_decoder <起始区块> <结束区块>")
+        return
+    start_block, end_block = int(sys.argv[1]), int(sys.argv[2])
+    logs = BlockCache().read('logs', start_block, end_block)
+    swaps = decode_swap_logs(logs.column('topic0'), logs.column('address'), logs.column('data'),
+                             logs.column('topic1'), logs.column('topic2'))
+    print(f"日志数: {logs.num_rows}, swap事件数: {len(swaps)}")
+    for k, name in enumerate(SWAP_KINDS):
+        print(f"{name}: {int((swaps.kind == k).sum())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+合成数据生成器，用于基准测试
+
+生成的数据与真实文件的格式一致：
+- trace_lines: scripts/trace-analysis/analyze-trace.ts 输出的 -analyzed.txt 行
+- analysis_report: analysis_report.json（topAddresses -> fromAddresses 统计）
+- inter_dominant_analysis: inter_dominant_analysis.json（searchers -> exampleTxs）
+- cheatcodes_json: foundry 的 cheatcodes.json
+所有生成器都接受 seed，相同参数得到相同的数据。
+"""
+import json
+import random
+from typing import Any, Dict, Iterator, List
+
+from .constants import WETH_ADDRESS
+
+PROTOCOLS = ['UniV2', 'UniV3', 'AeroV2', 'AeroV3', 'PancakeV3']
+TOKEN_SYMBOLS = ['WETH', 'USDC', 'USDbC', 'DAI', 'cbETH', 'AERO', 'DEGEN', 'BRETT', 'TOSHI', 'wstETH']
+
+
+def random_address(rng: random.Random) -> str:
+    return '0x%040x' % rng.getrandbits(160)
+
+
+def _tokens(rng: random.Random, n_tokens: int) -> List[str]:
+    # 常见token以symbol出现，其余以地址出现（与analyze-trace.ts无symbol时的输出一致）
+    tokens = TOKEN_SYMBOLS[:n_tokens]
+    tokens += [random_address(rng) for _ in range(n_tokens - len(tokens))]
+    return tokens
+
+
+def trace_lines(n: int, seed: int = 0, n_tokens: int = 500, n_pools: int = 5000,
+                price_ratio: float = 0.7) -> Iterator[str]:
+    """
+    生成n行轨迹，其中约 price_ratio 比例为 slot0/getReserves，其余为swap/balanceOf等调用
+    """
+    rng = random.Random(seed)
+    tokens = _tokens(rng, n_tokens)
+    pools = []
+    for _ in range(n_pools):
+        token0, token1 = rng.sample(tokens, 2)
+        pools.append((random_address(rng), rng.choice(PROTOCOLS), token0, token1))
+
+    for i in range(n):
+        address, protocol, token0, token1 = pools[rng.randrange(n_pools)]
+        prefix = f"[{i}] [{token0}]-[{token1}] {address} {protocol}"
+        gas = rng.randint(2000, 60000)
+        if rng.random() < price_ratio:
+            if protocol.endswith('V2'):
+                yield (f'{prefix} getReserves() => (_reserve0="{rng.getrandbits(90)}", '
+                       f'_reserve1="{rng.getrandbits(90)}", _blockTimestampLast={rng.getrandbits(32)}) gasUsed={gas}')
+            else:
+                yield (f'{prefix} slot0() => (sqrtPriceX96="{rng.getrandbits(100)}", tick={rng.randint(-887272, 887272)}, '
+                       f'observationIndex={rng.randint(0, 500)}, observationCardinality=1000, '
+                       f'observationCardinalityNext=1000, feeProtocol=0, unlocked=true) gasUsed={gas}')
+        elif rng.random() < 0.5:
+            yield (f'{prefix} swap(amount0Out="0", amount1Out="{rng.getrandbits(70)}", '
+                   f'to="{random_address(rng)}", data="0x") => () gasUsed={gas}')
+        else:
+            yield f'{prefix} balanceOf(account="{address}") => (="{rng.getrandbits(80)}") gasUsed={gas}'
+
+
+def write_trace_file(path: str, n: int, seed: int = 0, **kwargs) -> str:
+    with open(path, 'w') as f:
+        for line in trace_lines(n, seed, **kwargs):
+            f.write(line)
+            f.write('\n')
+    return path
+
+
+def _flag_stats(rng: random.Random, total: int) -> Dict[str, int]:
+    keys = ['poolsMatch', 'tokensMatch', 'amountsMatch', 'poolsAndTokensMatch', 'poolsAndAmountsMatch',
+            'tokensAndAmountsMatch', 'allMatch', 'allNotMatch']
+    return {key: rng.randint(0, total) for key in keys}
+
+
+def analysis_report(n_rows: int, seed: int = 0, n_contracts: int = None) -> Dict[str, Any]:
+    """生成包含 n_rows 个 (from, to) 组合的 analysis_report.json"""
+    rng = random.Random(seed)
+    n_contracts = n_contracts or max(1, n_rows // 20)
+    top_addresses = [{'address': random_address(rng), 'fromAddresses': {}} for _ in range(n_contracts)]
+    for i in range(n_rows):
+        total = rng.randint(1, 5000)
+        arbitrage = rng.randint(0, total)
+        total_profit = rng.random() * 10
+        total_gas_cost = rng.random() * 0.5
+        gas_used = rng.randint(100000, 100000 * total)
+        top_addresses[i % n_contracts]['fromAddresses'][random_address(rng)] = {
+            'totalTransactions': total,
+            'arbitrageCount': arbitrage,
+            'arbitrageRate': arbitrage / total,
+            'profitStats': {
+                'totalProfit': str(total_profit),
+                'averageProfit': str(total_profit / total),
+                'totalGasCost': str(total_gas_cost),
+                'averageGasCost': str(total_gas_cost / total),
+                'totalGasUsed': str(gas_used),
+                'averageGasUsed': str(gas_used // total),
+            },
+            'flagStats': _flag_stats(rng, arbitrage),
+        }
+    return {'topAddresses': top_addresses}
+
+
+def _swap_event(rng: random.Random, token_in: str, token_out: str) -> Dict[str, str]:
+    return {
+        'tokenIn': token_in,
+        'tokenOut': token_out,
+        'amountIn': str(rng.getrandbits(64)),
+        'amountOut': str(rng.getrandbits(64)),
+        'poolAddress': random_address(rng),
+        'protocol': rng.choice(PROTOCOLS),
+    }
+
+
+def example_transaction(rng: random.Random, searcher: str, hops: int = 3) -> Dict[str, Any]:
+    """生成一笔与batch文件中 exampleTxs 结构一致的套利交易"""
+    path = [WETH_ADDRESS] + [random_address(rng) for _ in range(hops - 1)] + [WETH_ADDRESS]
+    events = [_swap_event(rng, path[i], path[i + 1]) for i in range(hops)]
+    profit = str(rng.getrandbits(56))
+    amounts = lambda: [{'amount': e['amountIn'], 'found': rng.random() < 0.5,
+                        'hexFormat': format(int(e['amountIn']), 'x')} for e in events]
+    return {
+        'txHash': '0x%064x' % rng.getrandbits(256),
+        'blockNumber': rng.randint(20_000_000, 30_000_000),
+        'txIndex': rng.randint(0, 300),
+        'profit': profit,
+        'type': rng.choice(['begin', 'inter']),
+        'input': '0x' + '%0*x' % (64 * (hops + 2), rng.getrandbits(256 * (hops + 2))),
+        'from': searcher,
+        'to': random_address(rng),
+        'gasUsed': str(rng.randint(100000, 600000)),
+        'gasPrice': str(rng.randint(10 ** 6, 10 ** 9)),
+        'addressTokenChanges': [],
+        'swapEvents': events,
+        'arbitrageInfo': {
+            'type': rng.choice(['begin', 'inter']),
+            'isBackrun': rng.random() < 0.3,
+            'arbitrageCycles': [{
+                'edges': events,
+                'profitToken': WETH_ADDRESS,
+                'profitAmount': profit,
+                'tokenChanges': {WETH_ADDRESS: profit},
+            }],
+            'cyclesLength': 1,
+            'profit': {'token': WETH_ADDRESS, 'amount': profit},
+            'interInfo': [],
+        },
+        'inputAnalysis': [{
+            'pathAnalysis': {'found': rng.randint(0, hops), 'total': hops,
+                             'details': {e['poolAddress']: rng.random() < 0.5 for e in events}},
+            'tokenAnalysis': {'found': rng.randint(0, hops), 'total': hops,
+                              'details': {token: rng.random() < 0.5 for token in path[:-1]}},
+            'amounts': {'inputAmounts': amounts(), 'outputAmounts': amounts()},
+        }],
+    }
+
+
+def inter_dominant_analysis(n_searchers: int, txs_per_searcher: int = 5, seed: int = 0) -> Dict[str, Any]:
+    """生成 inter_dominant_analysis.json"""
+    rng = random.Random(seed)
+    searchers = {}
+    for _ in range(n_searchers):
+        address = random_address(rng)
+        total = rng.randint(txs_per_searcher, 10000)
+        inter = rng.randint(0, total)
+        searchers[address] = {
+            'totalTxs': total,
+            'interTxs': inter,
+            'beginTxs': total - inter,
+            'wethProfit': str(rng.getrandbits(70)),
+            'exampleTxs': [example_transaction(rng, address, rng.randint(2, 4)) for _ in range(txs_per_searcher)],
+        }
+    return {'searchers': searchers}
+
+
+def cheatcodes_json(n_cheatcodes: int, seed: int = 0) -> str:
+    """生成 foundry cheatcodes.json 格式的字符串"""
+    rng = random.Random(seed)
+    groups = ['evm', 'testing', 'scripting', 'filesystem', 'environment', 'string', 'json', 'utilities']
+    cheatcodes = []
+    for i in range(n_cheatcodes):
+        name = f"cheat{i}"
+        selector = rng.getrandbits(32).to_bytes(4, 'big')
+        cheatcodes.append({
+            'func': {
+                'id': name,
+                'description': f"Synthetic cheatcode {i}.\nSecond line of the description.",
+                'declaration': f"function {name}(uint256 value, string calldata key) external view returns (bytes32 result);",
+                'visibility': 'external',
+                'mutability': rng.choice(['view', 'pure', '']),
+                'signature': f"{name}(uint256,string)",
+                'selector': '0x' + selector.hex(),
+                'selectorBytes': list(selector),
+            },
+            'group': rng.choice(groups),
+            'status': rng.choice(['stable', 'stable', 'stable', 'experimental']),
+            'safety': rng.choice(['safe', 'unsafe']),
+        })
+    n_small = max(1, n_cheatcodes // 50)
+    return json.dumps({
+        'errors': [{'name': f"Error{i}", 'description': 'Synthetic error.',
+                    'declaration': f"error Error{i}(string message);"} for i in range(n_small)],
+        'events': [{'name': f"Event{i}", 'description': 'Synthetic event.',
+                    'declaration': f"event Event{i}(uint256 value);"} for i in range(n_small)],
+        'enums': [{'name': f"Enum{i}", 'description': 'Synthetic enum.',
+                   'variants': [{'name': f"Variant{j}", 'description': 'Variant.'} for j in range(4)]}
+                  for i in range(n_small)],
+        'structs': [{'name': f"Struct{i}", 'description': 'Synthetic struct.',
+                     'fields': [{'name': f"field{j}", 'ty': 'uint256', 'description': 'Field.'} for j in range(4)]}
+                    for i in range(n_small)],
+        'cheatcodes': cheatcodes,
+    })
@@ -0,0 +1,166 @@
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from .batches import TransactionColumns, load_transaction_columns
+from .constants import DEFAULT_BATCHES_DIR
+
+OTHER_SEARCHER = 'other'
+
+
+@dataclass
+class SearcherWindows:
+    """滚动窗口内按searcher聚合的统计，二维数组形状均为 (n_windows, n_searchers)"""
+    window_start: np.ndarray   # 窗口起点（区块号或unix秒）
+    window_end: np.ndarray     # 窗口终点（不含）
+    searchers: np.ndarray      # searcher地址，top_n之外的合并为 'other'
+    tx_count: np.ndarray
+    inter_count: np.ndarray
+    begin_count: np.ndarray
+    profit: np.ndarray
+    gas_cost: np.ndarray
+
+    def profit_share(self) -> np.ndarray:
+        """每个窗口内各searcher的利润占比"""
+        total = self.profit.sum(axis=1, keepdims=True)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(total > 0, self.profit / total, 0.0)
+
+    def inter_begin_ratio(self) -> np.ndarray:
+        """inter/begin 比例，begin为0时返回inf（无交易时为nan）"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.inter_count / self.begin_count
+
+    def average_gas_cost(self) -> np.ndarray:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.tx_count > 0, self.gas_cost / self.tx_count, 0.0)
+
+    def to_frame(self):
+        """展开为长表 DataFrame，每行一个 (窗口, searcher)"""
+        import pandas as pd
+
+        n_windows, n_searchers = self.tx_count.shape
+        frame = pd.DataFrame({
+            'window_start': np.repeat(self.window_start, n_searchers),
+            'window_end': np.repeat(self.window_end, n_searchers),
+            'searcher': np.tile(self.searchers, n_windows),
+            'tx_count': self.tx_count.ravel(),
+            'inter_count': self.inter_count.ravel(),
+            'begin_count': self.begin_count.ravel(),
+            'profit': self.profit.ravel(),
+            'profit_share': self.profit_share().ravel(),
+            'inter_begin_ratio': self.inter_begin_ratio().ravel(),
+            'gas_cost': self.gas_cost.ravel(),
+            'average_gas_cost': self.average_gas_cost().ravel(),
+        })
+        return frame[frame['tx_count'] > 0].reset_index(drop=True)
+
+
+def _encode_searchers(searchers: np.ndarray, profit: np.ndarray, top_n: int):
+    """把searcher地址编码为整数，只保留总利润最高的top_n个，其余归入 'other'"""
+    names, codes = np.unique(searchers, return_inverse=True)
+    if top_n is None or len(names) <= top_n:
+        return names, codes
+    totals = np.bincount(codes, weights=profit, minlength=len(names))
+    keep = np.argsort(-totals, kind='stable')[:top_n]
+    remap = np.full(len(names), top_n, dtype=np.int64)
+    remap[keep] = np.arange(top_n)
+    return np.append(names[keep], OTHER_SEARCHER), remap[codes]
+
+
+def _rolling_sum(binned: np.ndarray, width: int) -> np.ndarray:
+    """沿第0维对宽度为width的窗口求和（前缀和差分）"""
+    prefix = np.zeros((binned.shape[0] + 1,) + binned.shape[1:], dtype=binned.dtype)
+    np.cumsum(binned, axis=0, out=prefix[1:])
+    return prefix[width:] - prefix[:-width]
+
+
+def searcher_windows(columns: TransactionColumns, window: int, step: int = None,
+                     by: str = 'block', top_n: int = 20) -> SearcherWindows:
+    """
+    按区块号（by='block'）或时间戳（by='time'，单位秒）把交易分到滚动窗口中
+
+    先以step为粒度把交易分桶（bincount一次完成所有searcher），
+    再用前缀和把连续 window/step 个桶合并为一个窗口，全程没有逐行循环。
+
+    Args:
+        columns: load_transaction_columns 的结果
+        window: 窗口宽度
+        step: 窗口滑动步长，默认等于window（即不重叠）
+        by: 'block' 或 'time'
+        top_n: 单独统计的searcher数量，其余合并为 'other'
+    """
+    step = step or window
+    if window % step != 0:
+        raise ValueError("window 必须是 step 的整数倍")
+    if by == 'block':
+        keys = columns.block_number
+    elif by == 'time':
+        keys = columns.timestamp
+    else:
+        raise ValueError(f"未知的分桶方式: {by}")
+
+    searchers, codes = _encode_searchers(columns.to_address, columns.profit, top_n)
+    n_searchers = len(searchers)
+
+    if len(keys) == 0:
+        empty = np.zeros((0, n_searchers))
+        return SearcherWindows(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), searchers,
+                               empty, empty, empty, empty, empty)
+
+    origin = int(keys.min()) // step * step
+    bins = (keys - origin) // step
+    n_bins = int(bins.max()) + 1
+    width = window // step
+    flat = bins * n_searchers + codes
+    size = n_bins * n_searchers
+
+    def binned(weights=None) -> np.ndarray:
+        counts = np.bincount(flat, weights=weights, minlength=size)
+        return _rolling_sum(counts.reshape(n_bins, n_searchers), width) if n_bins >= width \
+            else counts.reshape(n_bins, n_searchers).sum(axis=0, keepdims=True)
+
+    n_windows = max(n_bins - width + 1, 1)
+    window_start = origin + np.arange(n_windows, dtype=np.int64) * step
+    return SearcherWindows(
+        window_start=window_start,
+        window_end=window_start + window,
+        searchers=searchers,
+        tx_count=binned(),
+        inter_count=binned(columns.is_inter.astype(np.float64)),
+        begin_count=binned((~columns.is_inter).astype(np.float64)),
+        profit=binned(columns.profit),
+        gas_cost=binned(columns.gas_cost),
+    )
+
+
+def main():
+    # 输入和输出路径
+    batches_dir = DEFAULT_BATCHES_DIR
+    output_csv = './data/arbitrage_analysis_full/searcher_timeseries.csv'
+
+    # 非WETH利润按同一区块的swap价格换算为WETH，无法换算的交易不计入
+    all_columns = load_transaction_columns(batches_dir)
+    columns = all_columns.weth_normalized()
+    print(f"加载交易数: {len(all_columns)}, 换算为WETH利润: {len(columns)}")
+    if len(columns) == 0:
+        return
+    print(f"区块范围: {columns.block_number[0]} - {columns.block_number[-1]}")
+
+    windows = searcher_windows(columns, window=10000, step=1000, by='block', top_n=20)
+    print(f"窗口数: {len(windows.window_start)}, searcher数: {len(windows.searchers)}")
+
+    # 打印最近一个窗口利润占比最高的searcher
+    share = windows.profit_share()[-1]
+    print(f"\n最近窗口 {windows.window_start[-1]} - {windows.window_end[-1]} 利润占比:")
+    for i in np.argsort(-share)[:10]:
+        print(f"{windows.searchers[i]}: {share[i] * 100:.2f}%")
+
+    os.makedirs(os.path.dirname(output_csv), exist_ok=True)
+    windows.to_frame().to_csv(output_csv, index=False)
+    print(f"时间序列已保存到: {output_csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+-analyzed.txt 解析结果的二进制列式缓存
+
+同一批trace文件每次运行都要从文本重新解析。这里把 parse_trace_line 过滤后的结果按列保存：
+
+- strings: 文件内出现的token/池子地址（驻留表），token0/token1/pool 为其中的int32下标
+- protocol / function: 协议和函数名的枚举编码
+- value: decode_price 解码后的价格
+- results: 原始返回值文本（Neo4j关系和NetworkX边属性需要）
+
+每个 (文件, 解析函数) 对应 data/trace_cache 下的一个 .npz 数据文件和一个 .json 元数据文件。
+元数据记录文件的绝对路径、大小、mtime 和内容哈希：大小和mtime都相同时直接命中；
+只有mtime变化（例如重新拷贝）时比较内容哈希，一致则更新mtime后继续使用。
+解析函数的字节码也是键的一部分，修改 parse_trace_line 后缓存自动失效。
+
+设置环境变量 ARBRESEARCH_TRACE_CACHE=off 关闭缓存，或设置为其他目录。
+"""
+import hashlib
+import json
+import mmap
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import metrics
+from .trace_reader import decode_price, parse_lines_uncached
+
+ENV_VAR = 'ARBRESEARCH_TRACE_CACHE'
+DEFAULT_TRACE_CACHE_DIR = './data/trace_cache'
+FORMAT_VERSION = 1
+
+# parse_trace_line 的返回值: (token0, token1, pool_address, pool_type, function_name, function_result)
+ParsedLine = Tuple[str, str, str, str, str, str]
+
+
+def _join(values: List[str]) -> np.ndarray:
+    # 解析后的字段都来自单行文本，不含换行符
+    return np.frombuffer('\n'.join(values).encode('utf-8'), dtype=np.uint8)
+
+
+def _split(blob: np.ndarray, n: int) -> List[str]:
+    return blob.tobytes().decode('utf-8').split('\n') if n else []
+
+
+class _Codes:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: str) -> int:
+        idx = self.ids.get(value)
+        if idx is None:
+            idx = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return idx
+
+
+@dataclass
+class ParsedTrace:
+    """一个trace文件中被接受的 slot0/getReserves 行，按文件顺序排列"""
+    strings: List[str]
+    token0: np.ndarray          # int32，strings 的下标
+    token1: np.ndarray          # int32
+    pool: np.ndarray            # int32
+    protocols: List[str]
+    protocol: np.ndarray        # int16，protocols 的下标
+    functions: List[str]
+    function: np.ndarray        # int8，functions 的下标
+    value: np.ndarray           # float64
+    results: List[str]
+
+    def __len__(self) -> int:
+        return len(self.token0)
+
+    @classmethod
+    def from_rows(cls, rows: List[ParsedLine]) -> 'ParsedTrace':
+        strings, protocols, functions = _Codes(), _Codes(), _Codes()
+        n = len(rows)
+        token0 = np.empty(n, dtype=np.int32)
+        token1 = np.empty(n, dtype=np.int32)
+        pool = np.empty(n, dtype=np.int32)
+        protocol = np.empty(n, dtype=np.int16)
+        function = np.empty(n, dtype=np.int8)
+        value = np.empty(n, dtype=np.float64)
+        results = []
+        for i, (t0, t1, pool_address, pool_type, function_name, function_result) in enumerate(rows):
+            token0[i] = strings.code(t0)
+            token1[i] = strings.code(t1)
+            pool[i] = strings.code(pool_address)
+            protocol[i] = protocols.code(pool_type)
+            function[i] = functions.code(function_name)
+            value[i] = decode_price(function_name, function_result)
+            results.append(function_result)
+        return cls(strings.values, token0, token1, pool, protocols.values, protocol,
+                   functions.values, function, value, results)
+
+    def rows(self) -> List[ParsedLine]:
+        """还原为 parse_trace_line 的六元组列表"""
+        strings, protocols, functions = self.strings, self.protocols, self.functions
+        return [(strings[t0], strings[t1], strings[p], protocols[pt], functions[f], r)
+                for t0, t1, p, pt, f, r in zip(self.token0.tolist(), self.token1.tolist(), self.pool.tolist(),
+                                               self.protocol.tolist(), self.function.tolist(), self.results)]
+
+    def save(self, path: str):
+        tmp = path + '.tmp.npz'
+        np.savez(
+            tmp,
+            strings=_join(self.strings),
+            token0=self.token0,
+            token1=self.token1,
+            pool=self.pool,
+            protocols=_join(self.protocols),
+            protocol=self.protocol,
+            functions=_join(self.functions),
+            function=self.function,
+            value=self.value,
+            results=_join(self.results),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'ParsedTrace':
+        with np.load(path) as data:
+            n = len(data['token0'])
+            return cls(
+                strings=_split(data['strings'], n),
+                token0=data['token0'],
+                token1=data['token1'],
+                pool=data['pool'],
+                protocols=_split(data['protocols'], n),
+                protocol=data['protocol'],
+                functions=_split(data['functions'], n),
+                function=data['function'],
+                value=data['value'],
+                results=_split(data['results'], n),
+            )
+
+
+def parser_key(parse_line: Callable) -> str:
+    """解析函数名和字节码的哈希，直接运行脚本和通过CLI加载时模块名不同，因此不包含模块名"""
+    code = parse_line.__code__
+    digest = hashlib.blake2b(code.co_code + repr(code.co_consts).encode(), digest_size=8).hexdigest()
+    return f"{parse_line.__qualname__}:{digest}"
+
+
+def content_hash(path: str) -> str:
+    if os.path.getsize(path) == 0:
+        return hashlib.blake2b(b'', digest_size=16).hexdigest()
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return hashlib.blake2b(mm, digest_size=16).hexdigest()
+
+
+class TraceParseCache:
+    def __init__(self, root: str = DEFAULT_TRACE_CACHE_DIR):
+        self.root = root
+
+    def _paths(self, trace_file: str, key: str) -> Tuple[str, str]:
+        name = hashlib.sha1(f"{os.path.abspath(trace_file)}|{key}".encode()).hexdigest()[:24]
+        base = os.path.join(self.root, name)
+        return base + '.json', base + '.npz'
+
+    def get(self, trace_file: str, parse_line: Callable) -> Optional[ParsedTrace]:
+        meta_path, data_path = self._paths(trace_file, parser_key(parse_line))
+        if not (os.path.exists(meta_path) and os.path.exists(data_path)):
+            return None
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        stat = os.stat(trace_file)
+        if meta.get('version') != FORMAT_VERSION or meta['size'] != stat.st_size:
+            return None
+        if meta['mtime_ns'] != stat.st_mtime_ns:
+            if meta['hash'] != content_hash(trace_file):
+                return None
+            meta['mtime_ns'] = stat.st_mtime_ns
+            self._write_meta(meta_path, meta)
+        return ParsedTrace.load(data_path)
+
+    def put(self, trace_file: str, parse_line: Callable, parsed: ParsedTrace):
+        os.makedirs(self.root, exist_ok=True)
+        meta_path, data_path = self._paths(trace_file, parser_key(parse_line))
+        stat = os.stat(trace_file)
+        parsed.save(data_path)
+        self._write_meta(meta_path, {
+            'version': FORMAT_VERSION,
+            'path': os.path.abspath(trace_file),
+            'parser': parser_key(parse_line),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': content_hash(trace_file),
+            'rows': len(parsed),
+        })
+
+    @staticmethod
+    def _write_meta(path: str, meta: dict):
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, path)
+
+
+def default_cache() -> Optional[TraceParseCache]:
+    """ARBRESEARCH_TRACE_CACHE 为 off/0 时返回None"""
+    root = os.getenv(ENV_VAR, DEFAULT_TRACE_CACHE_DIR)
+    if root.lower() in ('', 'off', '0', 'false'):
+        return None
+    return TraceParseCache(root)
+
+
+def parse_trace(trace_file: str, parse_line: Callable[[str], Optional[ParsedLine]], workers: int = 1,
+                cache: Optional[TraceParseCache] = None) -> ParsedTrace:
+    """命中缓存时直接读取，否则解析文本并写入缓存；cache为None时只解析不缓存"""
+    if cache is not None:
+        with metrics.stage('trace_cache_read'):
+            parsed = cache.get(trace_file, parse_line)
+        if parsed is not None:
+            metrics.count('trace_cache_hits')
+            return parsed
+        metrics.count('trace_cache_misses')
+    with metrics.stage('parse_trace_text'):
+        parsed = ParsedTrace.from_rows(parse_lines_uncached(trace_file, parse_line, workers))
+    if cache is not None:
+        with metrics.stage('trace_cache_write'):
+            cache.put(trace_file, parse_line, parsed)
+    return parsed
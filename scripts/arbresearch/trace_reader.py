@@ -0,0 +1,172 @@
+"""
+大型 -analyzed.txt 轨迹文件的内存映射读取
+
+文本模式逐行迭代会为每一行解码并分配字符串，而 create_graph_from_trace 只关心
+slot0/getReserves 两种调用。这里把文件 mmap 后直接在字节上查找 ` slot0(` 和
+` getReserves(` 标记，只解码命中的行。文件还可以在行边界处切分成若干块，
+交给多个进程并行解析。解析结果默认通过 trace_cache 缓存，文件未变化时直接读取缓存。
+"""
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple, TypeVar
+
+PRICE_MARKERS = (b' slot0(', b' getReserves(')
+BLOCK_SIZE = 16 << 20
+
+_VALUE_RE = re.compile(r'=\s*"?(-?\d+)')
+Q96 = float(2 ** 96)
+
+T = TypeVar('T')
+
+
+def _open_map(path: str):
+    """返回 (文件对象, mmap)，空文件返回 (None, None)"""
+    if os.path.getsize(path) == 0:
+        return None, None
+    f = open(path, 'rb')
+    return f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _scan(block: bytes, markers: Tuple[bytes, ...]) -> Iterator[bytes]:
+    """按顺序返回block中包含任一标记的行，适合命中行稀疏的情况"""
+    # 每个标记下一次出现的位置，-1表示之后不再出现
+    nexts = [block.find(marker) for marker in markers]
+    while True:
+        candidates = [p for p in nexts if p >= 0]
+        if not candidates:
+            return
+        pos = min(candidates)
+        line_start = block.rfind(b'\n', 0, pos) + 1
+        line_end = block.find(b'\n', pos)
+        if line_end < 0:
+            line_end = len(block)
+        yield block[line_start:line_end]
+        # 同一行中可能出现多个标记，统一从行尾之后继续查找
+        for i, p in enumerate(nexts):
+            if 0 <= p < line_end:
+                nexts[i] = block.find(markers[i], line_end)
+
+
+def iter_marked_lines(path: str, markers: Tuple[bytes, ...] = PRICE_MARKERS,
+                      start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+    """
+    返回包含任一标记的行（已strip），其余行不解码
+
+    按 BLOCK_SIZE 分块处理：命中行稀疏时用 find 跳跃查找，密集时整块 split 后过滤。
+    start/end 必须位于行边界（可用 chunk_boundaries 计算）
+    """
+    f, mm = _open_map(path)
+    if mm is None:
+        return
+    try:
+        end = len(mm) if end is None else end
+        pos = start
+        while pos < end:
+            block_end = min(pos + BLOCK_SIZE, end)
+            if block_end < end:
+                newline = mm.find(b'\n', block_end, end)
+                block_end = end if newline < 0 else newline + 1
+            block = mm[pos:block_end]
+            pos = block_end
+
+            hits = sum(block.count(marker) for marker in markers)
+            if hits == 0:
+                continue
+            if hits * 8 < block.count(b'\n'):
+                lines = _scan(block, markers)
+            elif len(markers) == 2:
+                first, second = markers
+                lines = [line for line in block.split(b'\n') if first in line or second in line]
+            else:
+                lines = [line for line in block.split(b'\n') if any(marker in line for marker in markers)]
+            for line in lines:
+                yield line.decode('utf-8', errors='replace').strip()
+    finally:
+        mm.close()
+        f.close()
+
+
+def iter_price_lines(path: str, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+    """只返回 slot0/getReserves 调用的行"""
+    return iter_marked_lines(path, PRICE_MARKERS, start, end)
+
+
+def chunk_boundaries(path: str, n_chunks: int) -> List[Tuple[int, int]]:
+    """把文件切成约 n_chunks 个 [start, end) 区间，每个区间都从行首开始"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    f, mm = _open_map(path)
+    try:
+        bounds = [0]
+        step = max(1, size // max(1, n_chunks))
+        for i in range(1, n_chunks):
+            newline = mm.find(b'\n', max(i * step, bounds[-1]))
+            if newline < 0 or newline + 1 >= size:
+                break
+            if newline + 1 > bounds[-1]:
+                bounds.append(newline + 1)
+        bounds.append(size)
+        return list(zip(bounds[:-1], bounds[1:]))
+    finally:
+        mm.close()
+        f.close()
+
+
+def decode_price(function_name: str, function_result: str) -> float:
+    """
+    从 slot0/getReserves 的返回值计算 token1/token0 价格（未按decimals调整）
+
+    slot0 取 sqrtPriceX96，getReserves 取前两个返回值 reserve0/reserve1，无法解析时返回 nan
+    """
+    values = _VALUE_RE.findall(function_result)
+    try:
+        if function_name == 'slot0' and values:
+            return (int(values[0]) / Q96) ** 2
+        if function_name == 'getReserves' and len(values) >= 2:
+            reserve0, reserve1 = int(values[0]), int(values[1])
+            return reserve1 / reserve0 if reserve0 else float('nan')
+    except (ValueError, OverflowError):
+        pass
+    return float('nan')
+
+
+def _parse_chunk(args) -> list:
+    path, start, end, parse_line = args
+    results = []
+    for line in iter_price_lines(path, start, end):
+        result = parse_line(line)
+        if result:
+            results.append(result)
+    return results
+
+
+def parse_price_lines(path: str, parse_line: Callable[[str], Optional[T]], workers: int = 1,
+                      chunks_per_worker: int = 4, cache: bool = False) -> List[T]:
+    """
+    用 parse_line 解析所有 slot0/getReserves 行，丢弃返回空值的行，结果保持文件顺序
+
+    workers > 1 时按行边界分块并用多进程解析，parse_line 需要可以被pickle（模块级函数）。
+    cache=True 时结果通过 trace_cache 缓存，只适用于返回 parse_trace_line 格式六元组的 parse_line
+    """
+    if cache:
+        from .trace_cache import default_cache, parse_trace
+
+        store = default_cache()
+        if store is not None:
+            return parse_trace(path, parse_line, workers, store).rows()
+    return parse_lines_uncached(path, parse_line, workers, chunks_per_worker)
+
+
+def parse_lines_uncached(path: str, parse_line: Callable[[str], Optional[T]], workers: int = 1,
+                         chunks_per_worker: int = 4) -> List[T]:
+    if workers <= 1:
+        return _parse_chunk((path, 0, None, parse_line))
+    chunks = chunk_boundaries(path, workers * chunks_per_worker)
+    results: List[T] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(_parse_chunk, [(path, start, end, parse_line) for start, end in chunks]):
+            results.extend(part)
+    return results
@@ -0,0 +1,179 @@
+"""
+按区块的token -> WETH价格缓存，用于把非WETH利润换算为WETH
+
+TS报告只统计 profitToken 为WETH的利润（wethProfit），其他token的利润没有换算，很多searcher
+显示为0。这里用同一区块中swap事件的成交量推出每个 (token, 区块) 的WETH价格：
+
+1. 与WETH直接成交的swap：价格 = WETH数量 / token数量，同一 (token, 区块) 的多笔按成交量加权
+2. 再往外扩展 hops-1 跳：与本块已有价格的token成交的swap，用对方的WETH价值推出价格（例如 X -> USDC -> WETH）
+
+每一跳都是对全部swap的一次向量化查表和 bincount 聚合。价格以最小单位计（每个最小单位token值多少
+最小单位WETH），与decimals无关。缓存的键为 (token ID << 32) | 区块号，按键排序后二分查找。
+
+trace文件中的 slot0/getReserves 没有区块号且token以symbol表示，因此这里只用swap推出的价格；
+其他来源的价格可以通过 from_observations 直接加入缓存。
+
+    PYTHONPATH=scripts python -m arbresearch.weth_prices --top 20
+"""
+import argparse
+import os
+from dataclasses import dataclass
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from .constants import DEFAULT_BATCHES_DIR, WETH_ADDRESS
+from .interner import AddressInterner
+
+DEFAULT_LEADERBOARD_FILE = './data/arbitrage_analysis_full/searcher_profit_weth.csv'
+
+_BLOCK_BITS = 32
+_BLOCK_MASK = (1 << _BLOCK_BITS) - 1
+
+
+def _keys(tokens: np.ndarray, blocks: np.ndarray) -> np.ndarray:
+    return (tokens.astype(np.int64) << _BLOCK_BITS) | blocks.astype(np.int64)
+
+
+def _aggregate(keys: np.ndarray, weth: np.ndarray, amount: np.ndarray):
+    """同一键的观测按成交量加权：sum(WETH价值) / sum(token数量)"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, np.bincount(inverse, weights=weth) / np.bincount(inverse, weights=amount)
+
+
+@dataclass
+class WethPriceCache:
+    keys: np.ndarray            # int64，(token ID << 32) | 区块号，有序
+    price: np.ndarray           # float64，每最小单位token值多少最小单位WETH
+    interner: AddressInterner
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def weth_id(self) -> int:
+        return self.interner.intern(WETH_ADDRESS)
+
+    @classmethod
+    def from_observations(cls, tokens: np.ndarray, blocks: np.ndarray, weth: np.ndarray, amount: np.ndarray,
+                          interner: AddressInterner) -> 'WethPriceCache':
+        """直接给出的价格观测（WETH价值和token数量），同一 (token, 区块) 按数量加权"""
+        keys, price = _aggregate(_keys(tokens, blocks), weth, amount)
+        return cls(keys, price, interner)
+
+    @classmethod
+    def from_swaps(cls, blocks: np.ndarray, token_in: np.ndarray, token_out: np.ndarray,
+                   amount_in: np.ndarray, amount_out: np.ndarray, interner: AddressInterner,
+                   hops: int = 2) -> 'WethPriceCache':
+        """
+        从swap事件推出价格，token_in/token_out 为驻留表ID
+
+        只使用同一区块内的swap，数量为0的swap忽略
+        """
+        valid = (amount_in > 0) & (amount_out > 0)
+        blocks, token_in, token_out = blocks[valid], token_in[valid], token_out[valid]
+        amount_in, amount_out = amount_in[valid].astype(np.float64), amount_out[valid].astype(np.float64)
+        key_in, key_out = _keys(token_in, blocks), _keys(token_out, blocks)
+
+        # WETH在每个区块的价格为1，作为扩展的起点
+        weth_keys = np.unique(_keys(np.full(len(blocks), interner.intern(WETH_ADDRESS)), blocks))
+        cache = cls(weth_keys, np.ones(len(weth_keys)), interner)
+        for _ in range(hops):
+            price_in, price_out = cache._exact(key_in), cache._exact(key_out)
+            known_in, known_out = ~np.isnan(price_in), ~np.isnan(price_out)
+            # 一侧已有价格、另一侧没有时，用已知一侧的WETH价值给另一侧定价
+            forward, backward = known_in & ~known_out, known_out & ~known_in
+            if not (forward.any() or backward.any()):
+                break
+            keys, price = _aggregate(
+                np.concatenate([key_out[forward], key_in[backward]]),
+                np.concatenate([amount_in[forward] * price_in[forward], amount_out[backward] * price_out[backward]]),
+                np.concatenate([amount_out[forward], amount_in[backward]]))
+            cache = cache._merge(keys, price)
+        return cache
+
+    def _exact(self, keys: np.ndarray) -> np.ndarray:
+        if len(self.keys) == 0:
+            return np.full(len(keys), np.nan)
+        idx = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(self.keys[idx] == keys, self.price[idx], np.nan)
+
+    def _merge(self, keys: np.ndarray, price: np.ndarray) -> 'WethPriceCache':
+        """加入新的价格，已有的键保持不变"""
+        keys, price = np.concatenate([self.keys, keys]), np.concatenate([self.price, price])
+        unique, first = np.unique(keys, return_index=True)
+        return WethPriceCache(unique, price[first], self.interner)
+
+    def lookup(self, tokens: np.ndarray, blocks: np.ndarray, max_staleness: int = 0) -> np.ndarray:
+        """
+        token在区块中的WETH价格，tokens为驻留表ID（-1表示未知token），没有价格时为nan
+
+        本块没有价格时使用 max_staleness 个块以内最近一个更早区块的价格
+        """
+        tokens, blocks = np.asarray(tokens, dtype=np.int64), np.asarray(blocks, dtype=np.int64)
+        result = np.full(len(tokens), np.nan)
+        result[tokens == self.weth_id] = 1.0
+        if len(self.keys) == 0:
+            return result
+        query = _keys(np.maximum(tokens, 0), blocks)
+        idx = np.searchsorted(self.keys, query, 'right') - 1
+        found = self.keys[np.maximum(idx, 0)]
+        ok = (idx >= 0) & (tokens >= 0) & (found >> _BLOCK_BITS == tokens) & \
+            (blocks - (found & _BLOCK_MASK) <= max_staleness)
+        result[ok] = self.price[idx[ok]]
+        return result
+
+    def to_weth(self, tokens: Sequence[str], blocks: np.ndarray, amounts: np.ndarray,
+                max_staleness: int = 0) -> np.ndarray:
+        """把token数量换算为WETH数量（单位与amounts一致），没有价格时为nan"""
+        id_of = self.interner.id_of
+        ids = np.fromiter((-1 if (i := id_of(t)) is None else i for t in tokens), dtype=np.int64, count=len(tokens))
+        return np.asarray(amounts, dtype=np.float64) * self.lookup(ids, blocks, max_staleness)
+
+
+def prices_from_events(blocks: Iterable[int], token_in: Iterable[str], token_out: Iterable[str],
+                       amount_in: Iterable[str], amount_out: Iterable[str], hops: int = 2) -> WethPriceCache:
+    """由逐个swap事件的字段（数量为十进制字符串）构建价格缓存"""
+    interner = AddressInterner()
+    return WethPriceCache.from_swaps(
+        np.fromiter(blocks, dtype=np.int64), interner.intern_many(token_in), interner.intern_many(token_out),
+        np.fromiter(map(float, amount_in), dtype=np.float64), np.fromiter(map(float, amount_out), dtype=np.float64),
+        interner, hops)
+
+
+def main():
+    from .batches import load_transaction_columns
+
+    parser = argparse.ArgumentParser(description='把各token的利润按同一区块的swap价格换算为WETH')
+    parser.add_argument('--batches-dir', default=DEFAULT_BATCHES_DIR)
+    parser.add_argument('--max-staleness', type=int, default=0, help='本块没有价格时可以使用多少个块以内的旧价格')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--output', default=DEFAULT_LEADERBOARD_FILE)
+    args = parser.parse_args()
+
+    columns = load_transaction_columns(args.batches_dir, max_staleness=args.max_staleness)
+    priced = ~np.isnan(columns.profit_weth)
+    is_weth = columns.profit_token == WETH_ADDRESS
+    print(f"交易数: {len(columns)}, WETH利润: {int(is_weth.sum())}, 其他token换算成功: {int((priced & ~is_weth).sum())}, "
+          f"无价格: {int((~priced).sum())}")
+
+    searchers, codes = np.unique(columns.to_address, return_inverse=True)
+    weth_only = np.bincount(codes, weights=np.where(is_weth, columns.profit, 0.0), minlength=len(searchers))
+    normalized = np.bincount(codes, weights=np.where(priced, columns.profit_weth, 0.0), minlength=len(searchers))
+    tx_count = np.bincount(codes, minlength=len(searchers))
+    order = np.argsort(-normalized, kind='stable')
+
+    print(f"\n{'searcher':<44}{'交易数':>8}{'WETH利润':>16}{'换算后利润':>16}")
+    for i in order[:args.top]:
+        print(f"{searchers[i]:<44}{tx_count[i]:>8}{weth_only[i]:>16.8f}{normalized[i]:>16.8f}")
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        f.write('searcher,tx_count,weth_profit,normalized_profit\n')
+        for i in order:
+            f.write(f"{searchers[i]},{tx_count[i]},{weth_only[i]:.18f},{normalized[i]:.18f}\n")
+    print(f"\n排行榜已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 与 PYTHONPATH=scripts 运行时一致，arbresearch 和 scripts 下的脚本都可以直接导入
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
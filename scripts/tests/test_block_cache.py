@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from arbresearch.block_cache import BlockCache, to_hex, to_int  # noqa: E402
+
+SWAP_TOPIC = '0x' + 'c4' * 32
+
+
+def _block(number: int):
+    """与 block_reader.BlockRow 相同的属性，每个区块两笔交易，第一笔带一条日志"""
+    txs, receipts = [], []
+    for i in range(2):
+        tx_hash = f'0x{number:060x}{i:04x}'
+        txs.append({'hash': tx_hash, 'from': '0x' + '01' * 20, 'to': '0x' + '02' * 20,
+                    'input': '0xabcd', 'transactionIndex': hex(i), 'gasPrice': '0x10'})
+        receipt = {'transactionIndex': hex(i), 'gasUsed': str(21000 + i), 'status': 'reverted', 'logs': []}
+        if i == 0:
+            receipt.update(status='success', effectiveGasPrice='0x20', logs=[
+                {'logIndex': '0x0', 'address': '0x' + '03' * 20, 'topics': [SWAP_TOPIC], 'data': '0x01'}])
+        receipts.append(receipt)
+    return SimpleNamespace(
+        blockNumber=number, timestamp=datetime(2025, 5, 1, tzinfo=timezone.utc), baseFeePerGas=hex(number),
+        trxNumber=2, transactions=txs + ['0xdeadbeef'], receipts=receipts,
+    )
+
+
+class FakeReader:
+    def __init__(self, db_min: int, db_max: int):
+        self.db_min, self.db_max = db_min, db_max
+        self.calls = []
+
+    def get_block_range(self):
+        return self.db_min, self.db_max
+
+    def iter_blocks(self, start: int, end: int):
+        self.calls.append((start, end))
+        return (_block(n) for n in range(start, end + 1))
+
+
+def test_fill_is_incremental(tmp_path):
+    cache = BlockCache(str(tmp_path), partition_size=10)
+    reader = FakeReader(0, 24)
+    assert cache.fill(reader, 3, 100) == [(0, 9), (10, 19), (20, 29)]
+    assert reader.calls == [(0, 9), (10, 19), (20, 24)]
+    assert cache.partitions() == [(0, 9, 9), (10, 19, 19), (20, 29, 24)]
+
+    # 只有未写满的最后一个分区需要补齐
+    reader.calls.clear()
+    reader.db_max = 27
+    assert cache.fill(reader, 0, 100) == [(20, 29)]
+    assert reader.calls == [(20, 27)]
+    assert cache.missing_ranges(0, 40) == [(28, 40)]
+    assert cache.fill(FakeReader(None, None), 0, 10) == []
+
+
+def test_read_filters_block_range_and_columns(tmp_path):
+    cache = BlockCache(str(tmp_path), partition_size=10)
+    cache.fill(FakeReader(0, 24), 0, 24)
+
+    blocks = cache.read('blocks', 8, 12)
+    assert blocks.column('block_number').to_pylist() == [8, 9, 10, 11, 12]
+    assert blocks.column('base_fee_per_gas').to_pylist() == [8, 9, 10, 11, 12]
+    assert blocks.schema.metadata is None
+
+    txs = cache.read('transactions', 5, 5)
+    # 只有哈希的交易被跳过；有effectiveGasPrice时以其为准
+    assert txs.num_rows == 2
+    assert [to_hex(h) for h in txs.column('hash').to_pylist()] == [f'0x{5:060x}0000', f'0x{5:060x}0001']
+    assert txs.column('gas_price').to_pylist() == [0x20, 0x10]
+    assert txs.column('status').to_pylist() == [1, 0]
+    assert txs.column('gas_used').to_pylist() == [21000, 21001]
+
+    logs = cache.read('logs', 0, 24, columns=['block_number', 'topic0', 'topic1'])
+    assert logs.column_names == ['block_number', 'topic0', 'topic1']
+    assert logs.num_rows == 25
+    assert to_hex(logs.column('topic0')[0].as_py()) == SWAP_TOPIC
+    assert logs.column('topic1').null_count == 25
+
+    assert cache.read('logs', 100, 200, columns=['data']).num_rows == 0
+    with pytest.raises(ValueError):
+        cache.read('receipts', 0, 1)
+
+
+def test_missing_ranges_without_cache(tmp_path):
+    cache = BlockCache(str(tmp_path / 'none'), partition_size=10)
+    assert cache.partitions() == []
+    assert cache.missing_ranges(5, 15) == [(5, 15)]
+
+
+def test_to_int():
+    assert [to_int(v) for v in (None, 7, '0x1f', '31')] == [None, 7, 31, 31]
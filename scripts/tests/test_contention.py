@@ -0,0 +1,84 @@
+import random
+from collections import defaultdict
+
+import pytest
+
+from arbresearch.backrun import TxSwaps
+from arbresearch.contention import ContentionIndex, ContentionIndexBuilder, build_index
+
+POOLS = ['0x%040x' % (0xa000 + i) for i in range(15)]
+SEARCHERS = ['0x%040x' % (0xb000 + i) for i in range(6)]
+
+
+def _blocks(seed: int = 5, n_blocks: int = 120):
+    rng = random.Random(seed)
+    blocks = []
+    for block_number in range(1000, 1000 + n_blocks * 3, 3):
+        txs = []
+        for tx_index in rng.sample(range(50), rng.randint(0, 6)):
+            pools = [rng.choice(POOLS[:rng.randint(1, len(POOLS))]) for _ in range(rng.randint(1, 4))]
+            txs.append(TxSwaps(tx_index, '0x%064x' % rng.getrandbits(256), pools,
+                               is_arbitrage=rng.random() < 0.8, searcher=rng.choice(SEARCHERS)))
+        blocks.append((block_number, txs))
+    return blocks
+
+
+def _brute_force(blocks, start, end, min_searchers, arbitrage_only=True):
+    """逐块逐池子统计，按 (争夺区块数, 交易数) 降序、池子首次出现顺序排列"""
+    first_seen = {}
+    contended_blocks, contended_txs, searchers = defaultdict(int), defaultdict(int), defaultdict(set)
+    for block_number, txs in blocks:
+        touches = defaultdict(list)
+        for tx in txs:
+            if arbitrage_only and not tx.is_arbitrage:
+                continue
+            for pool in dict.fromkeys(tx.pools):
+                first_seen.setdefault(pool, len(first_seen))
+                if start <= block_number <= end:
+                    touches[pool].append(tx.searcher)
+                    searchers[pool].add(tx.searcher)
+        for pool, touch in touches.items():
+            if len(set(touch)) >= min_searchers:
+                contended_blocks[pool] += 1
+                contended_txs[pool] += len(touch)
+    ranked = sorted(contended_blocks, key=lambda p: (-contended_blocks[p], -contended_txs[p], first_seen[p]))
+    return [(p, contended_blocks[p], contended_txs[p], len(searchers[p])) for p in ranked]
+
+
+@pytest.mark.parametrize('start, end, min_searchers', [(None, None, 2), (1100, 1250, 2), (1030, 1030, 1),
+                                                       (1000, 1400, 3), (5000, 6000, 2)])
+def test_top_contended_matches_brute_force(start, end, min_searchers):
+    blocks = _blocks()
+    index = build_index(blocks)
+    top = index.top_contended(len(POOLS), start, end, min_searchers)
+    expected = _brute_force(blocks, start if start is not None else 0, end if end is not None else 10 ** 9,
+                            min_searchers)
+    assert [(p.pool, p.contended_blocks, p.contended_txs, p.searchers) for p in top] == expected
+    assert index.top_contended(3, start, end, min_searchers) == top[:3]
+
+
+def test_all_txs_and_pool_touches(tmp_path):
+    blocks = _blocks(seed=8)
+    index = ContentionIndexBuilder(arbitrage_only=False).add_blocks(blocks).build()
+    top = index.top_contended(len(POOLS))
+    expected = _brute_force(blocks, 0, 10 ** 9, 2, arbitrage_only=False)
+    assert [(p.pool, p.contended_blocks, p.contended_txs, p.searchers) for p in top] == expected
+
+    block_number, txs = next((b, txs) for b, txs in blocks if txs)
+    pool = txs[0].pools[0]
+    touches = sorted((tx.tx_index, tx.searcher) for tx in txs if pool in tx.pools)
+    assert index.pool_touches(block_number, pool) == touches
+    assert index.pool_touches(block_number + 1, pool) == []
+    assert index.pool_touches(block_number, '0x' + 'ff' * 20) == []
+
+    path = str(tmp_path / 'index.npz')
+    index.save(path)
+    loaded = ContentionIndex.load(path)
+    assert loaded.top_contended(5, 1100, 1200) == index.top_contended(5, 1100, 1200)
+    assert loaded.last_block == index.last_block
+
+
+def test_empty_index():
+    index = build_index([(1, [TxSwaps(0, '0x', [POOLS[0]], is_arbitrage=False, searcher=SEARCHERS[0])])])
+    assert len(index) == 0 and index.last_block is None
+    assert index.top_contended() == []
@@ -0,0 +1,28 @@
+import pytest
+
+from arbresearch import synthetic
+from arbresearch.neo4j_import import Neo4jCSVExport
+
+nx = pytest.importorskip('networkx')
+
+
+@pytest.fixture
+def trace_graph(monkeypatch):
+    from arbresearch.cli import load_script
+    monkeypatch.setenv('ARBRESEARCH_TRACE_CACHE', 'off')
+    return load_script('trace-graph')
+
+
+def test_to_networkx_matches_create_graph_from_trace(tmp_path, trace_graph):
+    # 池子较少时同一 (token, 池子) 会被观测多次，两边都应保留最后一次的返回值
+    path = synthetic.write_trace_file(str(tmp_path / 'trace-analyzed.txt'), 400, n_tokens=20, n_pools=40)
+    expected, _ = trace_graph.create_graph_from_trace(path, export=Neo4jCSVExport())
+    G = trace_graph.create_csr_graph_from_traces([path]).to_networkx()
+
+    address = nx.get_node_attributes(expected, 'address')
+    assert {address[n]: data for n, data in expected.nodes(data=True)} == dict(G.nodes(data=True))
+    edges = {frozenset((address[u], address[v])): data for u, v, data in expected.edges(data=True)}
+    assert edges.keys() == {frozenset((u, v)) for u, v in G.edges()}
+    for u, v, data in G.edges(data=True):
+        assert {k: data[k] for k in ('function', 'result')} == edges[frozenset((u, v))]
+    assert max(count for _, _, count in G.edges(data='count')) > 1
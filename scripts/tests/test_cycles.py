@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+import pytest
+
+from arbresearch.batches import iter_arbitrage_transactions
+from arbresearch.constants import LOG_TOPICS
+from arbresearch.cycles import (ArbitrageRules, CycleReconstructor, SwapBatch, address_token_changes,
+                                decode_transfers)
+
+# batch格式的fixture：arbitrageInfo/tokenChanges 是用node运行 src/lib/chain/arb.helper.ts 中
+# analyzeTransaction 的swap部分（buildSwapGraph、validateSwapGraphTokenChanges、findArbitrageCycles）得到的，
+# 只保留与swap事件相关的字段；不是套利的交易没有 arbitrageInfo，tokenChanges 为空
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'batches')
+
+
+@pytest.fixture(scope='module')
+def fixture_txs():
+    return [tx for _, _, tx in iter_arbitrage_transactions(FIXTURE_DIR)]
+
+
+def test_reconstruct_matches_ts_output(fixture_txs):
+    batch = SwapBatch.from_swap_events(tx['swapEvents'] for tx in fixture_txs)
+    results = CycleReconstructor().reconstruct(batch)
+    assert sum(r is not None for r in results) == sum('arbitrageInfo' in tx for tx in fixture_txs) > 0
+    for tx, result in zip(fixture_txs, results):
+        info = tx.get('arbitrageInfo')
+        if info is None:
+            assert result is None, tx['hash']
+            continue
+        assert result['profit'] == info['profit'], tx['hash']
+        assert result['cyclesLength'] == info['cyclesLength']
+        assert result['arbitrageCycles'] == info['arbitrageCycles']
+        # JSON中的键顺序即TS Map的遍历顺序
+        assert list(result['tokenChanges'].items()) == list(tx['tokenChanges'].items())
+
+
+def test_require_cycles_and_max_length(fixture_txs):
+    batch = SwapBatch.from_swap_events(tx['swapEvents'] for tx in fixture_txs)
+    strict = CycleReconstructor(ArbitrageRules(require_cycles=True)).reconstruct(batch)
+    for tx, result in zip(fixture_txs, strict):
+        cycles = tx.get('arbitrageInfo', {}).get('cyclesLength', 0)
+        assert (result is not None) == (cycles > 0)
+
+    short = CycleReconstructor(ArbitrageRules(max_cycle_length=2)).reconstruct(batch)
+    for result in short:
+        if result is not None:
+            assert all(len(cycle['edges']) <= 2 for cycle in result['arbitrageCycles'])
+
+
+def _topic(address: str) -> bytes:
+    return bytes(12) + bytes.fromhex(address[2:])
+
+
+def test_address_token_changes():
+    token_a, token_b = '0x' + 'aa' * 20, '0x' + 'bb' * 20
+    alice, bob, zero = '0x' + '01' * 20, '0x' + '02' * 20, '0x' + '00' * 20
+    transfer = bytes.fromhex(LOG_TOPICS['Transfer'][2:])
+    # (交易, token, from, to, 金额)；最后一条是ERC721 Transfer（data为空），应被跳过
+    logs = [(0, token_a, alice, bob, 100), (0, token_a, bob, alice, 30), (0, token_b, zero, alice, 7),
+            (1, token_b, bob, zero, 2 ** 200), (1, token_a, alice, bob, None)]
+    selected, token, sender, receiver, amount = decode_transfers(
+        [transfer] * len(logs),
+        [bytes.fromhex(t[2:]) for _, t, _, _, _ in logs],
+        [b'' if v is None else v.to_bytes(32, 'big') for *_, v in logs],
+        [_topic(s) for _, _, s, _, _ in logs],
+        [_topic(r) for _, _, _, r, _ in logs],
+    )
+    assert selected.tolist() == [0, 1, 2, 3]
+    assert amount == [100, 30, 7, 2 ** 200]
+
+    tx_ids = np.array([logs[i][0] for i in selected])
+    changes = address_token_changes(tx_ids, token, sender, receiver, amount)
+    assert changes == {
+        0: {alice: [{'token': token_a, 'change': '-70'}, {'token': token_b, 'change': '7'}],
+            bob: [{'token': token_a, 'change': '70'}]},
+        1: {bob: [{'token': token_b, 'change': str(-2 ** 200)}]},
+    }
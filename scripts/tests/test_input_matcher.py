@@ -0,0 +1,113 @@
+import random
+import re
+
+import numpy as np
+import pytest
+
+from arbresearch.input_matcher import AMOUNT, POOL, TOKEN, match_transactions, transaction_patterns
+
+
+def _address(rng: random.Random) -> str:
+    return '0x%040x' % rng.getrandbits(160)
+
+
+def _analyze_swap_input(tx_input: str, swap_events):
+    """src/lib/arbAnalyzer/swapEventAnalyzer.ts 中 analyzeSwapInput 的逐行移植，作为对照"""
+    lower_input = tx_input.lower()
+    pool_details, pools_found = {}, 0
+    for event in swap_events:
+        pool = event['poolAddress'].lower().replace('0x', '', 1)
+        count = len(re.findall(pool, lower_input))
+        pool_details[pool] = count
+        pools_found += count > 0
+    tokens = dict.fromkeys(event[key].lower().replace('0x', '', 1)
+                           for event in swap_events for key in ('tokenIn', 'tokenOut'))
+    token_details = {token: len(re.findall(token, lower_input)) for token in tokens}
+    clean_input = tx_input[2:] if tx_input.startswith('0x') else tx_input
+    amounts = {'inputAmounts': [], 'outputAmounts': []}
+    for event in swap_events:
+        for side, key in (('inputAmounts', 'amountIn'), ('outputAmounts', 'amountOut')):
+            hex_format = format(int(event[key]), 'x')
+            amounts[side].append({'amount': event[key], 'found': hex_format in clean_input, 'hexFormat': hex_format})
+    return {
+        'flags': {
+            'poolsMatch': pools_found > 0,
+            'tokensMatch': sum(c > 0 for c in token_details.values()) > 0,
+            'amountsMatch': any(a['found'] for side in amounts.values() for a in side),
+        },
+        'poolAnalysis': {'total': len(swap_events), 'found': pools_found, 'details': pool_details},
+        'tokenAnalysis': {'total': len(tokens), 'found': sum(c > 0 for c in token_details.values()),
+                          'details': token_details},
+        'amounts': amounts,
+    }
+
+
+def _random_transaction(rng: random.Random):
+    tokens = [_address(rng) for _ in range(rng.randint(2, 4))]
+    events = []
+    for _ in range(rng.randint(1, 4)):
+        token_in, token_out = rng.sample(tokens, 2)
+        # 有的金额很短（少于8个十六进制字符），走直接查找的分支
+        bits = rng.choice([8, 20, 64, 112])
+        events.append({'poolAddress': _address(rng).upper().replace('0X', '0x') if rng.random() < 0.2
+                       else _address(rng), 'tokenIn': token_in, 'tokenOut': token_out,
+                       'amountIn': str(rng.getrandbits(bits) + 1), 'amountOut': str(rng.getrandbits(bits) + 1),
+                       'protocol': 'UniV3'})
+    if len(events) > 1 and rng.random() < 0.3:
+        events[-1]['poolAddress'] = events[0]['poolAddress']
+
+    # 按ABI word拼接input，随机放入部分池子、token和金额，也会放入重叠/相邻的重复
+    patterns = [pattern for _, pattern in transaction_patterns(events)]
+    words = ['%064x' % rng.getrandbits(256) for _ in range(rng.randint(1, 4))]
+    for pattern in rng.sample(patterns, rng.randint(0, len(patterns))):
+        words.append(pattern.rjust(64, '0') if rng.random() < 0.7 else pattern * 2)
+    rng.shuffle(words)
+    selector = '%08x' % rng.getrandbits(32)
+    return '0x' + selector + ''.join(words), events
+
+
+@pytest.fixture(scope='module')
+def transactions():
+    rng = random.Random(11)
+    txs = [_random_transaction(rng) for _ in range(300)]
+    # 没有swap事件和input为空的交易
+    txs.append(('0x', []))
+    txs.append(('0x12345678', [{'poolAddress': _address(rng), 'tokenIn': _address(rng), 'tokenOut': _address(rng),
+                                'amountIn': str(0x1234), 'amountOut': '0', 'protocol': 'UniV2'}]))
+    return txs
+
+
+@pytest.mark.parametrize('chunk_size, workers', [(16384, 1), (37, 1), (64, 2)])
+def test_matches_analyze_swap_input(transactions, chunk_size, workers):
+    inputs = [tx_input for tx_input, _ in transactions]
+    events = [swap_events for _, swap_events in transactions]
+    matches = match_transactions(inputs, events, chunk_size=chunk_size, workers=workers)
+    assert len(matches) == len(transactions)
+    for i, (tx_input, swap_events) in enumerate(transactions):
+        assert matches.input_analysis(i, swap_events) == _analyze_swap_input(tx_input, swap_events), i
+    assert 0 < matches.pools_match.sum() < len(transactions)
+    assert 0 < matches.amounts_match.sum() < len(transactions)
+
+
+def test_offsets_include_overlapping_occurrences(transactions):
+    inputs = [tx_input for tx_input, _ in transactions]
+    events = [swap_events for _, swap_events in transactions]
+    matches = match_transactions(inputs, events, chunk_size=50)
+    assert (np.diff(matches.match_tx) >= 0).all()
+    for i, (tx_input, swap_events) in enumerate(transactions):
+        text = tx_input[2:].lower()
+        expected = sorted({(pattern, m.start()) for kind, pattern in transaction_patterns(swap_events)
+                           for m in re.finditer(f'(?={pattern})', text)}, key=lambda x: (x[1], x[0]))
+        got = sorted(set(matches.offsets(i)), key=lambda x: (x[1], x[0]))
+        assert got == expected, i
+    assert set(matches.match_kind.tolist()) == {POOL, TOKEN, AMOUNT}
+
+
+def test_flag_stats():
+    events = [{'poolAddress': '0x' + 'ab' * 20, 'tokenIn': '0x' + 'cd' * 20, 'tokenOut': '0x' + 'ef' * 20,
+               'amountIn': str(0x1122334455), 'amountOut': '1', 'protocol': 'UniV2'}]
+    inputs = ['0x' + 'ab' * 20, '0x' + 'cd' * 20 + '1122334455', '0x00']
+    stats = match_transactions(inputs, [events] * 3).flag_stats()
+    # '1' 在第二个input的金额中也出现
+    assert stats['poolsMatch'] == 1 and stats['tokensAndAmountsMatch'] == 1 and stats['allNotMatch'] == 1
+    assert sum(stats.values()) == 3
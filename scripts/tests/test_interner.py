@@ -0,0 +1,33 @@
+from arbresearch.interner import AddressInterner
+
+CHECKSUM = '0x4200000000000000000000000000000000000006'
+MIXED = '0xAbCdEf0000000000000000000000000000000001'
+
+
+def test_intern_is_case_insensitive_and_keeps_first_spelling():
+    interner = AddressInterner()
+    assert interner.intern(MIXED) == interner.intern(MIXED.lower()) == 0
+    assert interner.address(0) == MIXED
+    assert interner.id_of(MIXED.lower()) == 0
+    assert MIXED.lower() in interner
+    assert len(interner) == 1
+
+
+def test_symbols_are_case_sensitive():
+    interner = AddressInterner()
+    assert interner.intern('WETH') != interner.intern('weth')
+
+
+def test_save_appends_and_load_keeps_ids(tmp_path):
+    path = str(tmp_path / 'ids.txt')
+    interner = AddressInterner([MIXED, CHECKSUM])
+    interner.save(path)
+    interner.intern('USDC')
+    interner.save(path)
+    with open(path) as f:
+        assert f.read().splitlines() == [MIXED, CHECKSUM, 'USDC']
+
+    loaded = AddressInterner.load(path)
+    assert loaded.id_of(MIXED.lower()) == 0
+    assert loaded.lookup([2, 0]) == ['USDC', MIXED]
+    assert loaded.intern(CHECKSUM.upper().replace('0X', '0x')) == 1
@@ -0,0 +1,65 @@
+import sys
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from arbresearch import metrics
+
+MB = 2 ** 20
+
+
+@pytest.fixture
+def memory_metrics(monkeypatch):
+    monkeypatch.setattr(metrics, '_enabled', False)
+    monkeypatch.setattr(metrics._recorder, 'summary', False)
+    monkeypatch.setattr(metrics._recorder, 'memory', False)
+    was_tracing = tracemalloc.is_tracing()
+    metrics.enable(summary=False, memory=True)
+    metrics.reset()
+    yield
+    metrics.reset()
+    if not was_tracing:
+        tracemalloc.stop()
+
+
+def _peak_mb(name):
+    return metrics.snapshot()['stages'][name]['mem_peak_mb']
+
+
+def test_stage_peak_is_not_inherited_from_earlier_stage(memory_metrics):
+    with metrics.stage('big'):
+        data = bytearray(32 * MB)
+        del data
+    with metrics.stage('small'):
+        data = bytearray(MB)
+        del data
+    assert _peak_mb('big') >= 32
+    assert _peak_mb('small') < 16
+
+
+def test_outer_stage_includes_nested_peak(memory_metrics):
+    with metrics.stage('outer'):
+        with metrics.stage('inner'):
+            data = bytearray(32 * MB)
+            del data
+        with metrics.stage('after'):
+            pass
+    assert _peak_mb('inner') >= 32
+    assert _peak_mb('outer') >= 32
+    assert _peak_mb('after') < 16
+
+
+def test_count_from_threads(monkeypatch):
+    monkeypatch.setattr(metrics, '_enabled', True)
+    metrics.reset()
+    # 缩短线程切换间隔，让并发的计数更容易交错
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda _: [metrics.count('rows') for _ in range(20000)], range(8)))
+    finally:
+        sys.setswitchinterval(interval)
+    assert metrics.snapshot()['counters'] == {'rows': 8 * 20000}
+    metrics.reset()
@@ -0,0 +1,56 @@
+import re
+from datetime import datetime, timezone
+
+import pytest
+
+from arbresearch import synthetic
+from arbresearch.interner import normalize_address
+from arbresearch.neo4j_import import Neo4jCSVExport
+
+OBSERVED_AT = datetime(2024, 1, 1, tzinfo=timezone.utc)
+_ADDRESS_RE = re.compile(r'0x[0-9a-f]{40}')
+_PAIR_RE = re.compile(r'^\[\d+\] \[([^\]]+)\]-\[([^\]]+)\]')
+
+
+@pytest.fixture
+def trace_graph(monkeypatch):
+    from arbresearch.cli import load_script
+    monkeypatch.setenv('ARBRESEARCH_TRACE_CACHE', 'off')
+    return load_script('trace-graph')
+
+
+def _upper(text: str) -> str:
+    return _ADDRESS_RE.sub(lambda m: '0x' + m.group()[2:].upper(), text)
+
+
+def _mixed_case_trace(path: str) -> str:
+    """奇数行的地址改为大写十六进制，同一token/池子在文件中有两种写法"""
+    lines = list(synthetic.trace_lines(400, n_tokens=20, n_pools=40))
+    with open(path, 'w') as f:
+        for i, line in enumerate(lines):
+            f.write((_upper(line) if i % 2 else line) + '\n')
+    return path
+
+
+def _export(export: Neo4jCSVExport):
+    return export.tokens, export.pools, export.relationships
+
+
+@pytest.mark.parametrize('n_allowed', [0, 8])
+def test_bulk_import_matches_create_graph_from_trace(tmp_path, trace_graph, n_allowed):
+    path = _mixed_case_trace(str(tmp_path / 'trace-analyzed.txt'))
+    with open(path) as f:
+        tokens = sorted({normalize_address(t) for line in f for t in _PAIR_RE.match(line).groups()})
+    # 白名单用大写写法，过滤时应与trace中的写法无关
+    allowed = [_upper(t) for t in tokens[:n_allowed]] or None
+
+    online = Neo4jCSVExport()
+    trace_graph.create_graph_from_trace(path, allowed, export=online, observed_at=OBSERVED_AT)
+    bulk = Neo4jCSVExport()
+    added = bulk.add_trace_file(path, trace_graph.parse_trace_line, allowed, observed_at=OBSERVED_AT)
+
+    assert added > 0
+    assert _export(bulk) == _export(online)
+    # 每个地址只有一个节点
+    for nodes in (bulk.tokens, bulk.pools):
+        assert len({normalize_address(a) for a in nodes}) == len(nodes)
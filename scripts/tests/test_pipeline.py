@@ -0,0 +1,193 @@
+import importlib.util
+import sys
+import textwrap
+
+import pytest
+
+from arbresearch.pipeline import FAILED, HIT, RAN, SKIPPED, Pipeline, Stage, code_version
+
+STAGES_SOURCE = '''
+import helper_lib
+
+SCALE = {scale}
+
+
+def helper(x):
+    return x * SCALE
+
+
+def unrelated():
+    return {unrelated}
+
+
+class Formatter:
+    def render(self, x):
+        return f"{{x}}{suffix}"
+
+
+def double(value):
+    return helper(value)
+
+
+def render(value):
+    return Formatter().render(value)
+
+
+def lazy(value):
+    from helper_lib import offset
+    return value + offset()
+
+
+def qualified(value):
+    return helper_lib.offset() - value
+
+
+def fail(value):
+    raise RuntimeError("boom")
+'''
+
+HELPER_SOURCE = '''
+def offset():
+    return {offset}
+'''
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """在临时目录中写入阶段模块，每次 write 后重新加载，模拟修改代码后重新运行"""
+    monkeypatch.setattr(sys, 'dont_write_bytecode', True)
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    class Project:
+        def write(self, scale=2, unrelated=0, suffix='!', offset=1):
+            (tmp_path / 'helper_lib.py').write_text(textwrap.dedent(HELPER_SOURCE.format(offset=offset)))
+            (tmp_path / 'stages_mod.py').write_text(textwrap.dedent(STAGES_SOURCE.format(
+                scale=scale, unrelated=unrelated, suffix=suffix)))
+            for name in ('stages_mod', 'helper_lib'):
+                sys.modules.pop(name, None)
+            importlib.invalidate_caches()
+            spec = importlib.util.spec_from_file_location('stages_mod', tmp_path / 'stages_mod.py')
+            module = importlib.util.module_from_spec(spec)
+            sys.modules['stages_mod'] = module
+            spec.loader.exec_module(module)
+            return module
+
+    yield Project()
+    for name in ('stages_mod', 'helper_lib'):
+        sys.modules.pop(name, None)
+
+
+def _identity(x):
+    return x
+
+
+def _double_pipeline(module, cache_dir, value=3):
+    # 上游返回值按阶段名作为关键字参数传入，因此上游阶段名为 value
+    return Pipeline('test', [
+        Stage('value', _identity, params={'x': value}),
+        Stage('result', module.double, inputs=['value']),
+    ], str(cache_dir))
+
+
+def _run(pipeline):
+    return pipeline.run().status
+
+
+def test_second_run_hits_cache(project, tmp_path):
+    module = project.write()
+    assert _run(_double_pipeline(module, tmp_path / 'cache')) == {'value': RAN, 'result': RAN}
+    assert _run(_double_pipeline(module, tmp_path / 'cache')) == {'value': HIT, 'result': HIT}
+
+
+def test_params_change_reruns_downstream(project, tmp_path):
+    module = project.write()
+    _run(_double_pipeline(module, tmp_path / 'cache', value=3))
+    pipeline = _double_pipeline(module, tmp_path / 'cache', value=4)
+    assert _run(pipeline) == {'value': RAN, 'result': RAN}
+    assert pipeline.load_result('result') == 8
+
+
+def test_helper_edit_invalidates_stage(project, tmp_path):
+    module = project.write(scale=2)
+    _run(_double_pipeline(module, tmp_path / 'cache'))
+    # 只修改被阶段函数调用的 helper 引用的常量，阶段函数本身的字节码不变
+    module = project.write(scale=5)
+    pipeline = _double_pipeline(module, tmp_path / 'cache')
+    assert _run(pipeline) == {'value': HIT, 'result': RAN}
+    assert pipeline.load_result('result') == 15
+
+
+def test_unrelated_edit_keeps_cache(project, tmp_path):
+    module = project.write(unrelated=0)
+    _run(_double_pipeline(module, tmp_path / 'cache'))
+    module = project.write(unrelated=1)
+    assert _run(_double_pipeline(module, tmp_path / 'cache')) == {'value': HIT, 'result': HIT}
+
+
+@pytest.mark.parametrize('stage, change', [
+    ('render', {'suffix': '?'}),        # 阶段内实例化的类的方法
+    ('lazy', {'offset': 2}),            # 函数内部 import 的项目模块
+    ('qualified', {'offset': 2}),       # 模块级 import 后以 模块.属性 调用
+])
+def test_indirect_edit_changes_code_version(project, stage, change):
+    before = code_version(getattr(project.write(), stage))
+    after = code_version(getattr(project.write(**change), stage))
+    assert before != after
+    assert code_version(getattr(project.write(), stage)) == before
+
+
+def test_deleted_output_reruns_stage(tmp_path):
+    output = tmp_path / 'out.txt'
+
+    def write(text):
+        output.write_text(text)
+        return text
+
+    pipeline = Pipeline('test', [Stage('write', write, outputs=[str(output)], params={'text': 'a'})],
+                        str(tmp_path / 'cache'))
+    assert _run(pipeline) == {'write': RAN}
+    assert _run(pipeline) == {'write': HIT}
+    output.unlink()
+    assert _run(pipeline) == {'write': RAN}
+    assert output.read_text() == 'a'
+
+
+def test_input_file_change_invalidates(tmp_path):
+    source = tmp_path / 'input.txt'
+    source.write_text('abc')
+
+    def read(path):
+        with open(path) as f:
+            return f.read()
+
+    def build():
+        return Pipeline('test', [Stage('read', read, files=[str(source)], params={'path': str(source)})],
+                        str(tmp_path / 'cache'))
+
+    assert _run(build()) == {'read': RAN}
+    assert _run(build()) == {'read': HIT}
+    source.write_text('abcd')
+    pipeline = build()
+    assert _run(pipeline) == {'read': RAN}
+    assert pipeline.load_result('read') == 'abcd'
+
+
+def test_unchanged_upstream_result_keeps_downstream(project, tmp_path):
+    module = project.write()
+    _run(_double_pipeline(module, tmp_path / 'cache'))
+    # 上游被强制重新执行，但返回值不变，下游仍然命中
+    run = _double_pipeline(module, tmp_path / 'cache').run(force=['value'])
+    assert run.status == {'value': RAN, 'result': HIT}
+
+
+def test_failure_skips_downstream(project, tmp_path):
+    module = project.write()
+    pipeline = Pipeline('test', [
+        Stage('value', module.fail, params={'value': 1}),
+        Stage('after', module.double, inputs=['value']),
+    ], str(tmp_path / 'cache'))
+    run = pipeline.run()
+    assert run.status == {'value': FAILED, 'after': SKIPPED}
+    assert isinstance(run.errors['value'], RuntimeError)
+    # 失败的阶段不写缓存，下次重新执行
+    assert pipeline.run().status['value'] == FAILED
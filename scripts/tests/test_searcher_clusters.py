@@ -0,0 +1,124 @@
+import csv
+import itertools
+import random
+
+import numpy as np
+from scipy import sparse
+
+from arbresearch.searcher_clusters import (SearcherIncidence, cluster_searchers, estimate_jaccard, lsh_candidates,
+                                           minhash_signatures)
+
+
+def _address(rng: random.Random) -> str:
+    return '0x%040x' % rng.getrandbits(160)
+
+
+def _random_sets(rng: np.random.Generator, n_rows: int, n_cols: int):
+    rows = [rng.choice(n_cols, rng.integers(0, min(30, n_cols)), replace=False) for _ in range(n_rows)]
+    indptr = np.cumsum([0] + [len(r) for r in rows])
+    indices = np.concatenate(rows).astype(np.int32)
+    matrix = sparse.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(n_rows, n_cols))
+    matrix.sort_indices()
+    return matrix, [set(r.tolist()) for r in rows]
+
+
+def test_minhash_matches_definition():
+    matrix, sets = _random_sets(np.random.default_rng(1), 40, 500)
+    signatures = minhash_signatures(matrix, num_perm=16, seed=3)
+    rng = np.random.default_rng(3)
+    a = rng.integers(1, (1 << 31) - 1, 16, dtype=np.int64)
+    b = rng.integers(0, (1 << 31) - 1, 16, dtype=np.int64)
+    for row, columns in enumerate(sets):
+        if not columns:
+            assert (signatures[row] == np.iinfo(np.uint32).max).all()
+            continue
+        x = np.array(sorted(columns), dtype=np.int64)[:, None]
+        np.testing.assert_array_equal(signatures[row], ((x * a + b) % ((1 << 31) - 1)).min(axis=0))
+    # 分批计算的结果相同
+    np.testing.assert_array_equal(minhash_signatures(matrix, num_perm=16, seed=3, chunk_size=7), signatures)
+
+
+def test_estimated_jaccard_is_close():
+    matrix, sets = _random_sets(np.random.default_rng(2), 60, 40)
+    signatures = minhash_signatures(matrix, num_perm=512)
+    pairs = np.array(list(itertools.combinations(range(len(sets)), 2)))
+    estimate = estimate_jaccard(signatures, pairs, chunk_size=100)
+    exact = np.array([len(sets[i] & sets[j]) / len(sets[i] | sets[j]) if sets[i] and sets[j] else 0.0
+                      for i, j in pairs])
+    assert np.abs(estimate - exact).max() < 0.15
+    assert np.abs(estimate - exact).mean() < 0.02
+
+
+def test_lsh_candidates_are_band_collisions():
+    matrix, _ = _random_sets(np.random.default_rng(4), 80, 12)
+    signatures = minhash_signatures(matrix, num_perm=8)
+    candidates = lsh_candidates(signatures, bands=4, window=1000)
+    valid = signatures[:, 0] != np.iinfo(np.uint32).max
+    expected = {(i, j) for i, j in itertools.combinations(range(len(signatures)), 2)
+                if valid[i] and valid[j] and any((signatures[i, k:k + 2] == signatures[j, k:k + 2]).all()
+                                                 for k in range(0, 8, 2))}
+    assert set(map(tuple, candidates.tolist())) == expected
+    assert (candidates[:, 0] < candidates[:, 1]).all()
+    # window限制大桶内的候选数
+    assert len(lsh_candidates(signatures, bands=4, window=2)) < len(candidates)
+
+
+def _planted_transactions(seed: int = 0, n_groups: int = 6, loners: int = 20):
+    """每组searcher在自己的一批池子/token上交易；零散searcher之间只共用公共的池子和token"""
+    rng = random.Random(seed)
+    common_tokens = [_address(rng) for _ in range(3)]
+    common_pools = [_address(rng) for _ in range(5)]
+    txs, groups = [], []
+    for g in range(n_groups):
+        pools = [_address(rng) for _ in range(8)]
+        tokens = [_address(rng) for _ in range(4)]
+        members = [_address(rng) for _ in range(n_groups + 2 - g)]
+        groups.append(members)
+        for searcher in members:
+            for _ in range(rng.randint(3, 6)):
+                hops = rng.sample(pools, 3)
+                path = rng.sample(tokens, 2) + [rng.choice(common_tokens)]
+                txs.append({'to': searcher, 'swapEvents': [
+                    {'poolAddress': pool, 'tokenIn': path[k], 'tokenOut': path[(k + 1) % 3]}
+                    for k, pool in enumerate(hops)]})
+    for _ in range(loners):
+        searcher = _address(rng)
+        pool = _address(rng)
+        token = _address(rng)
+        txs.append({'to': searcher, 'swapEvents': [
+            {'poolAddress': pool, 'tokenIn': common_tokens[0], 'tokenOut': token},
+            {'poolAddress': rng.choice(common_pools), 'tokenIn': token, 'tokenOut': common_tokens[0]}]})
+    rng.shuffle(txs)
+    return txs, groups
+
+
+def test_planted_clusters_are_recovered(tmp_path):
+    txs, groups = _planted_transactions()
+    incidence = SearcherIncidence.from_transactions(txs)
+    assert len(incidence) == sum(map(len, groups)) + 20
+    assert incidence.tx_count.sum() == len(txs)
+
+    clusters = cluster_searchers(incidence, threshold=0.5)
+    labels = clusters.label_of()
+    # 组按大小从大到小生成，簇号也按大小编号
+    for g, members in enumerate(groups):
+        assert {labels[m] for m in members} == {g}
+    assert clusters.sizes.tolist() == [len(m) for m in groups]
+    assert sum(label == -1 for label in labels.values()) == 20
+    assert (clusters.similarity >= 0.5).all()
+
+    path = str(tmp_path / 'clusters.csv')
+    clusters.write_csv(path, incidence)
+    with open(path) as f:
+        rows = list(csv.DictReader(f))
+    assert [int(r['cluster']) for r in rows] == sorted(int(r['cluster']) for r in rows if int(r['cluster']) >= 0) \
+        + [-1] * 20
+    assert all(int(r['cluster_size']) == (len(groups[int(r['cluster'])]) if int(r['cluster']) >= 0 else 1)
+               for r in rows)
+
+
+def test_threshold_above_one_has_no_clusters():
+    txs, _ = _planted_transactions(seed=1, n_groups=3, loners=5)
+    clusters = cluster_searchers(SearcherIncidence.from_transactions(txs), threshold=1.01)
+    assert len(clusters.sizes) == 0 and len(clusters.pairs) == 0
+    assert (clusters.labels == -1).all()
@@ -0,0 +1,130 @@
+import math
+
+import numpy as np
+import pytest
+
+from arbresearch.simulator import CycleBatch, optimize
+from arbresearch.trace_reader import Q96
+
+
+def _random_hops(rng, n_cycles: int, bounded: bool):
+    """随机环：每跳是V2或V3池子，价格在1附近，使一部分环有利可图"""
+    lengths = rng.integers(2, 5, n_cycles)
+    n = int(lengths.sum())
+    is_v3 = rng.random(n) < 0.5
+    zero_for_one = rng.random(n) < 0.5
+    price = np.exp(rng.normal(0, 0.01, n))
+    depth = 10 ** rng.uniform(18, 22, n)
+    sqrt_price = np.sqrt(np.where(zero_for_one, price, 1 / price))
+    lower = upper = None
+    if bounded:
+        # 边界在当前价格的0.1%~3%之外，只有一部分环会碰到
+        width = rng.uniform(0.001, 0.03, n)
+        lower = sqrt_price * np.sqrt(1 - width) * Q96
+        upper = sqrt_price * np.sqrt(1 + width) * Q96
+    return dict(
+        lengths=lengths,
+        is_v3=is_v3,
+        zero_for_one=zero_for_one,
+        fee=rng.choice([100, 500, 3000], n),
+        reserve0=depth,
+        reserve1=depth * price ** np.where(zero_for_one, 1, -1),
+        sqrt_price_x96=sqrt_price * Q96,
+        liquidity=depth,
+        sqrt_price_lower_x96=lower,
+        sqrt_price_upper_x96=upper,
+    )
+
+
+def _hop_out(hops, k: int, amount: float) -> float:
+    """逐跳的参考实现：V2按储备，V3按 sqrtPrice/liquidity 公式（tick内）"""
+    x = amount * (1 - hops['fee'][k] / 1e6)
+    zero_for_one = hops['zero_for_one'][k]
+    if not hops['is_v3'][k]:
+        r0, r1 = hops['reserve0'][k], hops['reserve1'][k]
+        r_in, r_out = (r0, r1) if zero_for_one else (r1, r0)
+        return r_out * x / (r_in + x)
+    liquidity = hops['liquidity'][k]
+    sqrt_price = hops['sqrt_price_x96'][k] / Q96
+    if zero_for_one:
+        if hops['sqrt_price_lower_x96'] is not None:
+            x = min(x, liquidity * (Q96 / hops['sqrt_price_lower_x96'][k] - 1 / sqrt_price))
+        new_sqrt_price = liquidity * sqrt_price / (liquidity + x * sqrt_price)
+        return liquidity * (sqrt_price - new_sqrt_price)
+    if hops['sqrt_price_upper_x96'] is not None:
+        x = min(x, liquidity * (hops['sqrt_price_upper_x96'][k] / Q96 - sqrt_price))
+    new_sqrt_price = sqrt_price + x / liquidity
+    return liquidity * (1 / sqrt_price - 1 / new_sqrt_price)
+
+
+def _brute_force(batch: CycleBatch, i: int, hi: float, points: int = 4001):
+    """把第i个环复制points份，在 [0, hi] 的网格上逐点计算利润取最大"""
+    grid = np.linspace(0, hi, points)
+    profit = batch.take(np.full(points, i)).profit(grid)
+    best = int(np.argmax(profit))
+    return grid[best], profit[best], grid[1] - grid[0]
+
+
+@pytest.mark.parametrize('bounded', [False, True])
+def test_optimum_matches_brute_force(bounded):
+    hops = _random_hops(np.random.default_rng(3), 60, bounded)
+    batch = CycleBatch.from_hops(**hops)
+    result = optimize(batch)
+    unbounded_x, _ = CycleBatch.from_hops(**dict(hops, sqrt_price_lower_x96=None,
+                                                 sqrt_price_upper_x96=None)).closed_form()
+    assert (result.amount_in <= unbounded_x).all()
+
+    offsets = batch.hop_offsets
+    assert result.bounded.any() == bounded
+    profitable = 0
+    for i in range(len(batch)):
+        if unbounded_x[i] == 0:
+            assert result.amount_in[i] == 0 and result.profit[i] == 0
+            continue
+        # 有边界时最优输入不超过无边界的最优输入，在其两倍范围内网格搜索
+        grid_x, grid_profit, spacing = _brute_force(batch, i, 2 * unbounded_x[i])
+        assert result.profit[i] >= grid_profit * (1 - 1e-12)
+        if grid_profit > 0:
+            profitable += 1
+            assert abs(result.amount_in[i] - grid_x) <= spacing
+            # 逐跳参考实现，检查虚拟储备和tick边界的换算
+            amount = result.amount_in[i]
+            for k in range(int(offsets[i]), int(offsets[i + 1])):
+                amount = _hop_out(hops, k, amount)
+            assert result.amount_out[i] == pytest.approx(amount, rel=1e-9)
+    assert profitable > 5
+
+
+def test_closed_form_single_pool_pair():
+    # 两个V2池子价格相差2倍、无手续费时，最优输入和利润有解析解
+    batch = CycleBatch.from_hops([2], is_v3=[False, False], zero_for_one=[True, False], fee=[0, 0],
+                                 reserve0=[100.0, 100.0], reserve1=[200.0, 100.0])
+    amount_in, profit = batch.closed_form()
+    # A = 2 * 1, C = 1/100 + 2/100 = 0.03
+    assert amount_in[0] == pytest.approx((math.sqrt(2) - 1) / 0.03)
+    assert profit[0] == pytest.approx((math.sqrt(2) - 1) ** 2 / 0.03)
+    assert batch.profit(amount_in)[0] == pytest.approx(profit[0])
+
+
+def test_from_cycles_skips_missing_pools():
+    token0, token1 = '0x' + 'aa' * 20, '0x' + 'bb' * 20
+    pool_v2, pool_v3, missing = '0x' + '01' * 20, '0x' + '02' * 20, '0x' + '03' * 20
+    states = {
+        pool_v2: {'token0': token0.upper().replace('0X', '0x'), 'reserve0': '1000000', 'reserve1': '2000000',
+                  'protocol': 'PancakeV2'},
+        pool_v3: {'token0': token0, 'sqrtPriceX96': str(Q96), 'liquidity': '1000000', 'fee': 500},
+    }
+    cycles = [
+        [{'poolAddress': pool_v2.upper().replace('0X', '0x'), 'tokenIn': token0, 'tokenOut': token1},
+         {'poolAddress': pool_v3, 'tokenIn': token1, 'tokenOut': token0}],
+        [{'poolAddress': missing, 'tokenIn': token0, 'tokenOut': token1}],
+        [],
+    ]
+    batch, kept = CycleBatch.from_cycles(cycles, states)
+    assert kept.tolist() == [0] and len(batch) == 1
+    np.testing.assert_allclose(batch.fee, [0.0025, 0.0005])
+    np.testing.assert_allclose(batch.reserve_in, [1e6, 1e6])
+    np.testing.assert_allclose(batch.reserve_out, [2e6, 1e6])
+    assert np.isinf(batch.max_in).all()
+    result = optimize(batch)
+    assert result.profit[0] > 0 and not result.bounded[0]
@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+
+from arbresearch.constants import LOG_TOPICS
+from arbresearch.swap_decoder import SWAP_KINDS, decode_swap_logs, limbs_to_float, limbs_to_int
+
+POOL = '0x' + '11' * 20
+SENDER = '0x' + '22' * 20
+RECIPIENT = '0x' + '33' * 20
+TOKEN0 = '0x' + 'aa' * 20
+TOKEN1 = '0x' + 'bb' * 20
+POOLS = {POOL: {'tokens': [TOKEN0, TOKEN1], 'protocol': 'UniV3'}}
+SQRT_PRICE = 79228162514264337593543950336 * 3
+LIQUIDITY = 10 ** 21
+
+
+def _word(value: int) -> bytes:
+    return value.to_bytes(32, 'big', signed=True)
+
+
+def _topic(address: str) -> bytes:
+    return bytes(12) + bytes.fromhex(address[2:])
+
+
+def _log(kind: str, *values: int):
+    return bytes.fromhex(LOG_TOPICS[kind][2:]), b''.join(_word(v) for v in values)
+
+
+def _v3(kind, amount0, amount1, tick=-200):
+    extra = (0, 0) if kind == 'PancakeV3Swap' else ()
+    return _log(kind, amount0, amount1, SQRT_PRICE, LIQUIDITY, tick, *extra)
+
+
+def _ts_parse(kind, data):
+    """src/lib/chain/arb.helper.ts 中 parseSwapEvent 的逐条实现，作为对照"""
+    words = [int.from_bytes(data[i:i + 32], 'big', signed=True) for i in range(0, len(data), 32)]
+    if kind in ('V2Swap', 'AeroV2Swap'):
+        a0_in, a1_in, a0_out, a1_out = words[:4]
+        if a0_in - a0_out > 0:
+            return True, a0_in, a1_out
+        return False, a1_in, a0_out
+    amount0, amount1 = words[:2]
+    if amount0 > 0:
+        return True, amount0, -amount1
+    return False, amount1, -amount0
+
+
+def _decode(logs):
+    topic0 = [t for t, _ in logs]
+    data = [d for _, d in logs]
+    n = len(logs)
+    return decode_swap_logs(topic0, [bytes.fromhex(POOL[2:])] * n, data,
+                            [_topic(SENDER)] * n, [_topic(RECIPIENT)] * n)
+
+
+KNOWN_LOGS = [
+    _log('V2Swap', 10 ** 18, 0, 0, 2500 * 10 ** 6),
+    _log('V2Swap', 0, 3000 * 10 ** 6, 12 * 10 ** 17, 0),
+    _log('AeroV2Swap', 7, 0, 0, 5),
+    _v3('V3Swap', 10 ** 18, -2500 * 10 ** 6),
+    _v3('V3Swap', -(2 ** 200 + 12345), 3 * 10 ** 30, tick=887000),
+    _v3('PancakeV3Swap', 5 * 10 ** 17, -1234),
+    # 两个金额同号的异常事件，TS得到负的amountOut
+    _v3('V3Swap', 10, 3),
+    # amount0为0时按反方向处理
+    _v3('V3Swap', 0, -5),
+]
+
+
+def test_decoded_amounts_match_parse_swap_event():
+    swaps = _decode(KNOWN_LOGS)
+    assert swaps.log_index.tolist() == list(range(len(KNOWN_LOGS)))
+    amounts_in = limbs_to_int(swaps.amount_in, signed=True)
+    amounts_out = limbs_to_int(swaps.amount_out, signed=True)
+    for i, (topic, data) in enumerate(KNOWN_LOGS):
+        kind = SWAP_KINDS[swaps.kind[i]]
+        assert LOG_TOPICS[kind][2:] == topic.hex()
+        assert (bool(swaps.zero_for_one[i]), amounts_in[i], amounts_out[i]) == _ts_parse(kind, data)
+
+
+def test_float_amounts_are_signed():
+    swaps = _decode(KNOWN_LOGS)
+    expected_in = [float(_ts_parse(SWAP_KINDS[k], d)[1]) for k, (_, d) in zip(swaps.kind, KNOWN_LOGS)]
+    expected_out = [float(_ts_parse(SWAP_KINDS[k], d)[2]) for k, (_, d) in zip(swaps.kind, KNOWN_LOGS)]
+    np.testing.assert_allclose(swaps.amount_in_float(), expected_in, rtol=1e-15)
+    np.testing.assert_allclose(swaps.amount_out_float(), expected_out, rtol=1e-15)
+    assert swaps.amount_out_float()[6] == -3.0
+    # 不按有符号解释时负数是接近2^256的大数
+    assert limbs_to_float(swaps.amount_out)[6] > 2.0 ** 255
+
+
+def test_v3_price_fields():
+    swaps = _decode(KNOWN_LOGS)
+    v2 = np.isin(swaps.kind, (0, 1))
+    assert np.isnan(swaps.sqrt_price_x96[v2]).all() and (swaps.tick[v2] == 0).all()
+    assert swaps.sqrt_price_x96[3] == pytest.approx(float(SQRT_PRICE))
+    assert swaps.liquidity[5] == pytest.approx(float(LIQUIDITY))
+    assert swaps.tick[3:6].tolist() == [-200, 887000, -200]
+
+
+def test_to_swap_events():
+    swaps = _decode(KNOWN_LOGS[3:5])
+    forward, backward = swaps.to_swap_events(POOLS)
+    assert forward == {
+        'poolAddress': POOL, 'protocol': 'UniV3', 'tokenIn': TOKEN0, 'tokenOut': TOKEN1,
+        'amountIn': str(10 ** 18), 'amountOut': str(2500 * 10 ** 6),
+        'sender': SENDER, 'recipient': RECIPIENT, 'ethFlag': False,
+    }
+    assert (backward['tokenIn'], backward['tokenOut']) == (TOKEN1, TOKEN0)
+    assert backward['amountIn'] == str(3 * 10 ** 30)
+    assert backward['amountOut'] == str(2 ** 200 + 12345)
+    assert swaps.to_swap_events({}) == [None, None]
+
+
+def test_non_swap_and_short_logs_are_dropped():
+    topic, data = KNOWN_LOGS[3]
+    transfer = bytes.fromhex(LOG_TOPICS['Transfer'][2:])
+    pancake_topic, pancake_data = KNOWN_LOGS[5]
+    logs = [(transfer, data), (topic, data[:128]), (pancake_topic, pancake_data[:160]), KNOWN_LOGS[0]]
+    swaps = _decode(logs)
+    assert swaps.log_index.tolist() == [3]
+    assert SWAP_KINDS[swaps.kind[0]] == 'V2Swap'
+
+
+def test_pyarrow_columns_match_lists():
+    pa = pytest.importorskip('pyarrow')
+    n = len(KNOWN_LOGS)
+    topic0 = pa.array([t for t, _ in KNOWN_LOGS], type=pa.binary(32))
+    data = pa.array([d for _, d in KNOWN_LOGS], type=pa.binary())
+    address = pa.array([bytes.fromhex(POOL[2:])] * n, type=pa.binary(20))
+    swaps = decode_swap_logs(topic0, address, data)
+    expected = _decode(KNOWN_LOGS)
+    assert (swaps.amount_in == expected.amount_in).all()
+    assert (swaps.amount_out == expected.amount_out).all()
+    assert swaps.pool_addresses() == [POOL] * n
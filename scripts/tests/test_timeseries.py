@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from arbresearch.batches import TransactionColumns
+from arbresearch.timeseries import OTHER_SEARCHER, searcher_windows
+
+
+def _columns(n: int, seed: int = 0, n_searchers: int = 6) -> TransactionColumns:
+    rng = np.random.default_rng(seed)
+    block = np.sort(rng.integers(1000, 1500, n))
+    searchers = np.array([f'0x{i:040x}' for i in range(n_searchers)], dtype=object)
+    profit = rng.exponential(0.01, n)
+    return TransactionColumns(
+        block_number=block,
+        timestamp=block * 2 + 1_700_000_000,
+        tx_index=np.zeros(n, dtype=np.int32),
+        tx_hash=np.array([f'0x{i:064x}' for i in range(n)], dtype=object),
+        from_address=searchers[rng.integers(0, n_searchers, n)],
+        to_address=searchers[rng.integers(0, n_searchers, n)],
+        profit_token=np.full(n, 'weth', dtype=object),
+        profit=profit,
+        profit_weth=profit,
+        gas_cost=rng.exponential(1e-4, n),
+        is_inter=rng.random(n) < 0.4,
+        is_backrun=np.zeros(n, dtype=bool),
+    )
+
+
+def _brute_force(columns, start, end, searcher):
+    mask = (columns.block_number >= start) & (columns.block_number < end) & (columns.to_address == searcher)
+    return (mask.sum(), columns.is_inter[mask].sum(), (~columns.is_inter[mask]).sum(),
+            columns.profit[mask].sum(), columns.gas_cost[mask].sum())
+
+
+@pytest.mark.parametrize('window, step', [(50, 50), (100, 25), (60, 1)])
+def test_windows_match_brute_force(window, step):
+    columns = _columns(400)
+    windows = searcher_windows(columns, window=window, step=step, top_n=None)
+    assert windows.window_start[0] <= columns.block_number.min() < windows.window_start[0] + step
+    assert windows.window_end[-1] > columns.block_number.max()
+    assert (np.diff(windows.window_start) == step).all()
+    for w, (start, end) in enumerate(zip(windows.window_start, windows.window_end)):
+        for s, searcher in enumerate(windows.searchers):
+            got = (windows.tx_count[w, s], windows.inter_count[w, s], windows.begin_count[w, s],
+                   windows.profit[w, s], windows.gas_cost[w, s])
+            np.testing.assert_allclose(got, _brute_force(columns, start, end, searcher), atol=1e-12)
+
+
+def test_window_longer_than_data_is_a_single_window():
+    columns = _columns(100)
+    windows = searcher_windows(columns, window=10_000, step=10, top_n=None)
+    assert windows.tx_count.shape == (1, len(windows.searchers))
+    for s, searcher in enumerate(windows.searchers):
+        np.testing.assert_allclose(windows.profit[0, s], columns.profit[columns.to_address == searcher].sum())
+
+
+def test_top_n_merges_the_rest_into_other():
+    columns = _columns(300, seed=1)
+    full = searcher_windows(columns, window=100, top_n=None)
+    top = searcher_windows(columns, window=100, top_n=2)
+    assert list(top.searchers[-1:]) == [OTHER_SEARCHER] and len(top.searchers) == 3
+
+    totals = full.profit.sum(axis=0)
+    best = [full.searchers[i] for i in np.argsort(-totals)[:2]]
+    assert list(top.searchers[:2]) == best
+    np.testing.assert_allclose(top.tx_count.sum(axis=1), full.tx_count.sum(axis=1))
+    np.testing.assert_allclose(top.profit.sum(axis=1), full.profit.sum(axis=1))
+    np.testing.assert_allclose(top.profit_share().sum(axis=1)[top.profit.sum(axis=1) > 0], 1.0)
+
+
+def test_time_windows_and_errors():
+    columns = _columns(200, seed=2)
+    by_time = searcher_windows(columns, window=200, by='time', top_n=None)
+    by_block = searcher_windows(columns, window=100, by='block', top_n=None)
+    # timestamp = 2 * block + 常数，200秒的窗口对应100个区块
+    np.testing.assert_allclose(by_time.tx_count.sum(), by_block.tx_count.sum())
+    with pytest.raises(ValueError):
+        searcher_windows(columns, window=100, step=30)
+    with pytest.raises(ValueError):
+        searcher_windows(columns, window=100, by='day')
+
+    empty = searcher_windows(columns.take(np.zeros(len(columns), dtype=bool)), window=100)
+    assert empty.tx_count.shape == (0, 0)
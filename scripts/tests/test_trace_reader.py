@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from arbresearch import synthetic
+from arbresearch.trace_reader import iter_price_lines, parse_price_lines
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    monkeypatch.setenv('ARBRESEARCH_TRACE_CACHE', str(tmp_path / 'cache'))
+    return synthetic.write_trace_file(str(tmp_path / 'trace-analyzed.txt'), 200, n_tokens=10, n_pools=20)
+
+
+def test_arbitrary_parse_line_is_not_cached(trace_file, tmp_path):
+    # 默认不走缓存，parse_line 可以返回任意类型
+    rows = parse_price_lines(trace_file, str.strip)
+    assert rows == [line.strip() for line in iter_price_lines(trace_file)]
+    assert not os.path.exists(tmp_path / 'cache')
+
+
+def test_cached_rows_match_uncached(trace_file, tmp_path):
+    from arbresearch.cli import load_script
+    parse_trace_line = load_script('trace-graph').parse_trace_line
+    expected = parse_price_lines(trace_file, parse_trace_line)
+    assert [tuple(row) for row in parse_price_lines(trace_file, parse_trace_line, cache=True)] == expected
+    assert os.listdir(tmp_path / 'cache')
+    assert [tuple(row) for row in parse_price_lines(trace_file, parse_trace_line, cache=True)] == expected
@@ -0,0 +1,107 @@
+import random
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from arbresearch.constants import WETH_ADDRESS
+from arbresearch.interner import AddressInterner
+from arbresearch.weth_prices import WethPriceCache, prices_from_events
+
+USDC = '0x833589fcd6edb6e08f4c7c32d4f71b54bda02913'
+TOKEN_X = '0x' + 'aa' * 20
+TOKEN_Y = '0x' + 'bb' * 20
+
+
+def _cache(swaps, hops=2):
+    blocks, token_in, token_out, amount_in, amount_out = zip(*swaps)
+    return prices_from_events(blocks, token_in, token_out, map(str, amount_in), map(str, amount_out), hops)
+
+
+SWAPS = [
+    # 区块100：WETH -> USDC 两笔，按成交量加权
+    (100, WETH_ADDRESS, USDC, 10 ** 18, 2500 * 10 ** 6),
+    (100, USDC, WETH_ADDRESS, 7500 * 10 ** 6, 2 * 10 ** 18),
+    # USDC -> X -> Y：X在第二跳定价，Y需要第三跳
+    (100, USDC, TOKEN_X, 1000 * 10 ** 6, 500),
+    (100, TOKEN_X, TOKEN_Y, 100, 300),
+    # 区块101只有X和Y之间的swap，没有价格
+    (101, TOKEN_X, TOKEN_Y, 10, 10),
+    # 数量为0的swap忽略
+    (102, WETH_ADDRESS, TOKEN_Y, 0, 5),
+]
+
+
+def test_hop_propagation():
+    cache = _cache(SWAPS)
+    usdc = 3 * 10 ** 18 / (10_000 * 10 ** 6)
+    x = 1000 * 10 ** 6 * usdc / 500
+    prices = cache.to_weth([WETH_ADDRESS, USDC, TOKEN_X, TOKEN_Y], np.full(4, 100), np.ones(4))
+    np.testing.assert_allclose(prices[:3], [1.0, usdc, x])
+    assert np.isnan(prices[3])
+
+    three = _cache(SWAPS, hops=3)
+    np.testing.assert_allclose(three.to_weth([TOKEN_Y], np.array([100]), np.array([300.0])), [100 * x])
+    assert np.isnan(three.to_weth([TOKEN_X], np.array([101]), np.ones(1))).all()
+    assert np.isnan(three.to_weth([TOKEN_Y], np.array([102]), np.ones(1))).all()
+
+
+def test_direct_price_is_not_overwritten():
+    # X同时与WETH直接成交，又通过USDC间接成交，保留直接价格
+    swaps = SWAPS[:3] + [(100, TOKEN_X, WETH_ADDRESS, 1000, 3 * 10 ** 14)]
+    cache = _cache(swaps)
+    np.testing.assert_allclose(cache.to_weth([TOKEN_X], np.array([100]), np.ones(1)), [3 * 10 ** 11])
+
+
+def test_lookup_staleness_and_unknown_tokens():
+    cache = _cache(SWAPS)
+    blocks = np.array([100, 103, 103, 99])
+    np.testing.assert_array_equal(np.isnan(cache.to_weth([USDC] * 4, blocks, np.ones(4))), [False, True, True, True])
+    stale = cache.to_weth([USDC] * 4, blocks, np.ones(4), max_staleness=3)
+    assert stale[1] == stale[0] and np.isnan(stale[3])
+    assert np.isnan(cache.to_weth([USDC], np.array([104]), np.ones(1), max_staleness=3)).all()
+    # 未知token为nan，WETH在任何区块都为1
+    values = cache.to_weth(['0x' + 'cc' * 20, WETH_ADDRESS], np.array([100, 5]), np.array([7.0, 7.0]))
+    assert np.isnan(values[0]) and values[1] == 7.0
+    # 空缓存：驻留表ID为-1或没有价格的token都为nan
+    empty = WethPriceCache(np.zeros(0, dtype=np.int64), np.zeros(0), AddressInterner())
+    token = empty.interner.intern(TOKEN_X)
+    prices = empty.lookup(np.array([token, -1, empty.weth_id]), np.array([1, 1, 1]), max_staleness=5)
+    assert np.isnan(prices[:2]).all() and prices[2] == 1.0
+
+
+def _reference(swaps, hops):
+    """逐跳的字典实现：每跳只用上一跳结束时已知的价格，同一 (token, 区块) 按数量加权"""
+    known = {(block, WETH_ADDRESS): 1.0 for block, *_ in swaps}
+    for _ in range(hops):
+        weth, amount = defaultdict(float), defaultdict(float)
+        for block, t_in, t_out, a_in, a_out in swaps:
+            if a_in <= 0 or a_out <= 0:
+                continue
+            p_in, p_out = known.get((block, t_in)), known.get((block, t_out))
+            if p_in is not None and p_out is None:
+                weth[block, t_out] += a_in * p_in
+                amount[block, t_out] += a_out
+            elif p_out is not None and p_in is None:
+                weth[block, t_in] += a_out * p_out
+                amount[block, t_in] += a_in
+        known.update({key: weth[key] / amount[key] for key in weth})
+    return known
+
+
+@pytest.mark.parametrize('hops', [1, 2, 4])
+def test_random_swaps_match_reference(hops):
+    rng = random.Random(hops)
+    tokens = [WETH_ADDRESS] + ['0x%040x' % (0xc000 + i) for i in range(8)]
+    swaps = []
+    for _ in range(400):
+        t_in, t_out = rng.sample(tokens, 2)
+        swaps.append((rng.randint(1, 15), t_in, t_out, rng.randint(0, 10 ** 6), rng.randint(1, 10 ** 6)))
+    cache = _cache(swaps, hops)
+    expected = _reference(swaps, hops)
+
+    query = [(block, token) for block in range(0, 17) for token in tokens]
+    got = cache.to_weth([t for _, t in query], np.array([b for b, _ in query]), np.ones(len(query)))
+    want = np.array([expected.get(key, np.nan) if key[1] != WETH_ADDRESS else 1.0 for key in query])
+    np.testing.assert_allclose(got, want, rtol=1e-12)
+    assert np.isfinite(got).sum() > len(tokens)
@@ -1,16 +1,34 @@
-import networkx as nx
-import plotly.graph_objects as go
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Tuple, TYPE_CHECKING
 import json
 import os
+import sys
+import time
 from collections import defaultdict
-from neo4j import GraphDatabase
-from datetime import datetime
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from arbresearch.pool_registry import PoolRegistry, DEFAULT_POOL_CACHE
+from arbresearch.interner import AddressInterner, DEFAULT_INTERNER_FILE, normalize_address
+from arbresearch import metrics
+from arbresearch.trace_cache import default_cache, parse_trace
+from arbresearch.trace_reader import parse_price_lines
+
+# networkx、plotly、neo4j、scipy 在用到的函数内部才导入，只做统计时无需加载
+if TYPE_CHECKING:
+    import networkx as nx
+    from arbresearch.csr_graph import CSRGraph
+    from arbresearch.neo4j_import import Neo4jCSVExport
+    from arbresearch.observations import ObservationStore
 
 class Neo4jGraph:
-    def __init__(self, uri="bolt://localhost:7688", user="neo4j", password="password123"):
+    def __init__(self, uri="bolt://localhost:7688", user="neo4j", password="password123",
+                 cache_ttl: float = 60.0):
+        from neo4j import GraphDatabase
         self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        # 查询结果缓存: (查询名, 参数) -> (写入时间, 结果)，本对象写入数据时清空
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[tuple, Tuple[float, list]] = {}
 
     def close(self):
         self.driver.close()
@@ -20,60 +38,187 @@ class Neo4jGraph:
             # 创建唯一性约束
             session.run("CREATE CONSTRAINT token_address IF NOT EXISTS FOR (t:Token) REQUIRE t.address IS UNIQUE")
             session.run("CREATE CONSTRAINT pool_address IF NOT EXISTS FOR (p:Pool) REQUIRE p.address IS UNIQUE")
+        self.create_indexes()
+
+    def create_indexes(self):
+        """常用查询的属性索引：按协议查池子、按函数名过滤关系"""
+        with self.driver.session() as session:
+            session.run("CREATE INDEX pool_type IF NOT EXISTS FOR (p:Pool) ON (p.type)")
+            session.run("CREATE INDEX connects_to_function IF NOT EXISTS FOR ()-[r:CONNECTS_TO]-() ON (r.function)")
+
+    def drop_indexes(self):
+        with self.driver.session() as session:
+            session.run("DROP INDEX pool_type IF EXISTS")
+            session.run("DROP INDEX connects_to_function IF EXISTS")
 
     def clear_database(self):
         with self.driver.session() as session:
             session.run("MATCH (n) DETACH DELETE n")
+        self.clear_cache()
 
     def create_token(self, address: str):
         with self.driver.session() as session:
             session.run("MERGE (t:Token {address: $address})", address=address)
+        self._cache.clear()
 
     def create_pool(self, address: str, pool_type: str):
         with self.driver.session() as session:
             session.run("MERGE (p:Pool {address: $address, type: $type})", 
                        address=address, type=pool_type)
+        self._cache.clear()
 
     def create_relationship(self, token_address: str, pool_address: str, 
-                          function_name: str, function_result: str):
+                          function_name: str, function_result: str,
+                          value: float = None, observed_at: datetime = None):
+        """记录一次观测，合并到 (token, 池子, 函数) 的聚合关系上"""
+        self.merge_relationships([{
+            'token': token_address, 'pool': pool_address, 'function': function_name,
+            'count': 1, 'result': function_result, 'value': value,
+            'first_seen': observed_at, 'last_seen': observed_at,
+        }])
+
+    def merge_tokens(self, addresses: List[str], batch_size: int = 5000):
+        self._write_batches("""
+            UNWIND $rows AS address
+            MERGE (t:Token {address: address})
+        """, list(addresses), batch_size)
+
+    def merge_pools(self, pools: Dict[str, str], batch_size: int = 5000):
+        """池子地址 -> 协议类型"""
+        self._write_batches("""
+            UNWIND $rows AS row
+            MERGE (p:Pool {address: row.address})
+            SET p.type = row.type
+        """, [{'address': address, 'type': pool_type} for address, pool_type in pools.items()], batch_size)
+
+    def merge_relationships(self, rows: List[Dict], batch_size: int = 5000):
+        """
+        按 (token, 池子, 函数) 合并关系，每个组合只有一条 CONNECTS_TO
+
+        rows 中每项包含 token、pool、function、count（本批观测次数）、result/value（最新的原始返回值
+        和解码价格）以及 first_seen/last_seen（datetime，为空时使用数据库当前时间）。
+        关系上累加 count，保留最早的 first_seen，并用本批数据覆盖 last_seen 和最新值。
+        """
+        self._write_batches("""
+            UNWIND $rows AS row
+            MATCH (t:Token {address: row.token})
+            MATCH (p:Pool {address: row.pool})
+            MERGE (t)-[r:CONNECTS_TO {function: row.function}]->(p)
+            ON CREATE SET r.count = row.count,
+                          r.first_seen = coalesce(row.first_seen, datetime())
+            ON MATCH SET r.count = r.count + row.count
+            SET r.last_seen = coalesce(row.last_seen, datetime()),
+                r.result = row.result,
+                r.value = row.value
+        """, rows, batch_size)
+
+    def _write_batches(self, cypher: str, rows: list, batch_size: int):
+        with self.driver.session() as session:
+            for i in range(0, len(rows), batch_size):
+                batch = rows[i:i + batch_size]
+                session.execute_write(lambda tx: tx.run(cypher, rows=batch).consume())
+        self._cache.clear()
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def _query(self, name: str, cypher: str, use_cache: bool = True, **params) -> List[Dict]:
+        """执行只读查询，相同参数的结果在 cache_ttl 秒内直接从缓存返回"""
+        key = (name, tuple(sorted(params.items())))
+        if use_cache:
+            cached = self._cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self.cache_ttl:
+                return cached[1]
         with self.driver.session() as session:
-            session.run("""
-                MATCH (t:Token {address: $token_address})
-                MATCH (p:Pool {address: $pool_address})
-                MERGE (t)-[r:CONNECTS_TO {
-                    function: $function_name,
-                    result: $function_result,
-                    timestamp: datetime()
-                }]->(p)
-            """, token_address=token_address, pool_address=pool_address,
-                function_name=function_name, function_result=function_result)
+            records = session.execute_read(lambda tx: tx.run(cypher, **params).data())
+        if use_cache:
+            self._cache[key] = (time.monotonic(), records)
+        return records
+
+    def pools_for_token_pair(self, token_a: str, token_b: str, function: str = None) -> List[Dict]:
+        """同时连接两个token的池子，可按关系的函数名过滤"""
+        return self._query('pools_for_token_pair', """
+            MATCH (a:Token {address: $token_a})-[ra:CONNECTS_TO]->(p:Pool)<-[rb:CONNECTS_TO]-(b:Token {address: $token_b})
+            WHERE $function IS NULL OR (ra.function = $function AND rb.function = $function)
+            RETURN DISTINCT p.address AS pool, p.type AS type
+            ORDER BY pool
+        """, token_a=token_a, token_b=token_b, function=function)
+
+    def pools_by_protocol(self, protocol: str, limit: int = 1000) -> List[str]:
+        """指定协议的池子地址（走 Pool.type 索引）"""
+        records = self._query('pools_by_protocol', """
+            MATCH (p:Pool) WHERE p.type = $protocol
+            RETURN p.address AS pool
+            ORDER BY pool
+            LIMIT $limit
+        """, protocol=protocol, limit=limit)
+        return [record['pool'] for record in records]
+
+    def protocol_pool_counts(self) -> Dict[str, int]:
+        """各协议被触达的池子数"""
+        records = self._query('protocol_pool_counts', """
+            MATCH (p:Pool) WHERE p.type IS NOT NULL
+            RETURN p.type AS type, count(p) AS count
+            ORDER BY count DESC
+        """)
+        return {record['type']: record['count'] for record in records}
+
+    def token_paths(self, source: str, target: str, max_pools: int = 3, limit: int = 100) -> List[List[str]]:
+        """
+        两个token之间经过不超过 max_pools 个池子的路径
+
+        返回 [token, pool, token, pool, ..., token] 形式的地址列表，路径上不重复经过同一节点
+        """
+        # 变长关系的上限不能参数化，这里只接受整数
+        max_hops = 2 * int(max_pools)
+        records = self._query(f'token_paths_{max_hops}', f"""
+            MATCH path = (a:Token {{address: $source}})-[:CONNECTS_TO*2..{max_hops}]-(b:Token {{address: $target}})
+            WHERE all(n IN nodes(path) WHERE single(m IN nodes(path) WHERE m = n))
+            WITH DISTINCT [n IN nodes(path) | n.address] AS hops
+            RETURN hops
+            ORDER BY size(hops)
+            LIMIT $limit
+        """, source=source, target=target, limit=limit)
+        return [record['hops'] for record in records]
+
+    def hottest_pools(self, limit: int = 20, function: str = None) -> List[Dict]:
+        """按观测次数排序的池子，指定function时只统计该函数的关系（走关系索引）"""
+        if function is None:
+            cypher = """
+                MATCH ()-[r:CONNECTS_TO]->(p:Pool)
+                WITH p, count(r) AS relationships, sum(r.count) AS observations
+                RETURN p.address AS pool, p.type AS type, relationships, observations
+                ORDER BY observations DESC
+                LIMIT $limit
+            """
+        else:
+            cypher = """
+                MATCH ()-[r:CONNECTS_TO]->(p:Pool) WHERE r.function = $function
+                WITH p, count(r) AS relationships, sum(r.count) AS observations
+                RETURN p.address AS pool, p.type AS type, relationships, observations
+                ORDER BY observations DESC
+                LIMIT $limit
+            """
+        return self._query('hottest_pools', cypher, limit=limit, function=function)
 
     def get_statistics(self):
+        """节点和关系数量从计数存储读取，不做全图扫描"""
+        stats = {'nodes': {}, 'relationships': {}}
         with self.driver.session() as session:
-            stats = {}
+            labels = [record['label'] for record in session.run("CALL db.labels() YIELD label RETURN label")]
+            for label in labels:
+                result = session.run(f"MATCH (n:`{label}`) RETURN count(n) AS count")
+                stats['nodes'][label] = result.single()['count']
             
-            # 获取节点统计
-            result = session.run("""
-                MATCH (n)
-                RETURN labels(n) as type, count(*) as count
-            """)
-            stats['nodes'] = {record['type'][0]: record['count'] for record in result}
-            
-            # 获取关系统计
-            result = session.run("""
-                MATCH ()-[r]->()
-                RETURN type(r) as type, count(*) as count
-            """)
-            stats['relationships'] = {record['type']: record['count'] for record in result}
-            
-            # 获取协议统计
-            result = session.run("""
-                MATCH (p:Pool)
-                RETURN p.type as type, count(*) as count
-            """)
-            stats['protocols'] = {record['type']: record['count'] for record in result}
-            
-            return stats
+            types = [record['relationshipType'] for record in
+                     session.run("CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType")]
+            for rel_type in types:
+                result = session.run(f"MATCH ()-[r:`{rel_type}`]->() RETURN count(r) AS count")
+                stats['relationships'][rel_type] = result.single()['count']
+        
+        # 获取协议统计
+        stats['protocols'] = self.protocol_pool_counts()
+        return stats
 
 def parse_trace_line(line: str) -> Tuple[str, str, str, str, str, str]:
     """
@@ -105,77 +250,199 @@ def parse_trace_line(line: str) -> Tuple[str, str, str, str, str, str]:
         
     return token0, token1, pool_address, pool_type, function_name, function_result
 
-def create_graph_from_trace(trace_file: str, allowed_tokens: List[str] = None) -> Tuple[nx.Graph, Dict]:
+@metrics.timed()
+def collect_trace_stats(trace_file: str, allowed_tokens: List[str] = None, workers: int = 1) -> Dict:
+    """
+    只统计协议、函数和token对出现次数，不构建图也不连接Neo4j
+
+    workers > 1 时按行边界分块，多进程解析
+    """
+    stats = {
+        'protocols': defaultdict(int),
+        'functions': defaultdict(int),
+        'token_pairs': defaultdict(int)
+    }
+    rows = parse_price_lines(trace_file, parse_trace_line, workers, cache=True)
+    for token0, token1, _, pool_type, function_name, _ in rows:
+        if allowed_tokens and (token0 not in allowed_tokens or token1 not in allowed_tokens):
+            continue
+        stats['protocols'][pool_type] += 1
+        stats['functions'][function_name] += 1
+        stats['token_pairs'][f"{token0}-{token1}"] += 1
+    return stats
+
+@metrics.timed()
+def create_graph_from_trace(trace_file: str, allowed_tokens: List[str] = None,
+                            pool_registry: PoolRegistry = None,
+                            interner: AddressInterner = None, clear: bool = True,
+                            observations: 'ObservationStore' = None,
+                            observed_at: datetime = None,
+                            export: 'Neo4jCSVExport' = None) -> Tuple['nx.Graph', Dict]:
     """
     从轨迹文件创建图和统计信息，并存储到Neo4j中
+
+    图的节点为interner中的整数ID，节点属性 address 保存原始token/池子地址
+    如果提供了pool_registry，池子节点会补充factory、协议和token地址信息
+    Neo4j中每个 (token, 池子, 函数) 只有一条聚合关系；clear=False 时保留已有数据，
+    多个trace的观测次数会累加。提供observations时每次观测的解码价格另外写入时间序列存储。
+    提供export（neo4j_import.Neo4jCSVExport）时不连接Neo4j，节点和关系聚合到export中，
+    之后用 export.write() 生成 neo4j-admin 导入所需的CSV。
     """
+    import networkx as nx
+    
+    if interner is None:
+        interner = AddressInterner()
+    # 先按地址过滤再驻留，不在白名单中的token和池子不进入驻留表
+    allowed_keys = {normalize_address(token) for token in allowed_tokens} if allowed_tokens else None
+    # trace中没有时间信息，同一文件的观测都记为导入时间
+    observed_at = observed_at or datetime.now(timezone.utc)
+    
     G = nx.Graph()
     stats = {
         'protocols': defaultdict(int),
         'functions': defaultdict(int),
         'token_pairs': defaultdict(int)
     }
+    # 统计时以ID对为键，返回前再转换为地址
+    token_pair_ids = defaultdict(int)
+    # (token ID, 池子ID, 函数) -> [观测次数, 最新返回值, 最新价格]，解析完后一次性写入Neo4j
+    relationships: Dict[Tuple[int, int, str], list] = {}
+    pool_types: Dict[int, str] = {}
     
-    # 初始化Neo4j连接
-    neo4j_graph = Neo4jGraph()
-    
-    # 清理数据库
-    print("正在清理Neo4j数据库...")
-    with neo4j_graph.driver.session() as session:
-        # 删除所有约束
-        session.run("DROP CONSTRAINT token_address IF EXISTS")
-        session.run("DROP CONSTRAINT pool_address IF EXISTS")
-        # 删除所有节点和关系
-        session.run("MATCH (n) DETACH DELETE n")
-    print("数据库清理完成")
+    if export is not None:
+        neo4j_graph = export
+    else:
+        # 初始化Neo4j连接
+        with metrics.stage('neo4j_connect'):
+            neo4j_graph = Neo4jGraph()
+        
+        if clear:
+            # 清理数据库
+            print("正在清理Neo4j数据库...")
+            with metrics.stage('neo4j_clear'):
+                with neo4j_graph.driver.session() as session:
+                    # 删除所有约束
+                    session.run("DROP CONSTRAINT token_address IF EXISTS")
+                    session.run("DROP CONSTRAINT pool_address IF EXISTS")
+                    session.run("DROP INDEX pool_type IF EXISTS")
+                    session.run("DROP INDEX connects_to_function IF EXISTS")
+                    # 删除所有节点和关系
+                    session.run("MATCH (n) DETACH DELETE n")
+            print("数据库清理完成")
+        # 创建约束（已存在时跳过）
+        neo4j_graph.create_constraints()
     
-    # 创建约束
-    neo4j_graph.create_constraints()
+    # 只解码包含 slot0(/getReserves( 的行，解析结果按文件缓存，未变化的trace直接读取缓存
+    with metrics.stage('parse_trace'):
+        parsed = parse_trace(trace_file, parse_trace_line, cache=default_cache())
     
-    with open(trace_file, 'r') as f:
-        for line in f:
-            result = parse_trace_line(line.strip())
-            if not result:
-                continue
-                
-            token0, token1, pool_address, pool_type, function_name, function_result = result
-            
-            if allowed_tokens and (token0 not in allowed_tokens or token1 not in allowed_tokens):
+    with metrics.stage('build_graph'):
+        for (token0, token1, pool_address, pool_type, function_name, function_result), value in \
+                zip(parsed.rows(), parsed.value.tolist()):
+            if allowed_keys and (normalize_address(token0) not in allowed_keys
+                                 or normalize_address(token1) not in allowed_keys):
                 continue
+            token0_id = interner.intern(token0)
+            token1_id = interner.intern(token1)
+            pool_id = interner.intern(pool_address)
+            metrics.count('price_calls')
             
             # 更新统计信息
             stats['protocols'][pool_type] += 1
             stats['functions'][function_name] += 1
-            stats['token_pairs'][f"{token0}-{token1}"] += 1
+            token_pair_ids[(token0_id, token1_id)] += 1
             
             # 添加到NetworkX图
-            G.add_node(token0, type='token')
-            G.add_node(token1, type='token')
-            G.add_node(pool_address, type='pool', pool_type=pool_type)
-            
-            G.add_edge(token0, pool_address, 
-                      function=function_name,
-                      result=function_result)
-            G.add_edge(token1, pool_address, 
-                      function=function_name,
-                      result=function_result)
+            with metrics.accumulate('networkx_add'):
+                if token0_id not in G:
+                    G.add_node(token0_id, type='token', address=token0)
+                if token1_id not in G:
+                    G.add_node(token1_id, type='token', address=token1)
+                if pool_id not in G:
+                    G.add_node(pool_id, type='pool', pool_type=pool_type, address=pool_address)
+                    pool_info = pool_registry.get(pool_address) if pool_registry is not None else None
+                    if pool_info:
+                        G.nodes[pool_id].update(
+                            factory=pool_info.get('factory'),
+                            protocol=pool_info['protocol'],
+                            tokens=pool_info['tokens'],
+                        )
+                
+                G.add_edge(token0_id, pool_id, 
+                          function=function_name,
+                          result=function_result)
+                G.add_edge(token1_id, pool_id, 
+                          function=function_name,
+                          result=function_result)
             
-            # 添加到Neo4j
-            neo4j_graph.create_token(token0)
-            neo4j_graph.create_token(token1)
-            neo4j_graph.create_pool(pool_address, pool_type)
-            neo4j_graph.create_relationship(token0, pool_address, function_name, function_result)
-            neo4j_graph.create_relationship(token1, pool_address, function_name, function_result)
+            # 聚合关系，后出现的观测覆盖最新值
+            with metrics.accumulate('aggregate_relationships'):
+                pool_types[pool_id] = pool_type
+                for token_id in (token0_id, token1_id):
+                    entry = relationships.get((token_id, pool_id, function_name))
+                    if entry is None:
+                        relationships[(token_id, pool_id, function_name)] = [1, function_result, value]
+                    else:
+                        entry[0] += 1
+                        entry[1] = function_result
+                        entry[2] = value
+                    if observations is not None:
+                        observations.add(token_id, pool_id, function_name, value, observed_at)
+    
+    # 写入Neo4j（UNWIND批量写入，每个组合一条关系）或聚合到CSV导出
+    with metrics.stage('neo4j_write'):
+        token_ids = {token_id for token_id, _, _ in relationships}
+        neo4j_graph.merge_tokens([interner.address(token_id) for token_id in token_ids])
+        neo4j_graph.merge_pools({interner.address(pool_id): pool_type for pool_id, pool_type in pool_types.items()})
+        # 无法解码的价格（nan）写为空值
+        neo4j_graph.merge_relationships([{
+            'token': interner.address(token_id),
+            'pool': interner.address(pool_id),
+            'function': function_name,
+            'count': count,
+            'result': function_result,
+            'value': value if value == value else None,
+            'first_seen': observed_at,
+            'last_seen': observed_at,
+        } for (token_id, pool_id, function_name), (count, function_result, value) in relationships.items()])
+        metrics.count('neo4j_relationships', len(relationships))
+    if export is None:
+        neo4j_graph.close()
     
-    neo4j_graph.close()
+    if observations is not None:
+        with metrics.stage('write_observations'):
+            observations.flush(source=os.path.basename(trace_file))
+    
+    for (token0_id, token1_id), count in token_pair_ids.items():
+        stats['token_pairs'][f"{interner.address(token0_id)}-{interner.address(token1_id)}"] = count
     return G, stats
 
-def create_plotly_graph(G: nx.Graph, stats: Dict, output_file: str = "trace_analysis_graph.html"):
+@metrics.timed()
+def create_csr_graph_from_traces(trace_files: List[str], allowed_tokens: List[str] = None,
+                                 interner: AddressInterner = None, workers: int = 1) -> 'CSRGraph':
+    """
+    合并多个轨迹文件，构建CSR存储的token-池子图（不写入Neo4j）
+
+    需要绘图时可调用 to_networkx() 导出
+    """
+    from arbresearch.csr_graph import CSRGraphBuilder
+    
+    builder = CSRGraphBuilder(interner)
+    for trace_file in trace_files:
+        builder.add_trace_file(trace_file, parse_trace_line, allowed_tokens, workers)
+    return builder.build()
+
+@metrics.timed()
+def create_plotly_graph(G: 'nx.Graph', stats: Dict, output_file: str = "trace_analysis_graph.html"):
     """
     使用 plotly 创建交互式网络图
     """
+    import networkx as nx
+    import plotly.graph_objects as go
+    
     # 使用 spring_layout 计算节点位置
-    pos = nx.spring_layout(G, k=1, iterations=50)
+    with metrics.stage('spring_layout'):
+        pos = nx.spring_layout(G, k=1, iterations=50)
     
     # 准备节点数据
     node_x = []
@@ -190,12 +457,13 @@ def create_plotly_graph(G: nx.Graph, stats: Dict, output_file: str = "trace_anal
         node_y.append(y)
         
         node_data = G.nodes[node]
+        address = node_data.get('address', node)
         if node_data['type'] == 'token':
-            node_text.append(f"Token: {node}")
+            node_text.append(f"Token: {address}")
             node_color.append('lightblue')
             node_size.append(20)
         else:
-            node_text.append(f"Pool: {node[:10]}...\nType: {node_data['pool_type']}")
+            node_text.append(f"Pool: {address[:10]}...\nType: {node_data['pool_type']}")
             node_color.append('lightgreen')
             node_size.append(15)
     
@@ -209,7 +477,7 @@ def create_plotly_graph(G: nx.Graph, stats: Dict, output_file: str = "trace_anal
         x1, y1 = pos[edge[1]]
         edge_x.extend([x0, x1, None])
         edge_y.extend([y0, y1, None])
-        edge_text.append(f"Function: {edge[2]['function']}\nResult: {edge[2]['result']}")
+        edge_text.append(f"Function: {edge[2]['function']}\nResult: {edge[2].get('result', edge[2].get('price'))}")
     
     # 创建图形
     fig = go.Figure()
@@ -246,7 +514,8 @@ def create_plotly_graph(G: nx.Graph, stats: Dict, output_file: str = "trace_anal
         yaxis=dict(showgrid=False, zeroline=False, showticklabels=False))
     
     # 保存为HTML文件
-    fig.write_html(output_file)
+    with metrics.stage('write_html'):
+        fig.write_html(output_file)
     return output_file
 
 def main():
@@ -256,7 +525,16 @@ def main():
     # 允许所有token
     allowed_tokens = None
     
-    G, stats = create_graph_from_trace(trace_file, allowed_tokens)
+    # 加载池子元数据（不存在缓存文件时跳过）
+    with metrics.stage('load_pool_registry'):
+        pool_registry = PoolRegistry.load(DEFAULT_POOL_CACHE) if os.path.exists(DEFAULT_POOL_CACHE) else None
+    
+    # 地址ID表在多次运行间共享
+    with metrics.stage('load_interner'):
+        interner = AddressInterner.load(DEFAULT_INTERNER_FILE)
+    
+    G, stats = create_graph_from_trace(trace_file, allowed_tokens, pool_registry, interner)
+    interner.save(DEFAULT_INTERNER_FILE)
     
     # 打印基本统计信息
     print("\n=== 基本统计信息 ===")